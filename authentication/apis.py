@@ -9,9 +9,11 @@ from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, serializers
 from rest_framework.authtoken.models import Token
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from authentication.jwks import jwks_cache
+from authentication.portal import portal_verifier
 from authentication.models import Authentication, NewUser
 from authentication.selectors import (
     check_user_email,
@@ -19,6 +21,7 @@ from authentication.selectors import (
     check_new_user
 )
 from authentication.services import (
+    token_cache,
     validate_token,
     create_bcodb_user,
     send_bcodb,
@@ -551,3 +554,35 @@ class RegisterUserNoVerificationAPI(APIView):
             return Response(status=status.HTTP_201_CREATED, data={"message": "user account created"})
 
         return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class AuthMetricsApi(APIView):
+    """Authentication Metrics
+
+    --------------------
+
+    Authentication cache counters of the worker process that answers the
+    request: `jwks_cache` has the hits, misses, fetches and background
+    refreshes of the issuers' signing keys and the age of the keys of each
+    issuer, `portal` the local and cached verifications of BioCompute
+    Portal tokens and the calls to the portals, and `token_cache` the hits
+    and misses of the users of verified bearer tokens. Only available to
+    admin users.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_id="api_auth_metrics",
+        responses={
+            200: "Authentication metrics.",
+            403: "Invalid token or not an admin user.",
+        },
+        tags=["Authentication and Account Management"],
+    )
+
+    def get(self, request) -> Response:
+        return Response(status=status.HTTP_200_OK, data={
+            "jwks_cache": jwks_cache.stats(),
+            "portal": portal_verifier.stats(),
+            "token_cache": token_cache.stats(),
+        })
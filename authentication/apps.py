@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class Authentication(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "authentication"
+
+    def ready(self):
+        # Connects the receivers that drop the cached token users.
+        import authentication.services
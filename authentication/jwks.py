@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# authentication/jwks.py
+
+"""JSON Web Key Sets
+
+Cache of the signing keys of JWT issuers, so that verifying a token does
+not fetch the issuer's JWKS on every request.
+"""
+
+import json
+import threading
+import time
+import jwt
+import requests
+from django.conf import settings
+
+JWKS_TTL = getattr(settings, "BCO_JWKS_TTL", 3600)
+JWKS_REFRESH_AHEAD = getattr(settings, "BCO_JWKS_REFRESH_AHEAD", 300)
+JWKS_FETCH_TIMEOUT = getattr(settings, "BCO_JWKS_FETCH_TIMEOUT", 5)
+JWKS_MIN_REFETCH = getattr(settings, "BCO_JWKS_MIN_REFETCH", 60)
+
+class JwksFetchError(Exception):
+    """Raised when the keys of an issuer can not be fetched or parsed."""
+
+class _IssuerKeys:
+    """The keys of one issuer and when they were fetched."""
+
+    def __init__(self):
+        self.keys = {}
+        self.fetched_at = None
+        self.forced_at = None
+        self.failed_at = None
+        self.refreshing = False
+        self.lock = threading.Lock()
+
+class JwksCache:
+    """JWKS Cache
+
+    Keys of JWT issuers by issuer and `kid`, fetched from
+    `<issuer><jwks_path>`. Keys are served from memory for `ttl` seconds.
+    During the last `refresh_ahead` seconds of that time a request that
+    uses them starts a refresh in a background thread, so requests do not
+    wait for the issuer while its keys are in use. Once the keys are
+    older than `ttl` they are fetched before answering.
+
+    A `kid` that is not in the cached keys, e.g. after the issuer rotated
+    its keys, forces a refetch, at most once every `min_refetch` seconds
+    per issuer so that tokens with made-up `kid`s can not flood the issuer.
+    When a fetch fails the previous keys are kept and served, and the
+    issuer is not asked again for `min_refetch` seconds, also when there
+    were no keys to serve.
+
+    Parameters:
+    - ttl (float):
+        Seconds fetched keys are used.
+    - refresh_ahead (float):
+        Seconds before the end of `ttl` in which keys are refreshed in the
+        background.
+    - timeout (float):
+        Seconds to wait for an issuer.
+    - min_refetch (float):
+        Shortest time in seconds between two fetches for unknown `kid`s,
+        and after a failed fetch.
+    - jwks_path (str):
+        Path of the key set, appended to the issuer.
+    """
+
+    def __init__(
+        self,
+        ttl: float=JWKS_TTL,
+        refresh_ahead: float=JWKS_REFRESH_AHEAD,
+        timeout: float=JWKS_FETCH_TIMEOUT,
+        min_refetch: float=JWKS_MIN_REFETCH,
+        jwks_path: str="/oauth/jwks"
+    ):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.timeout = timeout
+        self.min_refetch = min_refetch
+        self.jwks_path = jwks_path
+        self._lock = threading.Lock()
+        self._issuers = {}
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.background_refreshes = 0
+        self.errors = 0
+
+    def _issuer(self, issuer: str) -> _IssuerKeys:
+        with self._lock:
+            return self._issuers.setdefault(issuer, _IssuerKeys())
+
+    def _fetch(self, issuer: str) -> dict:
+        self.fetches += 1
+        try:
+            response = requests.get(
+                issuer + self.jwks_path, timeout=self.timeout
+            )
+            response.raise_for_status()
+            return {
+                jwk.get("kid"): jwt.algorithms.RSAAlgorithm.from_jwk(
+                    json.dumps(jwk)
+                )
+                for jwk in response.json()["keys"]
+            }
+        except requests.RequestException as error:
+            raise JwksFetchError(f"{error}") from error
+        except (ValueError, KeyError, TypeError) as error:
+            raise JwksFetchError("Invalid key set.") from error
+
+    def _refresh(self, issuer: str, entry: _IssuerKeys, forced: bool=False):
+        """Fetch the keys of an issuer, unless another thread just did."""
+
+        with entry.lock:
+            now = time.monotonic()
+            if forced:
+                if entry.forced_at is not None \
+                        and now - entry.forced_at < self.min_refetch:
+                    return
+                entry.forced_at = now
+            else:
+                if entry.fetched_at is not None and \
+                        now - entry.fetched_at < self.ttl - self.refresh_ahead:
+                    return
+                # After a failed fetch the old keys are served for a while,
+                # and without keys the failure is repeated without asking.
+                if entry.failed_at is not None \
+                        and now - entry.failed_at < self.min_refetch:
+                    if not entry.keys:
+                        raise JwksFetchError(
+                            f"Fetching the keys of {issuer} failed less "
+                            f"than {self.min_refetch} seconds ago."
+                        )
+                    return
+            try:
+                keys = self._fetch(issuer)
+            except JwksFetchError:
+                self.errors += 1
+                entry.failed_at = time.monotonic()
+                if not entry.keys:
+                    raise
+                return
+            entry.keys = keys
+            entry.fetched_at = time.monotonic()
+            entry.failed_at = None
+
+    def _refresh_in_background(self, issuer: str, entry: _IssuerKeys):
+        with self._lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+        self.background_refreshes += 1
+
+        def refresh():
+            try:
+                self._refresh(issuer, entry)
+            except JwksFetchError:
+                pass
+            finally:
+                entry.refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get_key(self, issuer: str, kid: str=None):
+        """Get Key
+
+        Returns the key of an issuer with the `kid`, or `None` if the issuer
+        has no such key. Without a `kid` the first key of the issuer is
+        returned.
+
+        Raises:
+        - JwksFetchError: If the issuer's keys can not be fetched and none
+            were fetched before.
+        """
+
+        entry = self._issuer(issuer)
+        fetched_at = entry.fetched_at
+        age = None if fetched_at is None else time.monotonic() - fetched_at
+        if age is None or age >= self.ttl:
+            self.misses += 1
+            self._refresh(issuer, entry)
+        elif self._find(entry, kid) is None:
+            self.misses += 1
+            self._refresh(issuer, entry, forced=True)
+        else:
+            self.hits += 1
+            if age >= self.ttl - self.refresh_ahead:
+                self._refresh_in_background(issuer, entry)
+        return self._find(entry, kid)
+
+    @staticmethod
+    def _find(entry: _IssuerKeys, kid: str):
+        keys = entry.keys
+        if kid is None:
+            return next(iter(keys.values()), None)
+        return keys.get(kid)
+
+    def clear(self):
+        """Forget the keys of every issuer."""
+
+        with self._lock:
+            self._issuers = {}
+
+    def stats(self) -> dict:
+        """Returns the cache counters of the current worker process."""
+
+        now = time.monotonic()
+        return {
+            "issuers": {
+                issuer: {
+                    "kids": sorted(str(kid) for kid in entry.keys),
+                    "age": None if entry.fetched_at is None
+                        else round(now - entry.fetched_at, 3),
+                }
+                for issuer, entry in list(self._issuers.items())
+            },
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "background_refreshes": self.background_refreshes,
+            "errors": self.errors,
+        }
+
+jwks_cache = JwksCache()
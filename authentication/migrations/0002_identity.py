@@ -0,0 +1,53 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_identities(apps, schema_editor):
+    """Indexes the issuers and subjects listed in `auth_service`."""
+
+    Authentication = apps.get_model('authentication', 'Authentication')
+    Identity = apps.get_model('authentication', 'Identity')
+    for authentication in Authentication.objects.order_by('pk').iterator():
+        auth_service = authentication.auth_service
+        identities = set()
+        for entry in auth_service if isinstance(auth_service, list) else []:
+            if isinstance(entry, dict) and isinstance(entry.get('iss'), str) \
+                    and isinstance(entry.get('sub'), str):
+                identities.add((entry['iss'], entry['sub']))
+        Identity.objects.bulk_create([
+            Identity(
+                issuer=issuer, subject=subject,
+                username_id=authentication.username_id,
+                authentication=authentication
+            )
+            for issuer, subject in identities
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Identity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issuer', models.CharField(max_length=255)),
+                ('subject', models.CharField(max_length=255)),
+                ('authentication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='identities', to='authentication.authentication')),
+                ('username', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='identities', to=settings.AUTH_USER_MODEL, to_field='username')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='identity',
+            constraint=models.UniqueConstraint(fields=('issuer', 'subject'), name='unique_issuer_subject'),
+        ),
+        migrations.RunPython(build_identities, migrations.RunPython.noop),
+    ]
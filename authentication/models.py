@@ -2,6 +2,8 @@
 
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 class Authentication(models.Model):
@@ -15,6 +17,75 @@ class Authentication(models.Model):
         """String for representing the model in Admin site."""
         return str(self.username)
 
+class Identity(models.Model):
+    """Identity
+
+    Index of the `auth_service` entries of `Authentication` objects, one row
+    per issuer and subject, so the user of a JWT is found with an indexed
+    lookup instead of searching the `auth_service` lists. Rows are written
+    whenever an `Authentication` object is saved. An issuer and subject
+    belong to the first account that lists them.
+
+    Attributes:
+    -----------
+    issuer: str
+        The 'iss' claim of the JWTs of the identity
+    subject: str
+        The 'sub' claim of the JWTs of the identity
+    username: ForeignKey(User)
+        The user the identity authenticates
+    authentication: ForeignKey(Authentication)
+        The `Authentication` object listing the identity
+    """
+
+    issuer = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255)
+    username = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        to_field="username",
+        related_name="identities"
+    )
+    authentication = models.ForeignKey(
+        Authentication,
+        on_delete=models.CASCADE,
+        related_name="identities"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["issuer", "subject"], name="unique_issuer_subject"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.issuer} {self.subject}: {self.username_id}"
+
+def auth_service_identities(auth_service) -> set:
+    """Returns the `(issuer, subject)` pairs listed in an `auth_service`."""
+
+    identities = set()
+    for entry in auth_service if isinstance(auth_service, list) else []:
+        if isinstance(entry, dict) and isinstance(entry.get("iss"), str) \
+                and isinstance(entry.get("sub"), str):
+            identities.add((entry["iss"], entry["sub"]))
+    return identities
+
+@receiver(post_save, sender=Authentication)
+def _authentication_saved(sender, instance, **kwargs):
+    listed = auth_service_identities(instance.auth_service)
+    indexed = set(instance.identities.values_list("issuer", "subject"))
+    for issuer, subject in indexed - listed:
+        instance.identities.filter(issuer=issuer, subject=subject).delete()
+    Identity.objects.bulk_create([
+        Identity(
+            issuer=issuer, subject=subject,
+            username_id=instance.username_id, authentication=instance
+        )
+        for issuer, subject in listed - indexed
+    ], ignore_conflicts=True)
+
 class NewUser(models.Model):
     """New User
     For registering new users.
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# authentication/portal.py
+
+"""BioCompute Portal Tokens
+
+Verification of tokens issued by a BioCompute Portal without a round trip
+to the portal on every request.
+"""
+
+import threading
+import time
+import jwt
+import requests
+from hashlib import sha256
+from django.conf import settings
+from django.core.cache import caches
+
+PORTAL_KEYS = getattr(settings, "BCO_PORTAL_KEYS", {})
+PORTAL_CACHE = getattr(settings, "BCO_PORTAL_CACHE", "default")
+PORTAL_CACHE_TIMEOUT = getattr(settings, "BCO_PORTAL_CACHE_TIMEOUT", 3600)
+PORTAL_VERIFY_TIMEOUT = getattr(settings, "BCO_PORTAL_VERIFY_TIMEOUT", 5)
+
+class _Verification:
+    """A call to a portal that other threads can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = (False, "Portal verification did not finish.")
+
+class PortalTokenVerifier:
+    """Portal Token Verifier
+
+    Tokens of an issuer with a key in `keys` are verified locally, by their
+    signature and expiry. The key of an issuer is a dict with the `key`
+    (shared secret or PEM public key), the `algorithms` the key is used
+    with and an optional `audience`.
+
+    Other tokens are verified by the portal's `auth/verify/` endpoint. A
+    successful verification is kept, in a Django cache under the SHA-256
+    digest of the endpoint and token, until the `exp` claim of the token
+    and for `timeout` seconds at most. Failed verifications are not kept.
+    Concurrent requests of one worker process for the same endpoint and
+    token wait for a single call to the portal.
+
+    Parameters:
+    - keys (dict):
+        Verification keys by issuer.
+    - alias (str):
+        Alias of the Django cache to use. `None` disables the cache.
+    - timeout (int):
+        Longest time in seconds a verification is kept.
+    - request_timeout (float):
+        Seconds to wait for a portal.
+    """
+
+    def __init__(
+        self,
+        keys: dict=PORTAL_KEYS,
+        alias: str=PORTAL_CACHE,
+        timeout: int=PORTAL_CACHE_TIMEOUT,
+        request_timeout: float=PORTAL_VERIFY_TIMEOUT
+    ):
+        self.keys = keys
+        self.alias = alias
+        self.timeout = timeout
+        self.request_timeout = request_timeout
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.local = 0
+        self.hits = 0
+        self.misses = 0
+        self.remote_calls = 0
+        self.deduplicated = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias] if self.alias else None
+
+    def verify(
+        self, token: str, url: str, payload: dict=None, local: bool=True
+    ) -> tuple:
+        """Verify
+
+        Verifies a portal token, locally if the issuer in its `payload` has
+        a key, and otherwise with the portal's endpoint at `url`.
+
+        Parameters:
+        - token (str):
+            The portal token.
+        - url (str):
+            The full URL of the portal's verification endpoint.
+        - payload (dict):
+            The unverified claims of the token, if already decoded.
+        - local (bool):
+            Whether the token may be verified locally. Pass `False` when
+            the token must be valid for the portal at `url` rather than for
+            the issuer it names.
+
+        Returns:
+        - tuple:
+            Whether the token is valid, and the reason if it is not.
+        """
+
+        if payload is None:
+            try:
+                payload = jwt.decode(token, None, False)
+            except jwt.InvalidTokenError:
+                payload = {}
+        config = self.keys.get(payload.get("iss")) if local else None
+        if config is not None:
+            return self._verify_locally(token, config)
+        return self._verify_remotely(token, url, payload.get("exp"))
+
+    def _verify_locally(self, token: str, config: dict) -> tuple:
+        self.local += 1
+        try:
+            jwt.decode(
+                token,
+                config["key"],
+                algorithms=config.get("algorithms", ["HS256"]),
+                audience=config.get("audience"),
+            )
+        except jwt.InvalidTokenError as error:
+            return (False, f"{error}")
+        return (True, None)
+
+    def _verify_remotely(self, token: str, url: str, expires) -> tuple:
+        digest = sha256(f"{url} {token}".encode("utf-8")).hexdigest()
+        key = f"portal_tokens:{digest}"
+        if self.cache is not None and self.cache.get(key):
+            self.hits += 1
+            return (True, None)
+        self.misses += 1
+
+        with self._lock:
+            verification = self._in_flight.get(key)
+            leader = verification is None
+            if leader:
+                verification = self._in_flight[key] = _Verification()
+            else:
+                self.deduplicated += 1
+        if not leader:
+            verification.done.wait(self.request_timeout + 1)
+            return verification.result
+
+        try:
+            verification.result = self._call(token, url)
+            if verification.result[0]:
+                self._keep(key, expires)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            verification.done.set()
+        return verification.result
+
+    def _call(self, token: str, url: str) -> tuple:
+        self.remote_calls += 1
+        try:
+            response = requests.post(
+                url, json={"token": token}, timeout=self.request_timeout
+            )
+        except requests.RequestException as error:
+            return (False, f"{error}")
+        if response.status_code != 201:
+            return (False, response.reason)
+        return (True, None)
+
+    def _keep(self, key: str, expires):
+        if self.cache is None:
+            return
+        timeout = self.timeout
+        if isinstance(expires, (int, float)):
+            timeout = min(timeout, int(expires - time.time()))
+        if timeout > 0:
+            self.cache.set(key, True, timeout)
+
+    def stats(self) -> dict:
+        """Returns the verification counters of the current worker process."""
+
+        return {
+            "alias": self.alias,
+            "issuers_with_keys": sorted(self.keys),
+            "local": self.local,
+            "hits": self.hits,
+            "misses": self.misses,
+            "remote_calls": self.remote_calls,
+            "deduplicated": self.deduplicated,
+        }
+
+portal_verifier = PortalTokenVerifier()
@@ -15,16 +15,24 @@ def get_anon()-> User:
     """
     return User.objects.get(username="AnonymousUser")
 
+def get_identity_user(issuer: str, subject: str) -> User:
+    """Get Identity User
+
+    Returns the user an issuer and subject authenticate, with one indexed
+    query on the `Identity` table, or `None` if no account lists them.
+    """
+
+    return User.objects.filter(
+        identities__issuer=issuer, identities__subject=subject
+    ).first()
+
 def get_user_from_auth_token(token: str)-> User:
     """Get user from Auth Token
     """
     payload = jwt.decode(token, None, False)
 
     if payload['iss'] == 'https://orcid.org' or payload['iss'] == 'https://sandbox.orcid.org':
-        try:
-            return User.objects.get(username=Authentication.objects.get(auth_service__icontains=payload['sub']).username)
-        except User.DoesNotExist:
-            return None
+        return get_identity_user(payload['iss'], payload['sub'])
     if payload['iss'] == 'accounts.google.com':
         try:
             return User.objects.get(email=payload['email'])
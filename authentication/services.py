@@ -2,12 +2,17 @@
 
 import jwt
 import json
+import time
 import requests
 import jsonschema
+from hashlib import sha256
 from django.db import transaction
 from django.conf import settings
 from django.contrib.auth.models import User, Group
+from django.core.cache import caches
 from django.core.mail import send_mail
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from rest_framework import exceptions, status, serializers
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
@@ -16,13 +21,115 @@ from rest_framework_jwt.settings import api_settings
 from rest_framework_jwt.utils import jwt_get_secret_key
 from google.oauth2 import id_token
 from google.auth.transport import requests as g_requests
-from authentication.selectors import get_anon
-from authentication.models import Authentication, NewUser
+from authentication.jwks import JwksFetchError, jwks_cache
+from authentication.portal import portal_verifier
+from authentication.selectors import get_anon, get_identity_user
+from authentication.models import Authentication, Identity, NewUser
 
 ANON_KEY = settings.ANON_KEY
 
 jwt_decode_handler = api_settings.JWT_DECODE_HANDLER
 
+TOKEN_CACHE = getattr(settings, "BCO_TOKEN_CACHE", None)
+TOKEN_CACHE_TIMEOUT = getattr(settings, "BCO_TOKEN_CACHE_TIMEOUT", 60)
+
+class TokenUserCache:
+    """Token User Cache
+
+    Short-lived cache, in a Django cache, of the user each verified bearer
+    token authenticated, keyed by the SHA-256 digest of the token so the
+    tokens themselves are not stored. Repeated requests with the same token
+    skip the signature check or issuer call and the user lookup. An entry
+    lives `timeout` seconds at most and never past the `exp` claim of the
+    token.
+
+    Every entry is dropped, by moving on to the next generation of keys,
+    when a user, an identity or an `Authentication` object is changed or
+    deleted, so deactivated users and removed or reassigned identities stop
+    authenticating. The generation is only bumped in the cache of the
+    process making the change, so the cache must be shared by every worker
+    process and is disabled unless `BCO_TOKEN_CACHE` names one.
+
+    Parameters:
+    - alias (str):
+        Alias of the Django cache to use. `None` disables the cache.
+    - timeout (int):
+        Longest lifetime of an entry in seconds.
+    """
+
+    GENERATION_KEY = "token_users:generation"
+
+    def __init__(
+        self,
+        alias: str=TOKEN_CACHE,
+        timeout: int=TOKEN_CACHE_TIMEOUT
+    ):
+        self.alias = alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias] if self.alias else None
+
+    def _key(self, token: str) -> str:
+        generation = self.cache.get_or_set(self.GENERATION_KEY, 0, None)
+        digest = sha256(token.encode("utf-8")).hexdigest()
+        return f"token_users:{generation}:{digest}"
+
+    def get(self, token: str) -> User:
+        """Returns the user of a verified token, or `None` if not cached."""
+
+        if self.cache is None:
+            return None
+        user = self.cache.get(self._key(token))
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def set(self, token: str, user: User, expires: float=None):
+        """Caches the user of a verified token until `expires` at most."""
+
+        if self.cache is None:
+            return
+        timeout = self.timeout
+        if isinstance(expires, (int, float)):
+            timeout = min(timeout, int(expires - time.time()))
+        if timeout > 0:
+            self.cache.set(self._key(token), user, timeout)
+
+    def invalidate_all(self):
+        """Drop every entry by moving on to the next generation."""
+
+        if self.cache is None:
+            return
+        try:
+            self.cache.incr(self.GENERATION_KEY)
+        except ValueError:
+            self.cache.set(self.GENERATION_KEY, 1, None)
+
+    def stats(self) -> dict:
+        """Returns the hit and miss counts of the current worker process."""
+
+        return {
+            "alias": self.alias,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+token_cache = TokenUserCache()
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Identity)
+@receiver(post_delete, sender=Identity)
+@receiver(post_save, sender=Authentication)
+def _token_users_changed(sender, **kwargs):
+    token_cache.invalidate_all()
+
 class CustomJSONWebTokenAuthentication(BaseAuthentication):
     """
     Custom JSON Web Token Authentication class that supports different types 
@@ -48,6 +155,10 @@ class CustomJSONWebTokenAuthentication(BaseAuthentication):
                     user = get_anon()
                     return (user, token)
 
+                user = token_cache.get(token)
+                if user is not None:
+                    return (user, token)
+
                 try:
                     unverified_payload = jwt.decode(token, None, False)
                 except Exception as exp:
@@ -60,6 +171,7 @@ class CustomJSONWebTokenAuthentication(BaseAuthentication):
                 if unverified_payload['iss'] in ['http://localhost:8080', 'https://test.portal.biochemistry.gwu.edu', 'https://biocomputeobject.org']:
                     user = authenticate_portal(unverified_payload, token)
                 if user:
+                    token_cache.set(token, user, unverified_payload.get('exp'))
                     return (user, token)
                 else:
                     raise exceptions.AuthenticationFailed("Authentication failed. Token issuer not found. Please contact the site admin")
@@ -70,6 +182,8 @@ def authenticate_portal(payload: dict, token:str)-> User:
     """Authenticate Portal
 
     Authenticates a user for the BioCompute Portal using a JWT payload and token.
+    The token is verified locally when its issuer has a key in
+    `BCO_PORTAL_KEYS`, and otherwise by the portal, once per token.
     
     Args:
         payload (dict): The JWT payload.
@@ -82,16 +196,16 @@ def authenticate_portal(payload: dict, token:str)-> User:
         AuthenticationFailed: If the token verification fails or the user does not exist.
     """
 
-    response = requests.post(
-        payload['iss']+'/users/auth/verify/', json={"token":token}
+    verified, reason = portal_verifier.verify(
+        token, payload['iss']+'/users/auth/verify/', payload
     )
-    if response.status_code == 201:
+    if verified:
         try:
             return User.objects.get(email=payload['email'])
         except User.DoesNotExist:
             return None
     else:
-        raise exceptions.AuthenticationFailed(response.reason)
+        raise exceptions.AuthenticationFailed(reason)
 
 def validate_auth_service(value):
     """
@@ -149,23 +263,22 @@ def authenticate_orcid(payload:dict, token:str)-> User:
         found.
     """
 
-    orcid_jwks = {
-        jwk['kid']: json.dumps(jwk)
-        for jwk in requests.get(payload['iss']+'/oauth/jwks').json()['keys']
-    }
-    orcid_jwk = next(iter(orcid_jwks.values()))
-    orcid_key = jwt.algorithms.RSAAlgorithm.from_jwk(orcid_jwk)
+    try:
+        kid = jwt.get_unverified_header(token).get('kid')
+        orcid_key = jwks_cache.get_key(payload['iss'], kid)
+    except (jwt.InvalidTokenError, JwksFetchError) as exp:
+        raise exceptions.AuthenticationFailed(exp)
+    if orcid_key is None:
+        raise exceptions.AuthenticationFailed(
+            f"Unknown signing key for {payload['iss']}."
+        )
 
     try:
         jwt.decode(token, key=orcid_key, algorithms=['RS256'], audience=['APP-88DEA42BRILGEHKC', 'APP-ZQZ0BL62NV9SBWAX'])
     except Exception as exp:
         raise exceptions.AuthenticationFailed(exp)
 
-    try:
-        user = User.objects.get(username=Authentication.objects.get(auth_service__icontains=payload['sub']).username)
-    except (Authentication.DoesNotExist, User.DoesNotExist):
-        return None
-    return user
+    return get_identity_user(payload['iss'], payload['sub'])
 
 def authenticate_google(token: str) -> bool:
     """Authenticate Google
@@ -190,6 +303,9 @@ def authenticate_google(token: str) -> bool:
 def validate_token(token: str, url: str)-> bool:
     """Validate BCO Portal token
 
+    The portal at `url` is asked once per token; successful verifications
+    are cached until the token expires.
+
     Args:
         token (str): The authentication token to be validated.
         url (str): The base URL of the authentication service where the token will be verified.
@@ -198,17 +314,8 @@ def validate_token(token: str, url: str)-> bool:
         bool: True if the token is successfully validated (response status code 201), False otherwise.
     """
 
-    headers = {"Content-type": "application/json; charset=UTF-8",}
-
-    response = requests.post(
-        data=json.dumps({"token": token}, default=str),
-        headers=headers,
-        url=url+'auth/verify/',
-    )
-
-    if response.status_code != 201:
-        return False
-    return True
+    verified, _ = portal_verifier.verify(token, url+'auth/verify/', local=False)
+    return verified
 
 @transaction.atomic
 def send_new_user_email(user_info: dict) -> 0:
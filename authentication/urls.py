@@ -8,6 +8,7 @@ from authentication.apis import (
     RegisterUserNoVerificationAPI,
     AccountDescribeApi,
     AddAuthenticationApi,
+    AuthMetricsApi,
     RemoveAuthenticationApi,
     ResetTokenApi
 )
@@ -24,5 +25,6 @@ urlpatterns = [
     path("auth/register/", RegisterUserNoVerificationAPI.as_view()),
     path("auth/add/", AddAuthenticationApi.as_view()),
     path("auth/remove/", RemoveAuthenticationApi.as_view()),
-    path("auth/reset_token/", ResetTokenApi.as_view())
+    path("auth/reset_token/", ResetTokenApi.as_view()),
+    path("auth/metrics/", AuthMetricsApi.as_view())
 ]
\ No newline at end of file
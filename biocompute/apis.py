@@ -4,24 +4,37 @@
 """BioCompute Object APIs
 """
 
+import io
+import json
 import jsonref
 from biocompute.services import (
     BcoDraftSerializer,
     BcoValidator,
     ModifyBcoDraftSerializer,
     publish_draft,
-    bco_counter_increment
+    bco_counter_increment,
+    iter_bco_stream,
+    validate_bco,
+    validate_bco_batch,
+    validate_draft,
+    validation_cache,
+    validation_error_format,
+    validation_error_limit
 )
 from biocompute.selectors import (
     object_id_deconstructor,
     retrieve_bco,
+    user_can_create_drafts,
     user_can_modify_bco,
+    user_can_modify_bcos,
     user_can_publish_draft,
-    user_can_publish_prefix,
-    prefix_from_object_id,
-    get_authorized_bcos
+    user_can_publish_drafts,
+    user_can_convert_bco,
+    prefix_from_object_id
 )
 from biocompute.services import convert_to_ldh
+from biocompute.schemas import schema_registry
+from biocompute.telemetry import validation_telemetry
 from config.services import (
     legacy_api_converter,
     bulk_response_constructor,
@@ -32,10 +45,11 @@ from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from django.conf import settings
 from django.db import utils
-from prefix.selectors import user_can_draft_prefix
+from django.http import StreamingHttpResponse
+from prefix.selectors import user_can_publish_prefix
 from rest_framework import status
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from tests.fixtures.testing_bcos import BCO_000001_DRAFT, BCO_000000_DRAFT
 
@@ -74,6 +88,32 @@ BCO_DRAFT_SCHEMA = openapi.Schema(
         description="BCO Drafts to create.",
     )
 
+VALIDATION_MODE_PARAMETERS = [
+    openapi.Parameter(
+        "mode",
+        openapi.IN_QUERY,
+        description="Validation mode. `full` reports every error, `fast`"\
+            + " stops at the first error.",
+        type=openapi.TYPE_STRING,
+        enum=["full", "fast"],
+    ),
+    openapi.Parameter(
+        "max_errors",
+        openapi.IN_QUERY,
+        description="Stop validating a BCO after this many errors.",
+        type=openapi.TYPE_INTEGER,
+    ),
+    openapi.Parameter(
+        "errors",
+        openapi.IN_QUERY,
+        description="Error format. `legacy` reports message strings,"\
+            + " `structured` objects with a JSON pointer, schema keyword,"\
+            + " schema path and the offending value.",
+        type=openapi.TYPE_STRING,
+        enum=["legacy", "structured"],
+    ),
+]
+
 class DraftsCreateApi(APIView):
     """Create BCO Draft [Bulk Enabled]
 
@@ -130,10 +170,11 @@ class DraftsCreateApi(APIView):
                 ]
             )
         
+        draft_permissions = user_can_create_drafts(data, owner)
         for index, object in enumerate(data):
             response_id = object["contents"].get("object_id", index)
             bco_prefix = object.get("prefix", index)
-            prefix_permitted = user_can_draft_prefix(owner, bco_prefix)
+            prefix_permitted = draft_permissions[index]
 
             if prefix_permitted is None:
                 response_data.append(bulk_response_constructor(
@@ -197,7 +238,8 @@ class PublishBcoApi(APIView):
     API endpoint for publishing a BioCompute Object (BCO).
 
     This endpoint allows authenticated users to publish an individual BCO. 
-    The draft is validated and processed upon submission.
+    The draft is validated and processed upon submission. Validation stops
+    at the first error unless `?mode=full` or `?max_errors=N` is given.
     """
 
     permission_classes = [IsAuthenticated]
@@ -208,6 +250,7 @@ class PublishBcoApi(APIView):
     # )
     @swagger_auto_schema(
         operation_id="api_objects_publish",
+        manual_parameters=VALIDATION_MODE_PARAMETERS,
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             # properties=schema,
@@ -225,7 +268,19 @@ class PublishBcoApi(APIView):
         validator = BcoValidator()
         requester = request.user
         data = request.data
-        identifier, bco_results = validator.parse_and_validate(data).popitem()
+        try:
+            max_errors = validation_error_limit(
+                request.GET.get("mode", "fast"), request.GET.get("max_errors")
+            )
+            error_format = validation_error_format(request.GET.get("errors"))
+        except ValueError as error:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"message": str(error)}
+            )
+        identifier, bco_results = validate_bco(
+            data, validator, max_errors, error_format
+        ).popitem()
         prefix_name = prefix_from_object_id(identifier)
         publish_permission = user_can_publish_prefix(requester, prefix_name)
 
@@ -343,12 +398,15 @@ class DraftsPublishApi(APIView):
     can be performed for one or more drafts in a single request. Each draft is
     validated and processed independently, allowing for mixed response
     statuses (HTTP_207_MULTI_STATUS) in the case of bulk submissions.
+    Validation of each draft stops at its first error unless `?mode=full`
+    or `?max_errors=N` is given.
     """
 
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
         operation_id="api_objects_drafts_publish",
+        manual_parameters=VALIDATION_MODE_PARAMETERS,
         request_body=openapi.Schema(
             type=openapi.TYPE_ARRAY,
             title="Publish BCO Draft Schema",
@@ -394,6 +452,16 @@ class DraftsPublishApi(APIView):
         data = request.data
         rejected_requests = False
         accepted_requests = False
+        try:
+            max_errors = validation_error_limit(
+                request.GET.get("mode", "fast"), request.GET.get("max_errors")
+            )
+            error_format = validation_error_format(request.GET.get("errors"))
+        except ValueError as error:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"message": str(error)}
+            )
         if 'POST_api_objects_drafts_publish' in request.data:
             data = legacy_api_converter(request.data)
 
@@ -411,9 +479,15 @@ class DraftsPublishApi(APIView):
                 )]
             )
 
+        publish_permissions = user_can_publish_drafts(data, requester)
+        # Objects published earlier in this request are decided again.
+        published_ids = set()
         for index, object in enumerate(data):
             response_id = object.get("object_id", index)
-            bco_instance = user_can_publish_draft(object, requester)
+            bco_instance = publish_permissions[index]
+            if {object["object_id"], object.get("published_object_id")}\
+                    & published_ids:
+                bco_instance = user_can_publish_draft(object, requester)
 
             if bco_instance is None:
                 response_data.append(bulk_response_constructor(
@@ -470,7 +544,9 @@ class DraftsPublishApi(APIView):
                 rejected_requests = True
                 continue
 
-            bco_results = validator.parse_and_validate(bco_instance.contents)
+            bco_results = validate_draft(
+                bco_instance, validator, max_errors, error_format
+            )
 
             identifier, results = bco_results.popitem()
 
@@ -487,6 +563,7 @@ class DraftsPublishApi(APIView):
                     object=object
                 )
                 identifier = new_bco_instance.object_id
+                published_ids.update((object["object_id"], identifier))
                 accepted_requests = True
                 bco_status = "SUCCESS"
                 status_code = 200
@@ -582,9 +659,19 @@ class DraftsModifyApi(APIView):
                 ]
             )
 
+        modify_permissions = user_can_modify_bcos(
+            [object.get("object_id", index) for index, object in enumerate(data)],
+            requester
+        )
+        # A BCO modified earlier in this request may have new authorized users.
+        modified_ids = set()
         for index, object in enumerate(data):
             response_id = object.get("object_id", index)
-            modify_permitted = user_can_modify_bco(response_id, requester)
+            if response_id in modified_ids:
+                modify_permitted = user_can_modify_bco(response_id, requester)
+            else:
+                modify_permitted = modify_permissions[response_id]
+            modified_ids.add(response_id)
             
             if modify_permitted is None:
                 response_data.append(bulk_response_constructor(
@@ -663,7 +750,11 @@ class ValidateBcoApi(APIView):
 
     --------------------
 
-    Bulk operation to validate BCOs.
+    Bulk operation to validate BCOs. By default every error is reported;
+    `?mode=fast` stops each BCO at its first error and `?max_errors=N` after
+    N errors. `?errors=structured` reports each error as an object with the
+    JSON pointer to the offending value, the schema keyword, the schema path
+    and the value, instead of a message string.
 
     ```JSON
     [
@@ -678,6 +769,7 @@ class ValidateBcoApi(APIView):
     
     @swagger_auto_schema(
         operation_id="api_bco_validate",
+        manual_parameters=VALIDATION_MODE_PARAMETERS,
         request_body=openapi.Schema(
         type=openapi.TYPE_ARRAY,
         title="Validate BCO against Schema",
@@ -700,16 +792,26 @@ class ValidateBcoApi(APIView):
         tags=["BCO Management"],
     )
     def post(self, request):
-        validator = BcoValidator()
         response_data = []
         rejected_requests = False
         accepted_requests = True
         data = request.data
+        try:
+            max_errors = validation_error_limit(
+                request.GET.get("mode"), request.GET.get("max_errors")
+            )
+            error_format = validation_error_format(request.GET.get("errors"))
+        except ValueError as error:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"message": str(error)}
+            )
         if 'POST_validate_bco' in request.data:
             data = legacy_api_converter(data=request.data)
 
-        for index, object in enumerate(data):
-            bco_results = validator.parse_and_validate(bco=object)
+        for bco_results in validate_bco_batch(
+            data, max_errors=max_errors, error_format=error_format
+        ):
             identifier, results = bco_results.popitem()
 
             if results["number_of_errors"] > 0:
@@ -735,6 +837,148 @@ class ValidateBcoApi(APIView):
         status_code = response_status(accepted_requests, rejected_requests)
         return Response(status=status_code, data=response_data)
     
+class ValidateBcoStreamApi(APIView):
+    """Streaming Validate BCOs  [Bulk Enabled]
+
+    --------------------
+
+    Streaming variant of `objects/validate/` for very large submissions. The
+    request body is either a JSON array of BCOs or newline delimited JSON
+    (NDJSON, `Content-Type: application/x-ndjson`) with one BCO per line.
+    Each BCO is validated as soon as it has been read and its result is
+    streamed back straight away, so memory use does not grow with the size
+    of the batch.
+
+    Results use the same objects as `objects/validate/`, and the same
+    `mode`, `max_errors` and `errors` query parameters are accepted. They are returned
+    as NDJSON for NDJSON requests and as a JSON array otherwise. The HTTP
+    status is always 200 because it is sent before the first BCO is read;
+    each result carries its own `status_code`. A body that can not be parsed
+    ends the stream with a result whose `request_status` is "BAD REQUEST".
+
+    ```JSON
+    {...BCO CONTENTS...}
+    {...BCO CONTENTS...}
+    ```
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    swagger_schema = None
+
+    def post(self, request):
+        ndjson = "ndjson" in request.content_type
+        try:
+            max_errors = validation_error_limit(
+                request.GET.get("mode"), request.GET.get("max_errors")
+            )
+            error_format = validation_error_format(request.GET.get("errors"))
+        except ValueError as error:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"message": str(error)}
+            )
+        stream = request.stream
+        if stream is None:
+            stream = io.BytesIO()
+
+        def results():
+            validator = BcoValidator()
+            index = 0
+            try:
+                for bco in iter_bco_stream(stream):
+                    identifier, bco_results = validate_bco(
+                        bco, validator, max_errors, error_format
+                    ).popitem()
+                    if bco_results["number_of_errors"] > 0:
+                        response_object = bulk_response_constructor(
+                            identifier=identifier,
+                            status="FAILED",
+                            code=400,
+                            message="BCO not valid",
+                            data=bco_results
+                        )
+                    else:
+                        response_object = bulk_response_constructor(
+                            identifier=identifier,
+                            status="SUCCESS",
+                            code=200,
+                            message="BCO valid",
+                            data=bco_results
+                        )
+                    yield response_object
+                    index += 1
+            except ValueError as error:
+                yield bulk_response_constructor(
+                    identifier=index,
+                    status="BAD REQUEST",
+                    code=400,
+                    message=str(error)
+                )
+
+        def render():
+            if ndjson:
+                for response_object in results():
+                    yield json.dumps(response_object, default=str) + "\n"
+                return
+            separator = "["
+            for response_object in results():
+                yield separator + json.dumps(response_object, default=str)
+                separator = ",\n"
+            yield "[]" if separator == "[" else "]"
+
+        content_type = "application/x-ndjson" if ndjson else "application/json"
+        return StreamingHttpResponse(render(), content_type=content_type)
+
+class ValidationMetricsApi(APIView):
+    """Validation Metrics
+
+    --------------------
+
+    Validation counters of the worker process that answers the request,
+    for finding expensive schemas. `telemetry` has the time spent per
+    validation phase (`load`, `base`, `extension`, `score`) and per schema
+    URI, ordered by total time, and the number of errors per schema keyword.
+    The schema registry and validation result cache counters are included.
+    Only available to admin users.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_id="api_objects_validate_metrics",
+        manual_parameters=[
+            openapi.Parameter(
+                "top",
+                openapi.IN_QUERY,
+                description="Only list the `top` most expensive schemas.",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+        responses={
+            200: "Validation metrics.",
+            400: "Invalid `top`.",
+            403: "Invalid token or not an admin user.",
+        },
+        tags=["BCO Management"],
+    )
+
+    def get(self, request) -> Response:
+        top = request.GET.get("top")
+        try:
+            top = int(top) if top else None
+        except ValueError:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"message": f"Invalid top: {top}."}
+            )
+
+        return Response(status=status.HTTP_200_OK, data={
+            "telemetry": validation_telemetry.stats(top=top),
+            "schema_registry": schema_registry.stats(),
+            "validation_cache": validation_cache.stats(),
+        })
+
 class DraftRetrieveApi(APIView):
     """Get a draft object
 
@@ -939,9 +1183,9 @@ class ConverToLDH(APIView):
     curl -X GET "http://localhost:8000/api/objects/?contents=review&prefix=BCO&owner=tester&object_id=BCO" -H "accept: application/json"
     ```
 
-    This API view is accessible to any user without authentication requirements.
+    BCOs of public prefixes can be converted without authentication.
+    Authenticated users can also convert the BCOs they own or can view.
     """
-    authentication_classes = []
     permission_classes = [AllowAny]
 
     @swagger_auto_schema(
@@ -963,10 +1207,8 @@ class ConverToLDH(APIView):
     )
 
     def get(self, request):
-        authorized_bcos = get_authorized_bcos(request.user.id)
-        
         object_id = request.GET["object_id"]
-        if object_id in authorized_bcos:
+        if user_can_convert_bco(object_id, request.user):
             data  = convert_to_ldh(
                 object_id=object_id,
                 username=request.user.username
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+# biocompute/codegen.py
+
+"""Validator Code Generation
+
+Turns a `$ref`-resolved JSON Schema into plain Python checking functions.
+The generated validator reports the same errors, in the same order and
+with the same paths, as `jsonschema.Draft7Validator` without a format
+checker, which is how `BcoValidator` validates. Only the keywords used by
+the schemas in `config/schemas/` are generated; any other Draft 7 keyword
+raises `CodegenError` so the caller can fall back to `jsonschema`.
+"""
+
+import numbers
+import re
+import jsonschema
+
+# Draft 7 keywords that are ignored without a format checker.
+NOOP_KEYWORDS = {"format"}
+
+# Python expressions for the Draft 7 type checks, formatted with the name of
+# the checked variable.
+TYPE_CHECKS = {
+    "object": "isinstance({0}, dict)",
+    "array": "isinstance({0}, list)",
+    "string": "isinstance({0}, str)",
+    "boolean": "isinstance({0}, bool)",
+    "null": "{0} is None",
+    "number": "(isinstance({0}, _Number) and not isinstance({0}, bool))",
+    "integer": "((isinstance({0}, int) and not isinstance({0}, bool))"\
+        + " or (isinstance({0}, float) and {0}.is_integer()))",
+}
+
+# Keywords whose subschemas are validated through a separate function.
+DESCENDING_KEYWORDS = {
+    "properties", "items", "additionalProperties", "patternProperties"
+}
+
+class CodegenError(Exception):
+    """Raised when a schema uses a keyword the generator does not support."""
+
+class _ErrorLimit(Exception):
+    """Stops a generated validator once enough errors are collected."""
+
+class _LimitedErrors(list):
+    """Error list that stops validation when it reaches its limit."""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+
+    def append(self, error):
+        list.append(self, error)
+        if len(self) >= self.limit:
+            raise _ErrorLimit()
+
+def _unbool(element, true=object(), false=object()):
+    """Keep True and 1, and False and 0, apart as `jsonschema` does."""
+
+    if element is True:
+        return true
+    elif element is False:
+        return false
+    return element
+
+def _enum_ok(instance, enums) -> bool:
+    """Returns whether an instance is one of the values of an `enum`."""
+
+    if instance == 0 or instance == 1:
+        unbooled = _unbool(instance)
+        return any(unbooled == _unbool(each) for each in enums)
+    return instance in enums
+
+def _additional_message(extras: list, patterns: list=None) -> str:
+    """Returns the `additionalProperties: false` error message."""
+
+    if patterns is not None:
+        verb = "does" if len(extras) == 1 else "do"
+        joined = ", ".join(repr(each) for each in sorted(extras))
+        regexes = ", ".join(repr(each) for each in sorted(patterns))
+        return f"{joined} {verb} not match any of the regexes: {regexes}"
+    extras = sorted(extras, key=str)
+    verb = "was" if len(extras) == 1 else "were"
+    joined = ", ".join(repr(extra) for extra in extras)
+    return f"Additional properties are not allowed ({joined} {verb} unexpected)"
+
+def _flatten(path) -> tuple:
+    """Turns a `(parent, key, step)` linked path into a tuple of keys."""
+
+    keys = []
+    while path is not None:
+        path, key, _ = path
+        keys.append(key)
+    return tuple(reversed(keys))
+
+def _flatten_schema_path(path) -> tuple:
+    """Returns the schema keywords walked along a linked path."""
+
+    steps = []
+    while path is not None:
+        path, _, step = path
+        steps.append(step)
+    return tuple(part for step in reversed(steps) for part in step)
+
+def render_message(keyword: str, instance, param) -> str:
+    """Returns the `jsonschema` message of a generated validator error."""
+
+    if keyword == "type":
+        return f"{instance!r} is not of type {param}"
+    if keyword == "required":
+        return f"{param!r} is a required property"
+    if keyword == "additionalProperties":
+        return _additional_message(*param)
+    if keyword == "enum":
+        return f"{instance!r} is not one of {param!r}"
+    if keyword == "pattern":
+        return f"{instance!r} does not match {param!r}"
+    return f"False schema does not allow {instance!r}"
+
+def pointer(path) -> str:
+    """Returns the RFC 6901 JSON pointer for a tuple of keys."""
+
+    return "".join(
+        "/" + str(key).replace("~", "~0").replace("/", "~1") for key in path
+    )
+
+class ErrorDetail:
+    """Error Detail
+
+    One validation error. The instance path, schema path and message are
+    built from the raw error on first access, so errors that are only
+    counted, or only reported in one format, cost no string formatting.
+
+    Attributes:
+    - keyword (str):
+        The failing schema keyword, like `ValidationError.validator`.
+    - instance:
+        The offending value.
+    """
+
+    __slots__ = (
+        "keyword", "instance", "_param", "_path", "_linked", "_schema_path",
+        "_message"
+    )
+
+    def __init__(self, keyword, instance, param=None, path=(),
+            schema_path=None, message=None):
+        self.keyword = keyword
+        self.instance = instance
+        self._param = param
+        self._path = path
+        self._linked = False
+        self._schema_path = schema_path
+        self._message = message
+
+    @classmethod
+    def from_generated(cls, error: tuple):
+        """Wraps a raw `(path, keyword, instance, param)` error."""
+
+        path, keyword, instance, param = error
+        detail = cls(keyword, instance, param, path=path)
+        detail._linked = True
+        return detail
+
+    @property
+    def path(self) -> tuple:
+        """Keys and indexes leading to the instance, like `error.path`."""
+
+        if self._linked:
+            return _flatten(self._path)
+        return tuple(self._path)
+
+    @property
+    def schema_path(self) -> tuple:
+        """Schema keywords leading to the failing keyword."""
+
+        if self._schema_path is None:
+            linked = self._path if self._linked else None
+            self._schema_path = _flatten_schema_path(linked)\
+                + ((self.keyword,) if self.keyword else ())
+        return tuple(self._schema_path)
+
+    @property
+    def message(self) -> str:
+        """The `jsonschema` error message."""
+
+        if self._message is None:
+            self._message = render_message(
+                self.keyword, self.instance, self._param
+            )
+        return self._message
+
+    @property
+    def params(self) -> dict:
+        """The missing or unexpected properties, for the keywords that
+        report a property name rather than the value itself."""
+
+        if self.keyword == "required":
+            return {"property": self._param}
+        if self.keyword == "additionalProperties":
+            return {"properties": sorted(self._param[0], key=str)}
+        return None
+
+class _SchemaCompiler:
+    """Generates the source of one checking function per subschema.
+
+    Functions take `(instance, path, errors)`, where `path` is a
+    `(parent, key, schema step)` linked list, and append
+    `(path, keyword, instance, param)` tuples to `errors`. Paths and
+    messages are only built from these when an `ErrorDetail` is read. Subschemas
+    without descending keywords are inlined into their parent.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = {
+            "_Number": numbers.Number,
+            "_enum_ok": _enum_ok,
+        }
+        self._functions = {}
+        self._pending = []
+        self._schemas = []
+        self._counter = 0
+
+    def _name(self, prefix: str) -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+
+    def constant(self, value) -> str:
+        """Stores a value in the generated module and returns its name."""
+
+        name = self._name("_c")
+        self.namespace[name] = value
+        return name
+
+    def function_for(self, schema) -> str:
+        """Returns the name of the function checking a subschema."""
+
+        subject = getattr(schema, "__subject__", schema)
+        key = id(subject)
+        if key not in self._functions:
+            self._schemas.append(subject)
+            self._functions[key] = self._name("_check")
+            self._pending.append((self._functions[key], subject))
+        return self._functions[key]
+
+    def build(self, schema) -> str:
+        """Generates every function reachable from a schema.
+
+        Returns:
+        - str:
+            The name of the entry point function.
+        """
+
+        entry = self.function_for(schema)
+        while self._pending:
+            name, subschema = self._pending.pop()
+            body = self.block(subschema, "instance", "path", 1)
+            self.lines.append(f"def {name}(instance, path, errors):")
+            self.lines.extend(body or ["    pass"])
+            self.lines.append("")
+        return entry
+
+    def is_leaf(self, schema) -> bool:
+        if not isinstance(schema, dict):
+            return True
+        return not any(key in schema for key in DESCENDING_KEYWORDS)
+
+    def descend(self, schema, value: str, path: str, indent: int) -> list:
+        """Checks `value` against a subschema, inline or through a call."""
+
+        pad = "    " * indent
+        if schema is True or schema == {}:
+            return []
+        if self.is_leaf(schema):
+            name = self._name("v")
+            lines = self.block(schema, name, path, indent)
+            return [f"{pad}{name} = {value}"] + lines if lines else []
+        return [f"{pad}{self.function_for(schema)}({value}, {path}, errors)"]
+
+    def block(self, schema, var: str, path: str, indent: int) -> list:
+        """Returns the lines checking `var` against a (sub)schema."""
+
+        pad = "    " * indent
+        if schema is True:
+            return []
+        if schema is False:
+            return [f"{pad}errors.append(({path}, None, {var}, None))"]
+        if not isinstance(schema, dict):
+            raise CodegenError(f"Invalid schema: {schema!r}")
+        if "$ref" in schema:
+            raise CodegenError("Unresolved $ref")
+
+        lines = []
+        for keyword, value in schema.items():
+            if keyword not in jsonschema.Draft7Validator.VALIDATORS \
+                    or keyword in NOOP_KEYWORDS:
+                continue
+            emit = getattr(self, f"keyword_{keyword}", None)
+            if emit is None:
+                raise CodegenError(f"Unsupported keyword: {keyword}")
+            lines.extend(emit(value, schema, var, path, indent))
+        return lines
+
+    def keyword_type(self, types, schema, var, path, indent):
+        pad = "    " * indent
+        types = [types] if isinstance(types, str) else list(types)
+        for name in types:
+            if name not in TYPE_CHECKS:
+                raise CodegenError(f"Unsupported type: {name}")
+        checks = " or ".join(TYPE_CHECKS[name].format(var) for name in types)
+        reprs = ", ".join(repr(name) for name in types)
+        return [
+            f"{pad}if not ({checks}):",
+            f"{pad}    errors.append(({path}, 'type', {var}, {reprs!r}))",
+        ]
+
+    def keyword_properties(self, properties, schema, var, path, indent):
+        pad = "    " * indent
+        lines = []
+        for name, subschema in properties.items():
+            step = self.constant(("properties", name))
+            inner = self.descend(
+                subschema, f"{var}[{name!r}]", f"({path}, {name!r}, {step})",
+                indent + 2
+            )
+            if inner:
+                lines.append(f"{pad}    if {name!r} in {var}:")
+                lines.extend(inner)
+        if not lines:
+            return []
+        return [f"{pad}if isinstance({var}, dict):"] + lines
+
+    def keyword_required(self, required, schema, var, path, indent):
+        pad = "    " * indent
+        if not required:
+            return []
+        lines = [f"{pad}if isinstance({var}, dict):"]
+        for name in required:
+            lines.append(f"{pad}    if {name!r} not in {var}:")
+            lines.append(f"{pad}        errors.append(({path}, 'required', "\
+                + f"{var}, {name!r}))")
+        return lines
+
+    def keyword_additionalProperties(self, additional, schema, var, path,
+            indent):
+        pad = "    " * indent
+        if additional is True or (
+            not isinstance(additional, dict) and additional
+        ):
+            return []
+        properties = self.constant(frozenset(schema.get("properties", {})))
+        extras = self._name("extras")
+        key = self._name("key")
+        condition = f"{key} not in {properties}"
+        pattern_properties = schema.get("patternProperties", {})
+        patterns = "|".join(pattern_properties)
+        if patterns:
+            regex = self.constant(re.compile(patterns))
+            condition += f" and not {regex}.search({key})"
+        lines = [
+            f"{pad}if isinstance({var}, dict):",
+            f"{pad}    {extras} = [{key} for {key} in {var} if {condition}]",
+        ]
+        if isinstance(additional, dict):
+            step = self.constant(("additionalProperties",))
+            inner = self.descend(
+                additional, f"{var}[{key}]", f"({path}, {key}, {step})",
+                indent + 2
+            )
+            if inner:
+                lines.append(f"{pad}    for {key} in set({extras}):")
+                lines.extend(inner)
+            else:
+                lines.pop()
+            return lines if len(lines) > 1 else []
+
+        names = "None"
+        if "patternProperties" in schema:
+            names = self.constant(list(pattern_properties))
+        lines.append(f"{pad}    if {extras}:")
+        lines.append(f"{pad}        errors.append(({path}, "\
+            + f"'additionalProperties', {var}, ({extras}, {names})))")
+        return lines
+
+    def keyword_items(self, items, schema, var, path, indent):
+        pad = "    " * indent
+        index = self._name("index")
+        item = self._name("item")
+        if isinstance(items, list):
+            lines = []
+            for position, subschema in enumerate(items):
+                step = self.constant(("items", position))
+                inner = self.descend(
+                    subschema, f"{var}[{position}]",
+                    f"({path}, {position}, {step})", indent + 2
+                )
+                if inner:
+                    lines.append(f"{pad}    if len({var}) > {position}:")
+                    lines.extend(inner)
+            if not lines:
+                return []
+            return [f"{pad}if isinstance({var}, list):"] + lines
+
+        step = self.constant(("items",))
+        inner = self.descend(
+            items, item, f"({path}, {index}, {step})", indent + 2
+        )
+        if not inner:
+            return []
+        return [
+            f"{pad}if isinstance({var}, list):",
+            f"{pad}    for {index}, {item} in enumerate({var}):",
+        ] + inner
+
+    def keyword_patternProperties(self, pattern_properties, schema, var, path,
+            indent):
+        pad = "    " * indent
+        key = self._name("key")
+        value = self._name("value")
+        lines = []
+        for pattern, subschema in pattern_properties.items():
+            regex = self.constant(re.compile(pattern))
+            step = self.constant(("patternProperties", pattern))
+            inner = self.descend(
+                subschema, value, f"({path}, {key}, {step})", indent + 3
+            )
+            if inner:
+                lines.append(f"{pad}    for {key}, {value} in {var}.items():")
+                lines.append(f"{pad}        if {regex}.search({key}):")
+                lines.extend(inner)
+        if not lines:
+            return []
+        return [f"{pad}if isinstance({var}, dict):"] + lines
+
+    def keyword_enum(self, enums, schema, var, path, indent):
+        pad = "    " * indent
+        values = self.constant(enums)
+        return [
+            f"{pad}if not _enum_ok({var}, {values}):",
+            f"{pad}    errors.append(({path}, 'enum', {var}, {values}))",
+        ]
+
+    def keyword_pattern(self, pattern, schema, var, path, indent):
+        pad = "    " * indent
+        regex = self.constant(re.compile(pattern))
+        return [
+            f"{pad}if isinstance({var}, str) and not {regex}.search({var}):",
+            f"{pad}    errors.append(({path}, 'pattern', {var}, {pattern!r}))",
+        ]
+
+class GeneratedValidator:
+    """Generated Validator
+
+    Python checking functions generated from a resolved JSON Schema. Use in
+    place of a `jsonschema.Draft7Validator` through `errors`.
+
+    Parameters:
+    - schema (dict):
+        The `$ref`-resolved schema to generate the validator for.
+
+    Attributes:
+    - source (str):
+        The generated Python source, for inspection.
+
+    Raises:
+    - CodegenError:
+        If the schema uses a keyword the generator does not support.
+    """
+
+    def __init__(self, schema: dict):
+        compiler = _SchemaCompiler()
+        entry = compiler.build(schema)
+        self.schema = schema
+        self.source = "\n".join(compiler.lines)
+        namespace = compiler.namespace
+        exec(compile(self.source, "<generated validator>", "exec"), namespace)
+        self._check = namespace[entry]
+
+    def errors(self, instance, max_errors: int=None) -> list:
+        """Errors
+
+        Validates an instance and returns `(path, keyword, message)` tuples
+        in the order `jsonschema` reports them. `path` is a tuple of keys and
+        indexes, like `ValidationError.path`, and `keyword` the failing
+        schema keyword, like `ValidationError.validator`.
+
+        Parameters:
+        - instance:
+            The JSON value to validate.
+        - max_errors (int, optional):
+            Stop after this many errors.
+
+        Returns:
+        - list:
+            The errors found, empty if the instance is valid.
+        """
+
+        return [
+            (detail.path, detail.keyword, detail.message)
+            for detail in self.details(instance, max_errors)
+        ]
+
+    def details(self, instance, max_errors: int=None) -> list:
+        """Details
+
+        Validates an instance and returns an `ErrorDetail` per error, in
+        the order `jsonschema` reports them.
+
+        Parameters:
+        - instance:
+            The JSON value to validate.
+        - max_errors (int, optional):
+            Stop after this many errors.
+
+        Returns:
+        - list:
+            The errors found, empty if the instance is valid.
+        """
+
+        if max_errors is not None and max_errors < 1:
+            return []
+        errors = [] if max_errors is None else _LimitedErrors(max_errors)
+        try:
+            self._check(instance, None, errors)
+        except _ErrorLimit:
+            pass
+        return [ErrorDetail.from_generated(error) for error in errors]
+
+    def is_valid(self, instance) -> bool:
+        """Returns whether an instance is valid against the schema."""
+
+        return not self.errors(instance, max_errors=1)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# biocompute/management/commands/bco_acl.py
+
+"""BCO ACL
+
+Rebuilds or verifies the denormalized access control list of the BCOs
+(`acl_public` and `acl_users`) against the prefixes and the
+`authorized_users` table. Run it after changing prefixes or authorized
+users outside of the services, e.g. in the admin or a shell.
+
+    python manage.py bco_acl --verify
+"""
+
+from biocompute.selectors import bco_acl_mismatches
+from biocompute.services import rebuild_bco_acl
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the access control list of the BCOs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Only report the BCOs whose access control list is out "\
+                + "of date, and fail if there are any."
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Number of BCOs compared at a time (default: 1000)."
+        )
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            mismatches = 0
+            for object_id, stored, expected in bco_acl_mismatches(
+                options["batch_size"]
+            ):
+                mismatches += 1
+                self.stdout.write(
+                    f"{object_id}: stored {stored}, expected {expected}"
+                )
+            if mismatches:
+                raise CommandError(
+                    f"{mismatches} BCOs have an out of date access control "\
+                        + "list. Run `python manage.py bco_acl` to rebuild it."
+                )
+            self.stdout.write("Every BCO access control list is up to date.")
+            return
+
+        updated = rebuild_bco_acl(options["batch_size"])
+        self.stdout.write(f"Rebuilt the access control list of {len(updated)} BCOs.")
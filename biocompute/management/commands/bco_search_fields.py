@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# biocompute/management/commands/bco_search_fields.py
+
+"""BCO Search Fields
+
+Backfills or verifies the search fields of the BCOs (`name`, `version`,
+`created`, `license` and the keywords) against their contents, in batches.
+Run it after loading or changing BCOs outside of the services, e.g. with
+`loaddata`, in the admin or a shell.
+
+    python manage.py bco_search_fields --batch-size 5000
+"""
+
+from biocompute.selectors import search_field_mismatches
+from biocompute.services import rebuild_search_fields
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    help = "Backfill or verify the search fields of the BCOs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Only report the BCOs whose search fields are out of "\
+                + "date, and fail if there are any."
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Number of BCOs compared at a time (default: 1000)."
+        )
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            mismatches = 0
+            for object_id, stored, expected in search_field_mismatches(
+                options["batch_size"]
+            ):
+                mismatches += 1
+                self.stdout.write(
+                    f"{object_id}: stored {stored}, expected {expected}"
+                )
+            if mismatches:
+                raise CommandError(
+                    f"{mismatches} BCOs have out of date search fields. Run "\
+                        + "`python manage.py bco_search_fields` to rebuild "\
+                        + "them."
+                )
+            self.stdout.write("Every BCO has up to date search fields.")
+            return
+
+        updated = rebuild_search_fields(options["batch_size"])
+        self.stdout.write(f"Rebuilt the search fields of {len(updated)} BCOs.")
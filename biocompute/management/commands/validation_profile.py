@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# biocompute/management/commands/validation_profile.py
+
+"""Validation Profile
+
+Validates stored BCOs and reports where the time goes: per validation
+phase, per schema URI and the errors per schema keyword. Use it to find
+the expensive schemas without going through a worker's metrics endpoint.
+
+    python manage.py validation_profile --state PUBLISHED --top 10
+"""
+
+import json
+from biocompute.models import Bco
+from biocompute.services import BcoValidator
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = "Validate stored BCOs and report the time per phase and schema."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--state", choices=["DRAFT", "PUBLISHED"],
+            help="Only validate BCOs in this state."
+        )
+        parser.add_argument(
+            "--prefix", help="Only validate BCOs with this prefix."
+        )
+        parser.add_argument(
+            "--limit", type=int, help="Validate at most this many BCOs."
+        )
+        parser.add_argument(
+            "--top", type=int, default=10,
+            help="Number of schemas to list (default: 10)."
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the report as JSON."
+        )
+
+    def handle(self, *args, **options):
+        bcos = Bco.objects.exclude(state="DELETE").order_by("object_id")
+        if options["state"]:
+            bcos = bcos.filter(state=options["state"])
+        if options["prefix"]:
+            bcos = bcos.filter(prefix=options["prefix"].upper())
+        if options["limit"]:
+            bcos = bcos[:options["limit"]]
+
+        validator = BcoValidator()
+        invalid = 0
+        for contents in bcos.values_list("contents", flat=True).iterator():
+            _, results = validator.parse_and_validate(contents).popitem()
+            if results["number_of_errors"] > 0:
+                invalid += 1
+
+        report = validator.timings.as_dict()
+        report["invalid"] = invalid
+        report["schemas"] = dict(
+            list(report["schemas"].items())[:options["top"]]
+        )
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=4))
+            return
+
+        self.stdout.write(
+            f"Validated {report['objects']} BCOs, {invalid} invalid."
+        )
+        self.stdout.write(f"\n{'Phase':<24} {'Total ms':>11}")
+        for name, total in report["phases"].items():
+            self.stdout.write(f"{name:<24} {total:>11.3f}")
+        self.stdout.write(f"\n{'Total ms':>11}  Schema")
+        for uri, total in report["schemas"].items():
+            self.stdout.write(f"{total:>11.3f}  {uri}")
+        if report["error_keywords"]:
+            self.stdout.write(f"\n{'Keyword':<24} {'Errors':>11}")
+            for keyword, count in report["error_keywords"].items():
+                self.stdout.write(f"{str(keyword):<24} {count:>11}")
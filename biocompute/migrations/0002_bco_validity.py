@@ -0,0 +1,18 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biocompute', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bco',
+            name='validity',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+def build_acl(apps, schema_editor):
+    """Fills the access control list of the existing BCOs."""
+
+    Bco = apps.get_model('biocompute', 'Bco')
+    Prefix = apps.get_model('prefix', 'Prefix')
+    public = dict(Prefix.objects.values_list('prefix', 'public'))
+    users = {}
+    for bco_id, user_id in Bco.authorized_users.through.objects.order_by(
+        'user_id'
+    ).values_list('bco_id', 'user_id'):
+        users.setdefault(bco_id, []).append(user_id)
+    for object_id, prefix_id in Bco.objects.values_list(
+        'object_id', 'prefix_id'
+    ).iterator():
+        Bco.objects.filter(object_id=object_id).update(
+            acl_public=public.get(prefix_id, False),
+            acl_users=users.get(object_id, [])
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biocompute', '0002_bco_validity'),
+        ('prefix', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bco',
+            name='acl_public',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='bco',
+            name='acl_users',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(build_acl, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biocompute', '0003_bco_acl'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bco',
+            index=models.Index(fields=['last_update', 'object_id'], name='bco_last_update_idx'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 3.2.13 on 2026-10-18 11:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_search_fields(apps, schema_editor):
+    """Extracts the search fields and keywords of the existing BCOs."""
+
+    from biocompute.selectors import extract_search_fields
+
+    Bco = apps.get_model('biocompute', 'Bco')
+    BcoKeyword = apps.get_model('biocompute', 'BcoKeyword')
+    bcos = Bco.objects.order_by('object_id').values_list('object_id', 'contents')
+    last_id = None
+    while True:
+        batch = bcos if last_id is None else bcos.filter(object_id__gt=last_id)
+        batch = list(batch[:1000])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        keywords = []
+        for object_id, contents in batch:
+            fields = extract_search_fields(contents)
+            keywords.extend(
+                BcoKeyword(bco_id=object_id, keyword=keyword)
+                for keyword in fields.pop('keywords')
+            )
+            Bco.objects.filter(object_id=object_id).update(**fields)
+        BcoKeyword.objects.bulk_create(keywords)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biocompute', '0004_bco_last_update_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BcoKeyword',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='bco',
+            name='created',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bco',
+            name='license',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='bco',
+            name='name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='bco',
+            name='version',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='bco',
+            index=models.Index(fields=['name', 'object_id'], name='bco_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bco',
+            index=models.Index(fields=['version', 'object_id'], name='bco_version_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bco',
+            index=models.Index(fields=['created', 'object_id'], name='bco_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bco',
+            index=models.Index(fields=['license', 'object_id'], name='bco_license_idx'),
+        ),
+        migrations.AddField(
+            model_name='bcokeyword',
+            name='bco',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keywords', to='biocompute.bco'),
+        ),
+        migrations.AddIndex(
+            model_name='bcokeyword',
+            index=models.Index(fields=['keyword', 'bco'], name='bco_keyword_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bcokeyword',
+            constraint=models.UniqueConstraint(fields=('bco', 'keyword'), name='bco_keyword_unique'),
+        ),
+        migrations.RunPython(build_search_fields, migrations.RunPython.noop),
+    ]
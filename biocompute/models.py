@@ -41,6 +41,28 @@ class Bco(models.Model):
         Date Time object for the last database change to this object
     access_count: Int
         number of times this object has been downloaded
+    validity: JSONField
+        Per-domain validation record from the last validation of the draft
+        for publishing, used to revalidate only the domains that changed
+    acl_public: bool
+        Access control list: whether the prefix of the BCO is public
+    acl_users: JSONField
+        Access control list: sorted ids of the `authorized_users`. Together
+        with `owner` and `acl_public` it answers who can see the BCO from
+        the row alone. Maintained by the BioCompute and Prefix services and
+        rebuilt or verified with `python manage.py bco_acl`
+    name: str
+        Search field: the `provenance_domain.name` of the contents
+    version: str
+        Search field: the `provenance_domain.version` of the contents
+    created: DateTime
+        Search field: the `provenance_domain.created` of the contents, or
+        None if it is missing or not a date
+    license: str
+        Search field: the `provenance_domain.license` of the contents. The
+        search fields and the `keywords` are extracted from the contents
+        by the BioCompute services, indexed for searching and sorting, and
+        rebuilt or verified with `python manage.py bco_search_fields`
 
     """
 
@@ -70,7 +92,68 @@ class Bco(models.Model):
     score = models.IntegerField(default=0)
     last_update = models.DateTimeField()
     access_count = models.IntegerField(default=0)
+    validity = models.JSONField(default=dict, blank=True)
+    acl_public = models.BooleanField(default=False)
+    acl_users = models.JSONField(default=list, blank=True)
+    name = models.CharField(max_length=255, blank=True, default="")
+    version = models.CharField(max_length=100, blank=True, default="")
+    created = models.DateTimeField(null=True, blank=True)
+    license = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of search results, newest first.
+            models.Index(
+                fields=["last_update", "object_id"],
+                name="bco_last_update_idx"
+            ),
+            # Searches on and keyset pagination by the search fields.
+            models.Index(fields=["name", "object_id"], name="bco_name_idx"),
+            models.Index(
+                fields=["version", "object_id"], name="bco_version_idx"
+            ),
+            models.Index(
+                fields=["created", "object_id"], name="bco_created_idx"
+            ),
+            models.Index(
+                fields=["license", "object_id"], name="bco_license_idx"
+            ),
+        ]
 
     def __str__(self):
         """String for representing the BCO model (in Admin site etc.)."""
         return str(self.object_id)
+
+class BcoKeyword(models.Model):
+    """BCO Keyword Model.
+
+    A keyword of the `description_domain` of a BCO, extracted from its
+    contents with the search fields of the BCO.
+
+    Attributes:
+    -----------
+    bco: ForeignKey(Bco)
+        The BCO
+    keyword: str
+        The keyword
+    """
+
+    bco = models.ForeignKey(
+        Bco,
+        on_delete=models.CASCADE,
+        related_name="keywords"
+    )
+    keyword = models.CharField(max_length=255)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bco", "keyword"], name="bco_keyword_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["keyword", "bco"], name="bco_keyword_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.bco_id}: {self.keyword}"
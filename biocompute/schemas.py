@@ -0,0 +1,620 @@
+#!/usr/bin/env python3
+# biocompute/schemas.py
+
+"""BioCompute Schemas
+
+Process-wide registry of the JSON Schemas shipped in `config/schemas/`.
+Each schema file is loaded and `$ref`-resolved once per worker and the
+compiled `jsonschema.Draft7Validator` for it is kept, keyed by schema URI.
+With `BCO_VALIDATOR_CODEGEN` set, the registry compiles the shipped schemas
+into generated Python validators (see `biocompute.codegen`) instead.
+
+Extension schemas that are not shipped with the BCODB are resolved by an
+`ExtensionSchemaResolver`, which keeps a bounded number of fetched schemas
+in memory, persists those of trusted hosts in an on-disk cache directory and
+remembers failed URIs for a while.
+"""
+
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import jsonref
+import jsonschema
+import requests
+from biocompute.codegen import CodegenError, GeneratedValidator
+from collections import OrderedDict
+from hashlib import sha256
+from urllib.parse import urljoin, urlsplit
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+BASE_DIR = settings.BASE_DIR
+SCHEMA_DIR = getattr(
+    settings, "BCO_SCHEMA_DIR", os.path.join(BASE_DIR, "config", "schemas")
+)
+SCHEMA_CACHE_DIR = getattr(settings, "BCO_SCHEMA_CACHE_DIR", None)
+SCHEMA_CACHE_HOSTS = getattr(
+    settings,
+    "BCO_SCHEMA_CACHE_HOSTS",
+    ["raw.githubusercontent.com", "w3id.org", "www.w3id.org"]
+)
+SCHEMA_CACHE_ENTRIES = getattr(settings, "BCO_SCHEMA_CACHE_ENTRIES", 256)
+SCHEMA_FETCH_TIMEOUT = getattr(settings, "BCO_SCHEMA_FETCH_TIMEOUT", 5)
+SCHEMA_NEGATIVE_TTL = getattr(settings, "BCO_SCHEMA_NEGATIVE_TTL", 300)
+SCHEMA_OFFLINE = getattr(settings, "BCO_SCHEMA_OFFLINE", False)
+VALIDATOR_CODEGEN = getattr(settings, "BCO_VALIDATOR_CODEGEN", False)
+
+IEEE_2791_URI = "https://w3id.org/ieee/ieee-2791-schema/2791object.json"
+
+EXTENSION_URI_TEMPLATES = [
+    "https://raw.githubusercontent.com/biocompute-objects/extension_domain/"\
+        + "{version}/{name}/{name}_extension.json",
+    "http://www.w3id.org/biocompute/extension_domain/"\
+        + "{version}/{name}/{name}_extension.json",
+    "https://w3id.org/biocompute/extension_domain/"\
+        + "{version}/{name}/{name}_extension.json",
+]
+
+def build_schema_mapping(schema_dir: str=SCHEMA_DIR) -> dict:
+    """Build Schema Mapping
+
+    Maps the published URIs of the IEEE 2791 schema and of the versioned
+    extension schemas to the local copies in `schema_dir`. Extension schemas
+    are laid out as `<version>/<name>_extension.json` and are reachable both
+    through the GitHub raw URIs and the w3id URIs.
+
+    Parameters:
+    - schema_dir (str):
+        Directory holding the schema files.
+
+    Returns:
+    - dict:
+        Schema URI to absolute file path.
+    """
+
+    schema_mapping = {
+        IEEE_2791_URI: os.path.join(schema_dir, "2791", "2791object.json"),
+    }
+    extension_paths = sorted(
+        glob.glob(os.path.join(schema_dir, "*", "*_extension.json"))
+    )
+    for path in extension_paths:
+        version = os.path.basename(os.path.dirname(path))
+        name = os.path.basename(path)[:-len("_extension.json")]
+        for template in EXTENSION_URI_TEMPLATES:
+            uri = template.format(version=version, name=name)
+            schema_mapping[uri] = path
+
+    return schema_mapping
+
+class SchemaRegistry:
+    """Schema Registry
+
+    Loads every JSON Schema in the schema directory once per process and
+    keeps one compiled `Draft7Validator` per schema URI. Each schema is
+    reachable through the URIs from `build_schema_mapping` and through its
+    own `$id` when that `$id` is not already claimed by another file.
+
+    Parameters:
+    - schema_dir (str):
+        Directory holding the schema files.
+    - codegen (bool):
+        Compile schemas into `GeneratedValidator`s, falling back to
+        `Draft7Validator` for schemas the generator does not support.
+
+    Attributes:
+    - hits (int):
+        Number of validator lookups answered from the compiled cache.
+    - misses (int):
+        Number of validator lookups that had to compile a validator.
+    - version (int):
+        Incremented on every (re)load so that dependent caches can tell
+        which schema set they were built against.
+    - fingerprint (str):
+        SHA-256 of the schema files, stable across processes and restarts,
+        for records that are stored alongside a BCO.
+    """
+
+    def __init__(
+        self,
+        schema_dir: str=SCHEMA_DIR,
+        codegen: bool=VALIDATOR_CODEGEN
+    ):
+        self.schema_dir = schema_dir
+        self.codegen = codegen
+        self._lock = threading.RLock()
+        self._schemas = None
+        self._uri_paths = {}
+        self._validators = {}
+        self._reload_callbacks = []
+        self.hits = 0
+        self.misses = 0
+        self.version = 0
+        self.fingerprint = None
+        self.loaded_at = None
+
+    def _load(self):
+        """Load and `$ref`-resolve every schema file in the schema directory.
+        """
+
+        schemas = {}
+        digest = sha256()
+        uri_paths = build_schema_mapping(self.schema_dir)
+        paths = sorted(
+            glob.glob(os.path.join(self.schema_dir, "**", "*.json"),
+            recursive=True)
+        )
+        for path in paths:
+            with open(path, "rb") as schema_file:
+                digest.update(os.path.relpath(path, self.schema_dir).encode())
+                digest.update(schema_file.read())
+            schema = jsonref.load_uri(f"file://{path}")
+            schemas[path] = schema
+            schema_id = schema.get("$id")
+            if schema_id and schema_id not in uri_paths:
+                uri_paths[schema_id] = path
+
+        self._schemas = schemas
+        self._uri_paths = uri_paths
+        self._validators = {}
+        self.fingerprint = digest.hexdigest()
+        self.version += 1
+        self.loaded_at = timezone.now()
+
+    def _compile(self, schema: dict):
+        """Compile a resolved schema into a validator."""
+
+        if self.codegen:
+            try:
+                return GeneratedValidator(schema)
+            except CodegenError:
+                pass
+        return jsonschema.Draft7Validator(schema)
+
+    def _ensure_loaded(self):
+        if self._schemas is None:
+            with self._lock:
+                if self._schemas is None:
+                    self._load()
+
+    def reload(self):
+        """Reload
+
+        Drops every loaded schema and compiled validator, reloads the schema
+        directory and notifies the registered reload callbacks.
+        """
+
+        with self._lock:
+            self._load()
+            self.hits = 0
+            self.misses = 0
+        for callback in list(self._reload_callbacks):
+            callback(self)
+
+    def on_reload(self, callback):
+        """Register a callable to be invoked with the registry after a reload.
+        """
+
+        self._reload_callbacks.append(callback)
+        return callback
+
+    def __contains__(self, schema_uri: str) -> bool:
+        self._ensure_loaded()
+        return schema_uri in self._uri_paths
+
+    def uris(self) -> list:
+        """Return every schema URI known to the registry."""
+
+        self._ensure_loaded()
+        return list(self._uri_paths)
+
+    def get_schema(self, schema_uri: str) -> dict:
+        """Get Schema
+
+        Returns the resolved schema for a URI, or `None` if the URI is not
+        served by the registry.
+        """
+
+        self._ensure_loaded()
+        path = self._uri_paths.get(schema_uri)
+        if path is None:
+            return None
+        return self._schemas[path]
+
+    def get_validator(self, schema_uri: str):
+        """Get Validator
+
+        Returns the compiled validator for a URI, compiling it on first use.
+        Returns `None` if the URI is not served by the registry.
+        """
+
+        self._ensure_loaded()
+        path = self._uri_paths.get(schema_uri)
+        if path is None:
+            return None
+
+        validator = self._validators.get(path)
+        if validator is not None:
+            self.hits += 1
+            return validator
+
+        with self._lock:
+            validator = self._validators.get(path)
+            if validator is None:
+                self.misses += 1
+                validator = self._compile(self._schemas[path])
+                self._validators[path] = validator
+            else:
+                self.hits += 1
+        return validator
+
+    def get_domain_validators(self, schema_uri: str):
+        """Get Domain Validators
+
+        Splits a BCO schema into its top-level domains. Each property of the
+        schema whose subschema is a sibling file, e.g. `io_domain.json` next
+        to `2791object.json`, gets that file's compiled validator. The rest
+        of the schema (required domains, `object_id`, `etag`, ...) is
+        compiled into an envelope validator that accepts any domain value.
+
+        Returns:
+        - tuple:
+            The envelope validator and a dict of domain name to validator,
+            or `None` if the URI is not served by the registry.
+        """
+
+        self._ensure_loaded()
+        path = self._uri_paths.get(schema_uri)
+        if path is None:
+            return None
+
+        key = (path, "domains")
+        domain_validators = self._validators.get(key)
+        if domain_validators is not None:
+            return domain_validators
+
+        with self._lock:
+            schema = self._schemas[path]
+            base_uri = schema.get("$id", schema_uri)
+            domains = {}
+            envelope_properties = {}
+            for name, subschema in schema.get("properties", {}).items():
+                domain_uri = urljoin(base_uri, f"{name}.json")
+                if domain_uri in self._uri_paths:
+                    domains[name] = self.get_validator(domain_uri)
+                    envelope_properties[name] = {}
+                else:
+                    envelope_properties[name] = subschema
+            envelope = dict(schema, properties=envelope_properties)
+            domain_validators = (self._compile(envelope), domains)
+            self._validators[key] = domain_validators
+        return domain_validators
+
+    def stats(self) -> dict:
+        """Stats
+
+        Returns the registry counters for the current worker process.
+        """
+
+        return {
+            "pid": os.getpid(),
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "codegen": self.codegen,
+            "loaded_at": self.loaded_at,
+            "schemas": len(self._schemas or {}),
+            "uris": len(self._uri_paths),
+            "validators": len(self._validators),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+schema_registry = SchemaRegistry()
+
+class SchemaFetchError(Exception):
+    """Raised when a remote schema can not be fetched or parsed."""
+
+class LRUCache:
+    """LRU Cache
+
+    Thread-safe mapping that keeps at most `max_entries` items and evicts
+    the least recently used one when it is full.
+
+    Parameters:
+    - max_entries (int):
+        Number of items kept.
+    """
+
+    def __init__(self, max_entries: int=SCHEMA_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class ExtensionSchemaResolver:
+    """Extension Schema Resolver
+
+    Resolves schema URIs to compiled validators. URIs served by the schema
+    registry are answered from it. Any other URI is looked up, in order, in
+    the in-memory cache, the negative cache, the on-disk cache directory and
+    finally, unless the resolver is offline, fetched over HTTP with a
+    timeout. A failed URI is not retried until its negative cache entry
+    expires.
+
+    The URIs come from the BCOs being validated, so the in-memory caches
+    keep the `max_entries` most recently used URIs each, and only documents
+    from `cache_hosts` are written to the cache directory. `file://` URIs
+    are rejected unless `local_files` is set.
+
+    Parameters:
+    - registry (SchemaRegistry):
+        Registry for the schemas shipped with the BCODB.
+    - cache_dir (str, optional):
+        Directory for fetched schema documents. Nothing is written to disk
+        when it is `None`.
+    - timeout (float):
+        Seconds to wait for a remote schema.
+    - negative_ttl (float):
+        Seconds a failed URI is remembered before it is retried.
+    - offline (bool):
+        Never go to the network; only the registry and the cache directory
+        are used.
+    - cache_hosts (list):
+        Hosts whose schema documents are kept in the cache directory.
+    - max_entries (int):
+        Number of URIs kept in each in-memory cache.
+    - local_files (bool):
+        Load `file://` URIs from the local file system.
+    """
+
+    URI_LOCKS = 64
+
+    def __init__(
+        self,
+        registry: SchemaRegistry=None,
+        cache_dir: str=SCHEMA_CACHE_DIR,
+        timeout: float=SCHEMA_FETCH_TIMEOUT,
+        negative_ttl: float=SCHEMA_NEGATIVE_TTL,
+        offline: bool=SCHEMA_OFFLINE,
+        cache_hosts: list=SCHEMA_CACHE_HOSTS,
+        max_entries: int=SCHEMA_CACHE_ENTRIES,
+        local_files: bool=False
+    ):
+        self.registry = registry if registry is not None else schema_registry
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.negative_ttl = negative_ttl
+        self.offline = offline
+        self.cache_hosts = set(cache_hosts or [])
+        self.local_files = local_files
+        self._uri_locks = [threading.Lock() for _ in range(self.URI_LOCKS)]
+        self._documents = LRUCache(max_entries)
+        self._schemas = LRUCache(max_entries)
+        self._validators = LRUCache(max_entries)
+        self._failures = LRUCache(max_entries)
+        self.fetches = 0
+
+    def _cache_path(self, uri: str) -> str:
+        digest = sha256(uri.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _cacheable(self, uri: str) -> bool:
+        """Whether documents of the URI are kept in the cache directory."""
+
+        if self.cache_dir is None:
+            return False
+        try:
+            return urlsplit(uri).hostname in self.cache_hosts
+        except ValueError:
+            return False
+
+    def _uri_lock(self, uri: str) -> threading.Lock:
+        return self._uri_locks[hash(uri) % self.URI_LOCKS]
+
+    def _read_cache(self, uri: str):
+        if not self._cacheable(uri):
+            return None
+        try:
+            with open(self._cache_path(uri), "r", encoding="utf-8") as cached:
+                return json.load(cached)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, uri: str, document):
+        if not self._cacheable(uri):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(handle, "w", encoding="utf-8") as temp_file:
+            json.dump(document, temp_file)
+        os.replace(temp_path, self._cache_path(uri))
+
+    def _load_file(self, uri: str):
+        if not self.local_files:
+            raise SchemaFetchError("Local schema files are not allowed.")
+        try:
+            with open(uri[len("file://"):], "r", encoding="utf-8") as local:
+                return json.load(local)
+        except OSError as error:
+            raise SchemaFetchError(f"{error.strerror}.") from error
+        except ValueError as error:
+            raise SchemaFetchError("JSON Decode Error.") from error
+
+    def _fetch(self, uri: str):
+        if self.offline:
+            raise SchemaFetchError("Offline and not in the schema cache.")
+        self.fetches += 1
+        try:
+            response = requests.get(uri, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except requests.Timeout as error:
+            raise SchemaFetchError("Connection timed out.") from error
+        except requests.ConnectionError as error:
+            raise SchemaFetchError("Connection Error.") from error
+        except requests.RequestException as error:
+            raise SchemaFetchError(f"{error}") from error
+        except ValueError as error:
+            raise SchemaFetchError("JSON Decode Error.") from error
+
+    def load_document(self, uri: str):
+        """Load Document
+
+        Returns the raw JSON document for a URI without resolving its
+        `$ref`s. Also used as the `jsonref` loader, so that referenced
+        documents go through the same caches.
+
+        Raises:
+        - SchemaFetchError: If the document can not be loaded.
+        """
+
+        uri = uri.split("#")[0]
+        if uri.startswith("file://"):
+            return self._load_file(uri)
+
+        document = self._documents.get(uri)
+        if document is not None:
+            return document
+
+        with self._uri_lock(uri):
+            document = self._documents.get(uri)
+            if document is not None:
+                return document
+
+            failure = self._failures.get(uri)
+            if failure is not None:
+                expires, reason = failure
+                if time.monotonic() < expires:
+                    raise SchemaFetchError(reason)
+                self._failures.pop(uri)
+
+            document = self._read_cache(uri)
+            if document is None:
+                try:
+                    document = self._fetch(uri)
+                except SchemaFetchError as error:
+                    self._failures[uri] = (
+                        time.monotonic() + self.negative_ttl, str(error)
+                    )
+                    raise
+                self._write_cache(uri, document)
+
+            self._documents[uri] = document
+            return document
+
+    def get_schema(self, uri: str) -> dict:
+        """Get Schema
+
+        Returns the `$ref`-resolved schema for a URI.
+
+        Raises:
+        - SchemaFetchError: If the schema can not be loaded.
+        """
+
+        schema = self.registry.get_schema(uri)
+        if schema is not None:
+            return schema
+
+        schema = self._schemas.get(uri)
+        if schema is not None:
+            return schema
+
+        document = self.load_document(uri)
+        try:
+            schema = jsonref.JsonRef.replace_refs(
+                document, base_uri=uri, loader=self.load_document
+            )
+        except TypeError as error:
+            raise SchemaFetchError("Invalid format.") from error
+        self._schemas[uri] = schema
+        return schema
+
+    def get_validator(self, uri: str):
+        """Get Validator
+
+        Returns the compiled validator for a URI, or `None` if the schema can
+        not be loaded.
+        """
+
+        validator = self.registry.get_validator(uri)
+        if validator is not None:
+            return validator
+
+        validator = self._validators.get(uri)
+        if validator is not None:
+            return validator
+
+        try:
+            schema = self.get_schema(uri)
+        except SchemaFetchError:
+            return None
+        validator = jsonschema.Draft7Validator(schema)
+        self._validators[uri] = validator
+        return validator
+
+    def failure_reason(self, uri: str) -> str:
+        """Returns why a URI is in the negative cache, or `None`."""
+
+        failure = self._failures.get(uri)
+        if failure is None:
+            return None
+        return failure[1]
+
+    def clear(self):
+        """Forget every in-memory schema, validator and failure."""
+
+        self._documents.clear()
+        self._schemas.clear()
+        self._validators.clear()
+        self._failures.clear()
+
+def get_schema_resolver() -> ExtensionSchemaResolver:
+    """Get Schema Resolver
+
+    Returns the process-wide resolver. The class is taken from the
+    `BCO_SCHEMA_RESOLVER` setting so that deployments can plug in their own.
+    """
+
+    global _schema_resolver
+
+    if _schema_resolver is None:
+        resolver_class = import_string(getattr(
+            settings,
+            "BCO_SCHEMA_RESOLVER",
+            "biocompute.schemas.ExtensionSchemaResolver"
+        ))
+        _schema_resolver = resolver_class()
+    return _schema_resolver
+
+_schema_resolver = None
@@ -6,16 +6,16 @@ Functions to query the database related to BioCompute Objects
 """
 
 import pytz
-from biocompute.models import Bco
-from datetime import datetime
+from biocompute.models import Bco, BcoKeyword
+from datetime import datetime, time
 from django.conf import settings
 from django.contrib.auth. models import User
 from django.db.models import Q
-from prefix.selectors import (
-    user_can_view_prefix,
-    user_can_modify_prefix,
-    user_can_publish_prefix
-)
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.utils.dateparse import parse_date, parse_datetime
+from prefix.models import Prefix
+from prefix.selectors import get_permission_resolver, request_scope
 
 def datetime_converter(input_date):
     """Datetime converter
@@ -74,6 +74,177 @@ def prefix_from_object_id(object_id: str) -> str:
             + "format and the prefix cannot be extracted."
         )
 
+def user_authorized_bcos(object_ids, user: User) -> set:
+    """Authorized BCOs
+
+    Returns which of the BCOs list the user in their `authorized_users`.
+    Membership is answered with one query on the `authorized_users` table,
+    which is indexed by BCO and user, instead of loading every authorized
+    user of each BCO. Within a request the answers are kept per user and
+    BCO, so repeated checks of the same BCOs do not query again, until the
+    `authorized_users` of a BCO change.
+
+    Parameters:
+    - object_ids (iterable):
+        The unique identifiers of the BCOs.
+    - user (User):
+        The user to look up.
+
+    Returns:
+    - set:
+        The object IDs of the BCOs the user is authorized for.
+    """
+
+    if user.pk is None:
+        return set()
+    object_ids = set(object_ids)
+    memo = request_scope("bco_authorizations")
+    if memo is None:
+        unknown = object_ids
+    else:
+        unknown = {
+            object_id for object_id in object_ids
+            if (user.pk, object_id) not in memo
+        }
+
+    if unknown:
+        found = set(Bco.authorized_users.through.objects.filter(
+            bco_id__in=unknown, user_id=user.pk
+        ).values_list("bco_id", flat=True))
+        if memo is None:
+            return found
+        for object_id in unknown:
+            memo[(user.pk, object_id)] = object_id in found
+
+    return {object_id for object_id in object_ids if memo[(user.pk, object_id)]}
+
+@receiver(m2m_changed, sender=Bco.authorized_users.through)
+def _authorized_users_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        memo = request_scope("bco_authorizations")
+        if memo is not None:
+            memo.clear()
+
+def user_can_create_drafts(objects: list, user: User) -> list:
+    """Create Drafts
+
+    Batch form of `user_can_draft_prefix` for the objects of a bulk draft
+    create request, answered from the user's `PrefixPermissionResolver`.
+
+    Parameters:
+    - objects (list):
+        The draft objects of the request, each with a `prefix`.
+    - user (User):
+        The user creating the drafts.
+
+    Returns:
+    - list:
+        Per object, `True` if the user can draft BCOs with its prefix,
+        `False` if not and `None` if the prefix does not exist.
+    """
+
+    resolver = get_permission_resolver(user)
+    return [
+        resolver.can("add", object.get("prefix", index))
+        for index, object in enumerate(objects)
+    ]
+
+def _published_object_id(object_id: str, version: str) -> str:
+    """Returns the published object ID of a draft for a version."""
+
+    draft_deconstructed = object_id_deconstructor(object_id)
+    draft_deconstructed[-1] = version
+    return '/'.join(draft_deconstructed[1:])
+
+def _publish_decision(object: dict, user: User, bcos: dict, resolver):
+    """Decides one object of `user_can_publish_drafts` from loaded BCOs."""
+
+    draft_deconstructed = object_id_deconstructor(object["object_id"])
+    published_deconstructed = []
+    if "published_object_id" in object:
+        published_deconstructed = object_id_deconstructor(
+            object["published_object_id"]
+        )
+        if published_deconstructed[-2] != draft_deconstructed[-2]:
+            return published_deconstructed[-2], draft_deconstructed[-2]
+
+        published_object = bcos.get(object["published_object_id"])
+        if published_object is not None:
+            return published_object
+
+    bco_instance = bcos.get(object["object_id"])
+    if bco_instance is None:
+        return None
+
+    version = bco_instance.contents['provenance_domain']['version']
+    if len(published_deconstructed) == 6:
+        if version != published_deconstructed[-1]:
+            message = f"BCO version, {version}, does not match "\
+                + f"`published_object_id`, {published_deconstructed[0]}"
+            return message
+    else:
+        published_object = bcos.get(
+            _published_object_id(object["object_id"], version)
+        )
+        if published_object is not None:
+            return published_object
+
+    if bco_instance.owner_id == user.username:
+        return bco_instance
+
+    publish_permission = resolver.can(
+        "publish", prefix_from_object_id(object["object_id"])
+    )
+    if publish_permission is False:
+        return publish_permission
+
+    return bco_instance
+
+def user_can_publish_drafts(objects: list, user: User) -> list:
+    """Publish Drafts
+
+    Batch form of `user_can_publish_draft` for the objects of a bulk publish
+    request. The drafts, the requested published objects and the published
+    versions the drafts would get are loaded with two queries, and the
+    prefix permissions come from the user's `PrefixPermissionResolver`.
+
+    Parameters:
+    - objects (list):
+        The publish objects of the request, each with an `object_id` and
+        optionally a `published_object_id`.
+    - user (User):
+        The user publishing the drafts.
+
+    Returns:
+    - list:
+        The `user_can_publish_draft` result for each object.
+    """
+
+    object_ids = set()
+    for object in objects:
+        object_ids.add(object["object_id"])
+        if "published_object_id" in object:
+            object_ids.add(object["published_object_id"])
+    bcos = Bco.objects.in_bulk(object_ids)
+
+    published_ids = set()
+    for object in objects:
+        bco_instance = bcos.get(object["object_id"])
+        if bco_instance is not None and "published_object_id" not in object:
+            try:
+                version = bco_instance.contents['provenance_domain']['version']
+            except (KeyError, TypeError):
+                continue
+            published_ids.add(_published_object_id(object["object_id"], version))
+    published_ids -= bcos.keys()
+    if published_ids:
+        bcos.update(Bco.objects.in_bulk(published_ids))
+
+    resolver = get_permission_resolver(user)
+    return [
+        _publish_decision(object, user, bcos, resolver) for object in objects
+    ]
+
 def user_can_publish_draft(object: dict, user:User) -> Bco:
     """Publish Draft BCO
 
@@ -99,57 +270,44 @@ def user_can_publish_draft(object: dict, user:User) -> Bco:
          otherwise. Returns `None` if the specified BCO does not exist.
     """
 
-    draft_deconstructed = object_id_deconstructor(object["object_id"])
-    published_deconstructed = []
-    if "published_object_id" in object:
-        published_deconstructed = object_id_deconstructor(
-            object["published_object_id"]
-        )
-        if published_deconstructed[-2] != draft_deconstructed[-2]:
-            return published_deconstructed[-2], draft_deconstructed[-2]
-        
-        try:
-            published_object = Bco.objects.get(
-                object_id=object["published_object_id"]
-            )
-            return published_object
-        except Bco.DoesNotExist:
-            pass
+    return user_can_publish_drafts([object], user)[0]
 
-    try:
-        bco_instance = Bco.objects.get(object_id=object["object_id"])
-        version = bco_instance.contents['provenance_domain']['version']
-        if len(published_deconstructed) == 6:
-            version = \
-                bco_instance.contents['provenance_domain']['version']
-            if version != published_deconstructed[-1]:
-                message = f"BCO version, {version}, does not match "\
-                    + f"`published_object_id`, {published_deconstructed[0]}"
-                return message
-        else:
-            draft_deconstructed[-1] = version
-            published_object_id = '/'.join(draft_deconstructed[1:])
-            try:
-                published_object = Bco.objects.get(
-                    object_id=published_object_id
-                )
-                return published_object
-            except Bco.DoesNotExist:
-                pass
+def user_can_modify_bcos(object_ids: list, user: User) -> dict:
+    """Modify BCOs
 
-        if bco_instance.owner == user:
-            return bco_instance
+    Batch form of `user_can_modify_bco` for the objects of a bulk modify
+    request. The BCOs and the user's authorizations for them are loaded
+    with two queries, and the prefix permissions come from the user's
+    `PrefixPermissionResolver`.
 
-    except Bco.DoesNotExist:
-        return None
+    Parameters:
+    - object_ids (list):
+        The unique identifiers of the BCOs.
+    - user (User):
+        The user whose modification permissions are being verified.
 
-    publish_permission = user_can_publish_prefix(
-        user, prefix_from_object_id(object["object_id"])
-    )
-    if publish_permission is False:
-        return publish_permission
+    Returns:
+    - dict:
+        The `user_can_modify_bco` result by object ID.
+    """
 
-    return bco_instance
+    existing = set(Bco.objects.filter(
+        object_id__in=object_ids
+    ).values_list("object_id", flat=True))
+    authorized = user_authorized_bcos(existing, user)
+    resolver = get_permission_resolver(user)
+
+    permissions = {}
+    for object_id in object_ids:
+        if object_id not in existing:
+            permissions[object_id] = None
+        elif object_id in authorized:
+            permissions[object_id] = True
+        else:
+            permissions[object_id] = resolver.can(
+                "change", prefix_from_object_id(object_id)
+            )
+    return permissions
 
 def user_can_modify_bco(object_id: str, user:User) -> bool:
     """Modify BCO
@@ -176,21 +334,227 @@ def user_can_modify_bco(object_id: str, user:User) -> bool:
         `True` if the user is authorized to modify the specified BCO,
         `False` otherwise. Returns `None` if the specified BCO does not exist.
     """
+
+    return user_can_modify_bcos([object_id], user)[object_id]
     
-    try:
-        bco_instance = Bco.objects.get(object_id=object_id)
-    except Bco.DoesNotExist:
-        return None
-    
-    if user in bco_instance.authorized_users.all():
+def user_can_view_bco(bco_instance: Bco, user: User) -> bool:
+    """View BCO
+
+    Determines if a user can view a BCO from its access control list: the
+    user is listed in `acl_users`, the prefix is public (`acl_public`) or,
+    only when neither holds, the user has the 'view' permission for the
+    prefix. Needs no query for authorized users and public prefixes.
+
+    Parameters:
+    - bco_instance (Bco):
+        The BCO to check.
+    - user (User):
+        The user whose view permission is being verified.
+
+    Returns:
+    - bool:
+        `True` if the user can view the BCO, `False` otherwise.
+    """
+
+    if user.pk is not None and user.pk in bco_instance.acl_users:
         return True
-    
-    view_permission = user_can_modify_prefix(
-        user, prefix_from_object_id(object_id)
+    if bco_instance.acl_public:
+        return True
+    view_permission = get_permission_resolver(user).can(
+        "view", bco_instance.prefix_id
     )
+    return view_permission is not False
+
+def user_can_convert_bco(object_id: str, user: User) -> bool:
+    """Convert BCO
+
+    Determines if a user can convert a BCO to the LDH format: the BCO is not
+    deleted and the user owns it or can view it (`user_can_view_bco`). The
+    decision is made from the BCO row, with one query.
+
+    Parameters:
+    - object_id (str):
+        The unique identifier of the BCO.
+    - user (User):
+        The user requesting the conversion.
+
+    Returns:
+    - bool:
+        `True` if the user can convert the BCO, `False` otherwise or if it
+        does not exist.
+    """
+
+    bco_instance = Bco.objects.filter(object_id=object_id).exclude(
+        state="DELETE"
+    ).first()
+    if bco_instance is None:
+        return False
+    if user.username and bco_instance.owner_id == user.username:
+        return True
+    return user_can_view_bco(bco_instance, user)
+
+def expected_bco_acls(object_ids: list) -> dict:
+    """Expected BCO ACLs
+
+    Computes the access control lists of BCOs from the prefixes and the
+    `authorized_users` table, with one query for each.
+
+    Parameters:
+    - object_ids (list):
+        The unique identifiers of the BCOs.
+
+    Returns:
+    - dict:
+        `(acl_public, acl_users)` by object ID, for the BCOs that exist.
+    """
+
+    public = dict(Prefix.objects.values_list("prefix", "public"))
+    acls = {
+        object_id: (public.get(prefix_id, False), [])
+        for object_id, prefix_id in Bco.objects.filter(
+            object_id__in=object_ids
+        ).values_list("object_id", "prefix_id")
+    }
+    for object_id, user_id in Bco.authorized_users.through.objects.filter(
+        bco_id__in=acls.keys()
+    ).order_by("user_id").values_list("bco_id", "user_id"):
+        acls[object_id][1].append(user_id)
+    return acls
+
+def bco_acl_mismatches(batch_size: int=1000):
+    """BCO ACL Mismatches
+
+    Compares the stored access control list of every BCO with the one
+    computed by `expected_bco_acls`, `batch_size` BCOs at a time.
+
+    Yields:
+    - tuple:
+        `(object_id, stored, expected)` for each BCO whose stored
+        `(acl_public, acl_users)` differ from the expected ones.
+    """
+
+    stored_acls = Bco.objects.order_by("object_id").values_list(
+        "object_id", "acl_public", "acl_users"
+    )
+    last_id = None
+    while True:
+        batch = stored_acls
+        if last_id is not None:
+            batch = batch.filter(object_id__gt=last_id)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        expected = expected_bco_acls([row[0] for row in batch])
+        for object_id, acl_public, acl_users in batch:
+            if (acl_public, acl_users) != expected[object_id]:
+                yield object_id, (acl_public, acl_users), expected[object_id]
+
+# The search fields of a BCO, their path in the `provenance_domain` and
+# their maximum length.
+SEARCH_FIELDS = {
+    "name": 255,
+    "version": 100,
+    "license": 255,
+}
+MAX_KEYWORDS = 100
+MAX_KEYWORD_LENGTH = 255
+
+def _search_date(value):
+    """Parses a date of the contents, or returns None."""
+
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            parsed = None if date is None else datetime.combine(date, time())
+    except ValueError:
+        return None
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=pytz.UTC)
+    return parsed
+
+def extract_search_fields(contents) -> dict:
+    """Extract Search Fields
+
+    Extracts the search fields of a BCO from its contents: the `name`,
+    `version` and `license` of the `provenance_domain`, truncated to fit
+    their columns, its `created` date and the distinct `keywords` of the
+    `description_domain`. Missing or malformed values are empty.
+
+    Parameters:
+    - contents (dict):
+        The BCO contents.
+
+    Returns:
+    - dict:
+        The values of the search field columns, and the list of
+        `keywords`.
+    """
+
+    provenance = {}
+    keywords = []
+    if isinstance(contents, dict):
+        if isinstance(contents.get("provenance_domain"), dict):
+            provenance = contents["provenance_domain"]
+        description = contents.get("description_domain")
+        if isinstance(description, dict) \
+                and isinstance(description.get("keywords"), list):
+            keywords = description["keywords"]
+
+    fields = {}
+    for name, max_length in SEARCH_FIELDS.items():
+        value = provenance.get(name)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        fields[name] = value[:max_length] if isinstance(value, str) else ""
+    fields["created"] = _search_date(provenance.get("created"))
+    distinct = {}
+    for keyword in keywords:
+        if isinstance(keyword, str) and keyword:
+            distinct.setdefault(keyword[:MAX_KEYWORD_LENGTH], None)
+    fields["keywords"] = list(distinct)[:MAX_KEYWORDS]
+    return fields
+
+def search_field_mismatches(batch_size: int=1000):
+    """Search Field Mismatches
+
+    Compares the stored search fields and keywords of every BCO with the
+    ones extracted from its contents, `batch_size` BCOs at a time.
+
+    Yields:
+    - tuple:
+        `(object_id, stored, expected)` for each BCO whose stored search
+        fields differ from the extracted ones, as dicts like those of
+        `extract_search_fields` with sorted `keywords`.
+    """
+
+    columns = ["object_id", "contents", *SEARCH_FIELDS, "created"]
+    stored_fields = Bco.objects.order_by("object_id").values(*columns)
+    last_id = None
+    while True:
+        batch = stored_fields
+        if last_id is not None:
+            batch = batch.filter(object_id__gt=last_id)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        last_id = batch[-1]["object_id"]
+        keywords = {}
+        for object_id, keyword in BcoKeyword.objects.filter(
+            bco_id__in=[row["object_id"] for row in batch]
+        ).values_list("bco_id", "keyword"):
+            keywords.setdefault(object_id, []).append(keyword)
+        for row in batch:
+            object_id = row.pop("object_id")
+            expected = extract_search_fields(row.pop("contents"))
+            expected["keywords"] = sorted(expected["keywords"])
+            row["keywords"] = sorted(keywords.get(object_id, []))
+            if row != expected:
+                yield object_id, row, expected
 
-    return view_permission
-    
 def retrieve_bco(bco_accession:str, user:User, bco_version:str=None) -> bool:
     """Retrieve BCO
 
@@ -199,8 +563,9 @@ def retrieve_bco(bco_accession:str, user:User, bco_version:str=None) -> bool:
     performs several checks:
     
     1. Verifies if the BCO exists. If not, returns `None`.
-    2. Checks if the user is explicitly authorized to view this specific BCO.
-    3. Checks if the user has general 'view' permissions for the prefix
+    2. Checks if the user can view the BCO with `user_can_view_bco`: the
+        user is explicitly authorized to view this specific BCO, the prefix
+        is public or the user has general 'view' permissions for the prefix
         associated with the BCO.
     """
 
@@ -215,15 +580,10 @@ def retrieve_bco(bco_accession:str, user:User, bco_version:str=None) -> bool:
         bco_instance = Bco.objects.get(object_id=object_id)
     except Bco.DoesNotExist:
         return None
-    
-    if user in bco_instance.authorized_users.all():
-        return bco_instance
 
-    prefix_name = bco_accession.split("_")[0]
-    view_permission = user_can_view_prefix(prefix_name, user)
-    if view_permission is False:
+    if not user_can_view_bco(bco_instance, user):
         return False
-    
+
     return bco_instance
 
 def get_authorized_bcos(user: User):
@@ -6,12 +6,30 @@ import os
 import glob
 import copy
 import json
-import jsonref
 import jsonschema
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from itertools import islice
 from hashlib import sha256
-from biocompute.models import Bco
-from biocompute.selectors import object_id_deconstructor, datetime_converter
+from biocompute.codegen import ErrorDetail, GeneratedValidator, pointer
+from biocompute.models import Bco, BcoKeyword
+from biocompute.schemas import (
+    get_schema_resolver,
+    schema_registry,
+    SchemaFetchError
+)
+from biocompute.selectors import (
+    bco_acl_mismatches,
+    datetime_converter,
+    extract_search_fields,
+    object_id_deconstructor,
+    search_field_mismatches
+)
+from biocompute.telemetry import ValidationTimings, validation_telemetry
 from copy import deepcopy
 from django.conf import settings
 from django.contrib.auth.models import User
@@ -21,8 +39,6 @@ from django.utils import timezone
 from prefix.models import Prefix
 from prefix.services import prefix_counter_increment
 from rest_framework import serializers
-from simplejson.errors import JSONDecodeError
-from requests.exceptions import ConnectionError as RequestsConnectionError
 
 """BioCompute Services
 
@@ -31,82 +47,282 @@ Service functions for working with BCOs
 
 HOSTNAME = settings.PUBLIC_HOSTNAME
 BASE_DIR = settings.BASE_DIR
+VALIDATION_WORKERS = getattr(settings, "BCO_VALIDATION_WORKERS", 0)
+VALIDATION_MIN_BATCH = getattr(settings, "BCO_VALIDATION_MIN_BATCH", 32)
+VALIDATION_CACHE_BYTES = getattr(
+    settings, "BCO_VALIDATION_CACHE_BYTES", 16 * 1024 * 1024
+)
+
+# Error limits for the validation modes. `None` walks every error.
+VALIDATION_MODES = {
+    "full": None,
+    "fast": 1,
+}
+
+def validation_error_limit(mode: str=None, max_errors=None) -> int:
+    """Validation Error Limit
+
+    Translates a requested validation mode into an error limit for
+    `parse_and_validate`. `mode` is one of `VALIDATION_MODES`; an explicit
+    `max_errors` takes precedence over it.
+
+    Returns:
+    - int:
+        The maximum number of errors to collect, or `None` for all of them.
+
+    Raises:
+    - ValueError:
+        If the mode is unknown or `max_errors` is not a positive integer.
+    """
+
+    if max_errors not in (None, ""):
+        try:
+            max_errors = int(max_errors)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid max_errors: {max_errors}.")
+        if max_errors < 1:
+            raise ValueError("max_errors must be a positive integer.")
+        return max_errors
+
+    if mode in (None, ""):
+        return None
+    if mode not in VALIDATION_MODES:
+        raise ValueError(
+            f"Invalid validation mode: {mode}. Use one of "\
+            + f"{', '.join(VALIDATION_MODES)}."
+        )
+    return VALIDATION_MODES[mode]
+
+# Formats of the `error_detail` entries in validation results.
+ERROR_FORMATS = ("legacy", "structured")
+
+def validation_error_format(error_format: str=None) -> str:
+    """Validation Error Format
+
+    Checks a requested error format. "legacy" reports each error as a
+    `"[path]: message"` string; "structured" as an object with the JSON
+    pointer, schema keyword, schema path and offending value.
+
+    Returns:
+    - str:
+        The error format, "legacy" if none was requested.
+
+    Raises:
+    - ValueError:
+        If the format is unknown.
+    """
+
+    if error_format in (None, ""):
+        return "legacy"
+    if error_format not in ERROR_FORMATS:
+        raise ValueError(
+            f"Invalid error format: {error_format}. Use one of "\
+            + f"{', '.join(ERROR_FORMATS)}."
+        )
+    return error_format
+
+def jsonschema_details(validator, json_object, max_errors=None) -> list:
+    """Returns an `ErrorDetail` per `jsonschema` validation error."""
+
+    details = []
+    missing = None
+    for error in islice(validator.iter_errors(json_object), max_errors):
+        param = None
+        if error.validator == "required":
+            # The errors for one object come one after the other, in the
+            # order of its `required` list.
+            if missing is None or missing[0] != error.path:
+                missing = (error.path, iter([
+                    name for name in error.validator_value
+                    if name not in error.instance
+                ]))
+            param = next(missing[1], None)
+        elif error.validator == "additionalProperties":
+            properties = error.schema.get("properties", {})
+            patterns = "|".join(error.schema.get("patternProperties", {}))
+            param = ([
+                name for name in error.instance if name not in properties
+                and not (patterns and re.search(patterns, name))
+            ], None)
+        details.append(ErrorDetail(
+            error.validator, error.instance, param,
+            path=error.path,
+            schema_path=error.relative_schema_path,
+            message=error.message
+        ))
+    return details
+
+def structured_error(detail: ErrorDetail, path: tuple=()) -> dict:
+    """Structured Error
+
+    Renders a validation error as an object with the JSON pointer to the
+    offending value, the schema keyword, the JSON pointer into the schema
+    and the value itself. Objects and arrays are left out as `value`, and
+    for `required` and `additionalProperties` the property names are given
+    as `params` instead.
+
+    Parameters:
+    - detail (ErrorDetail):
+        The validation error.
+    - path (tuple, optional):
+        Location of the validated value inside the BCO.
+
+    Returns:
+    - dict:
+        The structured error.
+    """
+
+    error = {
+        "pointer": pointer((*path, *detail.path)),
+        "keyword": detail.keyword,
+        "schema_path": pointer(detail.schema_path),
+    }
+    if detail.instance is None or \
+            isinstance(detail.instance, (str, int, float, bool)):
+        error["value"] = detail.instance
+    params = detail.params
+    if params is not None:
+        error["params"] = params
+    return error
 
 class BcoValidator:
     """BCO Validator
 
     Handles validation of BioCompute Objects (BCOs) against JSON Schemas.
+
+    The time spent loading and applying each schema, and the errors per
+    schema keyword, are added up in `timings` for every BCO this validator
+    checks, and in the process-wide `validation_telemetry`. The schema URIs
+    that could not be loaded for the last BCO are kept in `unresolved`.
     """
 
-    def __init__(self):
-        """Initializes the BCOValidator with common attributes, if any."""
+    def __init__(self, resolver=None):
+        """Initializes the BCOValidator with common attributes, if any.
+
+        Parameters:
+        - resolver (ExtensionSchemaResolver, optional): Resolver for schema
+          URIs. Defaults to the process-wide resolver.
+        """
         self.base_path = f"{BASE_DIR}/config/IEEE/2791object.json"
+        self.resolver = resolver if resolver is not None \
+            else get_schema_resolver()
+        self.timings = ValidationTimings()
+        self.unresolved = set()
+        self._active = None
+
+    def _start(self) -> ValidationTimings:
+        """Start the timings record of one BCO."""
+
+        self.unresolved = set()
+        self._active = ValidationTimings()
+        self._active.objects = 1
+        return self._active
+
+    def _finish(self, timings: ValidationTimings):
+        """Add the record of one BCO to the validator and process totals."""
+
+        self._active = None
+        self.timings.update(timings)
+        validation_telemetry.record(timings)
 
     @staticmethod
-    def load_schema(schema_uri):
+    def load_schema(schema_uri, resolver=None):
         """
         Loads a JSON Schema from a given URI.
 
+        Schemas shipped in `config/schemas/` are served from the process-wide
+        `schema_registry`; any other URI goes through the extension schema
+        resolver and its caches.
+
         Parameters:
         - schema_uri (str): The URI or path to the JSON schema.
+        - resolver (ExtensionSchemaResolver, optional): Resolver to use.
 
         Returns:
-        - dict: The loaded JSON schema.
+        - dict: The loaded JSON schema, or `{schema_uri: [error message]}` if
+          it could not be loaded.
         """
-        schema_mapping = {
-            "https://w3id.org/ieee/ieee-2791-schema/2791object.json": f"{BASE_DIR}/config/schemas/2791/2791object.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.1.0/dataset/dataset_extension.json": f"{BASE_DIR}/config/schemas/1.1.0/dataset_extension.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.1.0/fhir/fhir_extension.json": f"{BASE_DIR}/config/schemas/1.1.0/fhir_extension.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.1.0/galaxy/galaxy_extension.json": f"{BASE_DIR}/config/schemas/1.1.0/galaxy_extension.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.1.0/license/license_extension.json": f"{BASE_DIR}/config/schemas/1.1.0/license_extension.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.1.0/scm/scm_extension.json": f"{BASE_DIR}/config/schemas/1.1.0/scm_extension.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.2.0/dataset/dataset_extension.json": f"{BASE_DIR}/config/schemas/1.2.0/dataset_extension.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.2.0/fhir/fhir_extension.json": f"{BASE_DIR}/config/schemas/1.2.0/fhir_extension.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.2.0/galaxy/galaxy_extension.json": f"{BASE_DIR}/config/schemas/1.2.0/galaxy_extension.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.2.0/license/license_extension.json": f"{BASE_DIR}/config/schemas/1.2.0/license_extension.json",
-            "https://raw.githubusercontent.com/biocompute-objects/extension_domain/1.2.0/scm/scm_extension.json": f"{BASE_DIR}/config/schemas/1.2.0/scm_extension.json"
-        }
 
-        if schema_uri in schema_mapping:
-            print(schema_uri in schema_mapping, schema_uri)
-            return jsonref.load_uri(f"file://{schema_mapping[schema_uri]}")
-        else:
-            print(schema_uri in schema_mapping, schema_uri)
+        if resolver is None:
+            resolver = get_schema_resolver()
+
         try:
-            return jsonref.load_uri(schema_uri)
-        except (JSONDecodeError, TypeError, RequestsConnectionError) as e:
-            error_msg = "Failed to load schema. "
-            if isinstance(e, JSONDecodeError):
-                return {schema_uri: [error_msg + "JSON Decode Error."]}
-            elif isinstance(e, TypeError):
-                return {schema_uri: [error_msg + "Invalid format."]}
-            elif isinstance(e, RequestsConnectionError):
-                return {schema_uri: [error_msg + "Connection Error."]}
-
-    def validate_json(self, schema, json_object):
+            return resolver.get_schema(schema_uri)
+        except SchemaFetchError as error:
+            return {schema_uri: [f"Failed to load schema. {error}"]}
+
+    def get_validator(self, schema_uri):
+        """
+        Returns a compiled validator for a schema URI.
+
+        Parameters:
+        - schema_uri (str): The URI of the JSON schema.
+
+        Returns:
+        - jsonschema.Draft7Validator or GeneratedValidator: The compiled
+          validator, or `None` if the schema could not be loaded, in which
+          case the URI is added to `unresolved`.
+        """
+
+        validator = self.resolver.get_validator(schema_uri)
+        if validator is None:
+            self.unresolved.add(schema_uri)
+        return validator
+
+    def validate_json(self, schema, json_object, max_errors=None, path=(),
+            error_format="legacy"):
         """
         Validates a JSON object against a specified schema.
 
         Parameters:
-        - schema (dict): The JSON schema to validate against.
+        - schema (dict, jsonschema.Draft7Validator or GeneratedValidator): The
+          JSON schema, or an already compiled validator, to validate against.
         - json_object (dict): The JSON object to be validated.
+        - max_errors (int, optional): Stop after this many errors instead of
+          walking the whole object.
+        - path (tuple, optional): Location of `json_object` inside the BCO,
+          prepended to the path of each error.
+        - error_format (str, optional): "legacy" for error message strings,
+          "structured" for `structured_error` objects.
 
         Returns:
-        - list: A list of error messages, empty if valid.
+        - list: A list of errors, empty if valid.
         """
+        if isinstance(schema, GeneratedValidator):
+            details = schema.details(json_object, max_errors)
+        else:
+            if isinstance(schema, jsonschema.Draft7Validator):
+                validator = schema
+            else:
+                validator = jsonschema.Draft7Validator(schema)
+            details = jsonschema_details(validator, json_object, max_errors)
+        if not details:
+            return []
+
+        error_keywords = (self._active or self.timings).error_keywords
+        for detail in details:
+            error_keywords[detail.keyword] += 1
+        if error_format == "structured":
+            return [structured_error(detail, path) for detail in details]
+
         errors = []
-        validator = jsonschema.Draft7Validator(schema)
-        for error in validator.iter_errors(json_object):
-            path = "".join(f"[{v}]" for v in error.path)
-            errors.append(f"{path}: {error.message}" if path else error.message)
+        for detail in details:
+            error_path = "".join(f"[{v}]" for v in (*path, *detail.path))
+            message = detail.message
+            errors.append(f"{error_path}: {message}" if error_path else message)
         return errors
 
-    def parse_and_validate(self, bco):
+    def parse_and_validate(self, bco, max_errors=None, error_format="legacy"):
         """
         Parses and validates a BCO against both the base and extension schemas.
 
         Parameters:
         - bco (dict): The BioCompute Object to validate.
+        - max_errors (int, optional): Stop validating once this many errors
+          have been found, e.g. 1 when only pass/fail is needed. The results
+          are then marked `truncated`.
+        - error_format (str, optional): Format of the `error_detail` entries,
+          one of `ERROR_FORMATS`.
 
         Returns:
         - dict: A dictionary containing the validation results.
@@ -121,130 +337,686 @@ class BcoValidator:
             }
         }
 
-        # Validate against the base schema
-        base_schema = self.load_schema(bco['spec_version'])
-        base_errors = self.validate_json(base_schema, bco)
-        results[identifier]['error_detail'].extend(base_errors)
-        results[identifier]['number_of_errors'] += len(base_errors)
-
-        if "usability_domain" in bco:
-            results[identifier]['score'] = sum(len(s) for s in bco['usability_domain'])
+        timings = self._start()
+        try:
+            # Validate against the base schema
+            schema_uri = bco['spec_version']
+            with timings.phase("load", schema_uri):
+                base_validator = self.get_validator(schema_uri)
+            if base_validator is None:
+                base_errors = [f"Failed to load schema {schema_uri}."]
+                if error_format == "structured":
+                    base_errors = [{
+                        "pointer": "/spec_version",
+                        "keyword": None,
+                        "schema_path": "",
+                        "value": schema_uri,
+                        "message": base_errors[0],
+                    }]
+            else:
+                with timings.phase("base", schema_uri):
+                    base_errors = self.validate_json(
+                        base_validator, bco, max_errors,
+                        error_format=error_format
+                    )
+            results[identifier]['error_detail'].extend(base_errors)
+            results[identifier]['number_of_errors'] += len(base_errors)
+
+            with timings.phase("score"):
+                if "usability_domain" in bco:
+                    results[identifier]['score'] = sum(len(s) for s in bco['usability_domain'])
+
+            # Validate against extension schemas, if any
+            remaining = None
+            if max_errors is not None:
+                remaining = max_errors - results[identifier]['number_of_errors']
+            extension_errors = self.validate_extensions(
+                bco, remaining, error_format
+            )
+            results[identifier]['error_detail'].extend(extension_errors)
+            results[identifier]['number_of_errors'] += len(extension_errors)
+        finally:
+            self._finish(timings)
 
-        # Validate against extension schemas, if any
-        for extension in bco.get("extension_domain", []):
-            extension_schema_uri = extension.get("extension_schema")
-            extension_schema = self.load_schema(extension_schema_uri)
-            if not isinstance(extension_schema, dict):  # Validation passed
-                extension_errors = self.validate_json(extension_schema, extension)
-                results[identifier]['error_detail'].extend(extension_errors)
-                results[identifier]['number_of_errors'] += len(extension_errors)
+        if max_errors is not None and \
+                results[identifier]['number_of_errors'] >= max_errors:
+            results[identifier]['truncated'] = True
 
         return results
 
-class ModifyBcoDraftSerializer(serializers.Serializer):
-    """Serializer for modifying draft BioCompute Objects (BCO).
+    def validate_extensions(self, bco, max_errors=None, error_format="legacy"):
+        """
+        Validates each entry of a BCO's `extension_domain` against its
+        `extension_schema`. Extensions whose schema can not be loaded, and
+        malformed entries that the base schema already reports, are skipped.
 
-    This serializer is used to validate and serialize data related to the
-    update of BCO drafts.
+        Legacy error paths are relative to the extension. Structured errors
+        point into the BCO and carry the extension `schema` URI, which their
+        `schema_path` is relative to.
 
-    Attributes:
-    - contents (JSONField): 
-        The contents of the BCO in JSON format.
-    - authorized_users (ListField): 
-        A list of usernames authorized to access the BCO, besides the owner.
+        Parameters:
+        - bco (dict): The BioCompute Object to validate.
+        - max_errors (int, optional): Stop after this many errors.
+        - error_format (str, optional): Format of the errors, one of
+          `ERROR_FORMATS`.
 
-    Methods:
-    - validate: Validates the incoming data for updating a BCO draft.
-    - update: Updates a BCO instance based on the validated data.
-    """
-    contents = serializers.JSONField()
-    authorized_users = serializers.ListField(child=serializers.CharField(), required=False)
+        Returns:
+        - list: A list of error messages, empty if valid.
+        """
 
-    def validate(self, attrs):
-        """BCO Modify Draft Validator
+        errors = []
+        timings = self._active or self.timings
+        extensions = bco.get("extension_domain", [])
+        if not isinstance(extensions, list):
+            return errors
+        for index, extension in enumerate(extensions):
+            if not isinstance(extension, dict):
+                continue
+            remaining = None
+            if max_errors is not None:
+                remaining = max_errors - len(errors)
+                if remaining <= 0:
+                    break
+            extension_schema_uri = extension.get("extension_schema")
+            if not isinstance(extension_schema_uri, str):
+                continue
+            with timings.phase("load", extension_schema_uri):
+                extension_validator = self.get_validator(extension_schema_uri)
+            if extension_validator is not None:  # Schema could be loaded
+                with timings.phase("extension", extension_schema_uri):
+                    if error_format == "structured":
+                        extension_errors = self.validate_json(
+                            extension_validator, extension, remaining,
+                            path=("extension_domain", index),
+                            error_format=error_format
+                        )
+                        for error in extension_errors:
+                            error["schema"] = extension_schema_uri
+                    else:
+                        extension_errors = self.validate_json(
+                            extension_validator, extension, remaining
+                        )
+                    errors.extend(extension_errors)
+        return errors
+
+    def validate_incremental(self, bco, validity=None, max_errors=None,
+            local_only=False):
+        """
+        Validates a BCO, reusing the per-domain results of a previous
+        validation for every top-level domain that has not changed.
+
+        The validity record stores, for the schema fingerprint it was built
+        against, a canonical digest and the errors of each domain. Domains
+        whose digest still matches are trusted; the changed ones are
+        revalidated against their own schema, e.g. `io_domain.json`. The
+        envelope (required domains, `object_id`, `etag`, ...) and the
+        extensions are always checked. Without a usable record, or for a
+        schema that can not be split into domains, every domain is
+        validated. A BCO without a `spec_version` gets a single error.
+
+        With `max_errors`, validation stops once that many errors have been
+        found. Domains that were not reached keep their record if it is
+        still current, and domains whose errors may have been cut short are
+        left out of the new record.
 
         Parameters:
-        - attrs (dict): 
-            The incoming data to be validated.
+        - bco (dict): The BioCompute Object to validate.
+        - validity (dict, optional): The record from the last validation of
+          this BCO, as stored on `Bco.validity`.
+        - max_errors (int, optional): Stop after this many errors. The
+          results are then marked `truncated`.
+        - local_only (bool, optional): Only use the schemas shipped with the
+          BCODB: extensions are not checked, and a BCO whose `spec_version`
+          is not shipped is not validated and gets an empty record.
 
         Returns:
-        - dict:
-            The validated data.
-
-        Raises:
-        - serializers.ValidationError: If any validation checks fail.
+        - tuple: The results, in the format of `parse_and_validate` with the
+          list of `revalidated` domains added, and the new validity record.
         """
 
-        errors = {}
-
-        if 'authorized_users' in attrs:
-            for user in attrs['authorized_users']:
+        identifier = bco.get("object_id", "Unknown")
+        schema_uri = bco.get("spec_version")
+        if not isinstance(schema_uri, str):
+            return {
+                identifier: {
+                    'number_of_errors': 1,
+                    'error_detail': ["'spec_version' is a required property"],
+                    'score': 0,
+                    'revalidated': [],
+                }
+            }, {}
+
+        registry = getattr(self.resolver, "registry", schema_registry)
+        domain_validators = registry.get_domain_validators(schema_uri)
+        if domain_validators is None:
+            if local_only:
+                results = {identifier: {
+                    'number_of_errors': 0,
+                    'error_detail': [],
+                    'score': 0,
+                }}
+            else:
+                results = self.parse_and_validate(bco, max_errors)
+            results[identifier]['revalidated'] = []
+            return results, {}
+
+        envelope_validator, validators = domain_validators
+        validity = validity or {}
+        trusted = {}
+        if validity.get("schema") == schema_uri and \
+                validity.get("fingerprint") == registry.fingerprint:
+            trusted = validity.get("domains", {})
+
+        def remaining():
+            return None if max_errors is None else max_errors - len(errors)
+
+        timings = self._start()
+        try:
+            with timings.phase("base", schema_uri):
+                errors = self.validate_json(envelope_validator, bco, max_errors)
+                domains = {}
+                revalidated = []
+                for name, validator in validators.items():
+                    if name not in bco:
+                        continue
+                    digest = canonical_digest(bco[name])
+                    record = trusted.get(name)
+                    if record is not None and record.get("digest") != digest:
+                        record = None
+                    limit = remaining()
+                    if limit is not None and limit <= 0:
+                        if record is not None:
+                            domains[name] = record
+                        continue
+                    if record is None:
+                        domain_errors = self.validate_json(
+                            validator, bco[name], limit, path=(name,)
+                        )
+                        revalidated.append(name)
+                        if limit is not None and len(domain_errors) >= limit:
+                            errors.extend(domain_errors)
+                            continue
+                        record = {"digest": digest, "errors": domain_errors}
+                    domains[name] = record
+                    errors.extend(record["errors"])
+            limit = remaining()
+            if not local_only and (limit is None or limit > 0):
+                errors.extend(self.validate_extensions(bco, limit))
+
+            with timings.phase("score"):
                 try:
-                    User.objects.get(username=user)
-                except Exception as err:
-                    errors['authorized_users'] =f"Invalid user: {user}"
+                    score = sum(len(s) for s in bco.get("usability_domain", []))
+                except TypeError:
+                    score = 0
+        finally:
+            self._finish(timings)
 
-        if errors:
-            raise serializers.ValidationError(errors)
+        results = {
+            identifier: {
+                'number_of_errors': len(errors),
+                'error_detail': errors,
+                'score': score,
+                'revalidated': revalidated,
+            }
+        }
+        if max_errors is not None and len(errors) >= max_errors:
+            results[identifier]['error_detail'] = errors[:max_errors]
+            results[identifier]['number_of_errors'] = max_errors
+            results[identifier]['truncated'] = True
+        validity = {
+            "schema": schema_uri,
+            "fingerprint": registry.fingerprint,
+            "valid": not errors,
+            "domains": domains,
+        }
+        return results, validity
 
-        return attrs
+def canonical_digest(json_object) -> str:
+    """Returns a SHA-256 digest of a JSON value that ignores key order."""
 
-    @transaction.atomic
-    def update(self, validated_data):
-        """Update BCO
+    canonical = json.dumps(
+        json_object, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return sha256(canonical.encode("utf-8")).hexdigest()
 
-        Updates an existing BioCompute Object (BCO) draft instance with
-        validated data.
+class ValidationResultCache:
+    """Validation Result Cache
 
-        This method applies the validated changes to a BCO draft, including
-        updating its contents and the list of authorized users. It also
-        recalculates the `etag` of the BCO to reflect the new contents
-        and ensures that the `last_update` timestamp is current. If a list of
-        `authorized_users` is provided, this method replaces the current list
-        of authorized users with the new list, allowing for dynamic access
-        control to the BCO. Users not included in the new list will lose
-        their access unless they are the owner or have other permissions.
+    Per-process LRU cache of `parse_and_validate` results, keyed by a
+    canonical SHA-256 hash of the BCO contents and the version of the schema
+    set it was validated against. Results are stored as serialized JSON and
+    the least recently used entries are evicted once the stored bytes exceed
+    the budget. The cache is cleared whenever the schema registry reloads.
+    Results of BCOs with a schema that could not be loaded are not stored,
+    so they are validated again once the schema is available.
 
-        This method employs Django's atomic transactions to ensure database
-        integrity during the update process. 
+    Parameters:
+    - max_bytes (int):
+        Byte budget for the stored results. A budget of 0 disables the cache.
+    """
 
-        Parameters:
-        - instance (Bco):
-            The BCO instance to be updated. This parameter is automatically
-            supplied by the Django Rest Framework and not explicitly passed
-            in the serializer's call.
-        - validated_data (dict): 
-            The data that has passed validation checks and is to be used to
-            update the BCO instance. It includes updated `contents` and
-            potentially a new list of `authorized_users`.
+    def __init__(self, max_bytes: int=VALIDATION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
 
-        Returns:
-        - Bco: The updated BCO instance
+    @staticmethod
+    def make_key(
+        bco: dict,
+        max_errors: int=None,
+        error_format: str="legacy"
+    ) -> str:
+        """Returns the cache key for a BCO, error options and schema set."""
+
+        digest = canonical_digest(bco)
+        return f"{schema_registry.version}:{max_errors}:{error_format}:{digest}"
+
+    def get(self, key: str) -> dict:
+        """Returns a fresh copy of the cached results, or `None`."""
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, results: dict):
+        """Stores results, evicting least recently used entries as needed."""
+
+        value = json.dumps(results, default=str)
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self, *args):
+        """Drops every entry. Accepts and ignores reload callback arguments."""
+
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        """Returns the cache counters for the current worker process."""
+
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
 
-        Raises:
-        - Bco.DoesNotExist: 
-            If the BCO instance with the specified `object_id` does not exist.
-        - User.DoesNotExist:
-            If one or more of the usernames in the `authorized_users` list do not correspond to valid User instances.
-        """
+validation_cache = ValidationResultCache()
+schema_registry.on_reload(validation_cache.clear)
 
-        authorized_usernames = validated_data.pop('authorized_users', [])
-        bco_instance = Bco.objects.get(
-            object_id = validated_data['contents']['object_id']
+def validate_bco(
+    bco: dict,
+    validator: BcoValidator=None,
+    max_errors: int=None,
+    error_format: str="legacy"
+) -> dict:
+    """Validate BCO
+
+    Validates one BCO through the shared `validation_cache`. Used by every
+    API that needs `parse_and_validate` results.
+
+    Parameters:
+    - bco (dict):
+        The BioCompute Object to validate.
+    - validator (BcoValidator, optional):
+        Validator to use on a cache miss.
+    - max_errors (int, optional):
+        Error limit passed to `parse_and_validate`.
+    - error_format (str, optional):
+        Error format passed to `parse_and_validate`.
+
+    Returns:
+    - dict:
+        The `{identifier: results}` dictionary from `parse_and_validate`.
+    """
+
+    key = validation_cache.make_key(bco, max_errors, error_format)
+    results = validation_cache.get(key)
+    if results is None:
+        if validator is None:
+            validator = BcoValidator()
+        results = validator.parse_and_validate(bco, max_errors, error_format)
+        if not validator.unresolved:
+            validation_cache.set(key, results)
+    return results
+
+def validate_draft(
+    bco_instance: Bco,
+    validator: BcoValidator=None,
+    max_errors: int=None,
+    error_format: str="legacy"
+) -> dict:
+    """Validate Draft
+
+    Validates a stored draft with `validate_incremental`, trusting the
+    domains that have not changed since the validity record on the draft
+    was built, and stores the new record. Structured errors are not kept
+    in the record, so they are validated through `validate_bco` instead.
+
+    Parameters:
+    - bco_instance (Bco):
+        The draft to validate.
+    - validator (BcoValidator, optional):
+        Validator to use.
+    - max_errors (int, optional):
+        Stop validating after this many errors and mark the results
+        `truncated`.
+    - error_format (str, optional):
+        Format of the `error_detail` entries, one of `ERROR_FORMATS`.
+
+    Returns:
+    - dict:
+        The `{identifier: results}` dictionary of `parse_and_validate`.
+    """
+
+    if validator is None:
+        validator = BcoValidator()
+    if error_format != "legacy":
+        return validate_bco(
+            bco_instance.contents, validator, max_errors, error_format
         )
-        bco_instance.contents = validated_data['contents']
-        bco_instance.last_update=timezone.now()
-        bco_contents = deepcopy(bco_instance.contents)
-        etag = generate_etag(bco_contents)
-        bco_instance.contents['etag'] = etag
-        bco_instance.save()
-        if authorized_usernames:
-            authorized_users = User.objects.filter(
-                username__in=authorized_usernames
-            )
-            bco_instance.authorized_users.set(authorized_users)
 
-        return bco_instance
+    results, validity = validator.validate_incremental(
+        bco_instance.contents, bco_instance.validity, max_errors
+    )
+    if validity != bco_instance.validity:
+        bco_instance.validity = validity
+        Bco.objects.filter(pk=bco_instance.pk).update(validity=validity)
+
+    for bco_results in results.values():
+        del bco_results['revalidated']
+    return results
+
+_validation_pool = None
+_validation_pool_key = None
+
+def _validation_worker_init():
+    """Prepares a validation worker process.
+
+    Forked workers inherit the loaded Django apps; spawned workers have to
+    set them up before the first BCO arrives.
+    """
+
+    import django
+    django.setup()
+
+def _validate_bco(
+    bco: dict,
+    max_errors: int=None,
+    error_format: str="legacy",
+    validator: BcoValidator=None
+) -> tuple:
+    """Validates a single BCO, e.g. inside a validation worker.
+
+    Returns the results and whether they can be cached, i.e. every schema
+    of the BCO could be loaded.
+    """
+
+    if validator is None:
+        validator = BcoValidator()
+    results = validator.parse_and_validate(bco, max_errors, error_format)
+    return results, not validator.unresolved
+
+def get_validation_pool(workers: int) -> ProcessPoolExecutor:
+    """Get Validation Pool
+
+    Returns the process pool used for bulk validation. One pool is kept per
+    (process, size) so that gunicorn workers each start their own pool after
+    forking and reuse it across requests.
+    """
+
+    global _validation_pool, _validation_pool_key
+
+    pool_key = (os.getpid(), workers)
+    if _validation_pool is None or _validation_pool_key != pool_key:
+        if _validation_pool is not None and _validation_pool_key[0] == os.getpid():
+            _validation_pool.shutdown(wait=False)
+        _validation_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_validation_worker_init
+        )
+        _validation_pool_key = pool_key
+
+    return _validation_pool
+
+def validate_bco_batch(
+    bcos: list,
+    workers: int=None,
+    max_errors: int=None,
+    error_format: str="legacy"
+) -> list:
+    """Validate BCO Batch
+
+    Validates a list of BCOs against their base and extension schemas and
+    returns the `parse_and_validate` results in input order. BCOs found in
+    the `validation_cache` are not validated again.
+
+    Batches smaller than `BCO_VALIDATION_MIN_BATCH`, or a pool size of 0 or
+    1, are validated serially in the calling process. Larger batches are
+    spread over a process pool of `workers` processes
+    (`BCO_VALIDATION_WORKERS` by default). If the pool breaks, the batch is
+    validated serially instead.
+
+    Parameters:
+    - bcos (list):
+        The BioCompute Objects to validate.
+    - workers (int, optional):
+        Size of the process pool.
+    - max_errors (int, optional):
+        Error limit passed to `parse_and_validate`.
+    - error_format (str, optional):
+        Error format passed to `parse_and_validate`.
+
+    Returns:
+    - list:
+        One `{identifier: results}` dictionary per submitted BCO.
+    """
+
+    global _validation_pool
+
+    if workers is None:
+        workers = VALIDATION_WORKERS
+
+    keys = [
+        validation_cache.make_key(bco, max_errors, error_format)
+        for bco in bcos
+    ]
+    batch_results = [validation_cache.get(key) for key in keys]
+    pending = [
+        index for index, results in enumerate(batch_results) if results is None
+    ]
+    pending_bcos = [bcos[index] for index in pending]
+
+    if workers <= 1 or len(pending_bcos) < max(VALIDATION_MIN_BATCH, 2):
+        validator = BcoValidator()
+        validated = [
+            _validate_bco(bco, max_errors, error_format, validator)
+            for bco in pending_bcos
+        ]
+    else:
+        chunksize = max(1, len(pending_bcos) // (workers * 4))
+        try:
+            pool = get_validation_pool(workers)
+            validated = list(pool.map(
+                partial(
+                    _validate_bco,
+                    max_errors=max_errors,
+                    error_format=error_format
+                ),
+                pending_bcos,
+                chunksize=chunksize
+            ))
+        except BrokenProcessPool:
+            _validation_pool = None
+            validator = BcoValidator()
+            validated = [
+                _validate_bco(bco, max_errors, error_format, validator)
+                for bco in pending_bcos
+            ]
+
+    for index, (results, cacheable) in zip(pending, validated):
+        if cacheable:
+            validation_cache.set(keys[index], results)
+        batch_results[index] = results
+
+    return batch_results
+
+_JSON_STRUCTURAL = re.compile(r'["{}\[\]]')
+_JSON_STRING_SPECIAL = re.compile(r'["\\]')
+
+def iter_bco_stream(stream, chunk_size: int=64 * 1024):
+    """Iterate BCO Stream
+
+    Incrementally parses a request body holding either a JSON array of BCOs
+    or newline delimited JSON (NDJSON), one BCO per line, and yields each BCO
+    as soon as it has been read completely. Only the BCO currently being
+    read is held in memory.
+
+    Parameters:
+    - stream (file-like):
+        Object with a `read(size)` method returning `bytes` or `str`.
+    - chunk_size (int):
+        Number of bytes to read at a time.
+
+    Yields:
+    - dict:
+        One parsed BCO.
+
+    Raises:
+    - ValueError:
+        If the body is not a JSON array of objects or NDJSON objects.
+    """
+
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pending = b""
+    position = 0
+    eof = False
+    array_mode = None
+
+    def read_more():
+        nonlocal buffer, pending, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            if pending:
+                raise ValueError("Request body is not valid UTF-8.")
+            return
+        if isinstance(chunk, bytes):
+            chunk = pending + chunk
+            try:
+                text = chunk.decode("utf-8")
+                pending = b""
+            except UnicodeDecodeError as error:
+                if error.start < len(chunk) - 3:
+                    raise ValueError("Request body is not valid UTF-8.")
+                text = chunk[:error.start].decode("utf-8")
+                pending = chunk[error.start:]
+        else:
+            text = chunk
+        buffer += text
+
+    def next_significant():
+        """Skips whitespace and returns the next character, or `None`."""
+        nonlocal buffer, position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            buffer, position = "", 0
+            if eof:
+                return None
+            read_more()
+
+    while True:
+        char = next_significant()
+        if array_mode is None:
+            if char is None:
+                return
+            array_mode = char == "["
+            if array_mode:
+                position += 1
+                char = next_significant()
+                if char == "]":
+                    position += 1
+                    char = next_significant()
+                    if char is not None:
+                        raise ValueError("Unexpected data after JSON array.")
+                    return
+        elif array_mode:
+            if char == "]":
+                position += 1
+                if next_significant() is not None:
+                    raise ValueError("Unexpected data after JSON array.")
+                return
+            if char != ",":
+                raise ValueError("Expected ',' or ']' between BCOs.")
+            position += 1
+            char = next_significant()
+
+        if char is None:
+            if array_mode:
+                raise ValueError("Unterminated JSON array.")
+            return
+        if char != "{":
+            raise ValueError("Each BCO must be a JSON object.")
+
+        # Scan to the brace closing this object, reading more as needed.
+        start, scan, depth, in_string = position, position, 0, False
+        while True:
+            if in_string:
+                match = _JSON_STRING_SPECIAL.search(buffer, scan)
+            else:
+                match = _JSON_STRUCTURAL.search(buffer, scan)
+            if match is None or match.end() >= len(buffer) and \
+                    match.group() == "\\":
+                if eof:
+                    raise ValueError("Unterminated BCO in request body.")
+                scan = len(buffer) if match is None else match.start()
+                read_more()
+                continue
+            token = match.group()
+            scan = match.end()
+            if in_string:
+                if token == "\\":
+                    scan += 1
+                else:
+                    in_string = False
+            elif token == '"':
+                in_string = True
+            elif token in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    break
+
+        try:
+            bco, end = decoder.raw_decode(buffer[start:scan])
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Invalid BCO JSON: {error.msg}.")
+        yield bco
+        buffer, position = buffer[scan:], 0
 
 class ModifyBcoDraftSerializer(serializers.Serializer):
     """Serializer for modifying draft BioCompute Objects (BCO).
@@ -313,11 +1085,15 @@ class ModifyBcoDraftSerializer(serializers.Serializer):
         etag = generate_etag(bco_contents)
         bco_instance.contents['etag'] = etag
         score = bco_score(bco_instance=bco_instance)
+        _, bco_instance.validity = BcoValidator().validate_incremental(
+            bco_contents, bco_instance.validity, local_only=True
+        )
+        keywords = set_search_fields(bco_instance)
+        if authorized_usernames:
+            authorized_users = set_acl_users(bco_instance, authorized_usernames)
         bco_instance.save()
+        set_bco_keywords(bco_instance, keywords)
         if authorized_usernames:
-            authorized_users = User.objects.filter(
-                username__in=authorized_usernames
-            )
             bco_instance.authorized_users.set(authorized_users)
 
         return bco_instance
@@ -426,21 +1202,142 @@ class BcoDraftSerializer(serializers.Serializer):
 
         
         bco_instance = Bco.objects.create(
-            **validated_data, last_update=timezone.now()
+            **validated_data, last_update=timezone.now(),
+            acl_public=validated_data['prefix'].public
         )
         bco_contents = deepcopy(bco_instance.contents)
         etag = generate_etag(bco_contents)
         bco_instance.contents['etag'] = etag
         score = bco_score(bco_instance=bco_instance)
+        keywords = set_search_fields(bco_instance)
         if authorized_usernames:
-            authorized_users = User.objects.filter(
-                username__in=authorized_usernames
-            )
+            authorized_users = set_acl_users(bco_instance, authorized_usernames)
             bco_instance.authorized_users.set(authorized_users)
 
         bco_instance.save()
+        set_bco_keywords(bco_instance, keywords)
         return bco_instance
 
+def set_acl_users(bco_instance: Bco, usernames: list) -> list:
+    """Set ACL Users
+
+    Looks up the users to authorize for a BCO and sets its `acl_users` to
+    their ids. The caller saves the BCO and sets its `authorized_users` to
+    the returned users, so the two stay in sync.
+
+    Parameters:
+    - bco_instance (Bco):
+        The BCO being created or modified.
+    - usernames (list):
+        The usernames of the authorized users.
+
+    Returns:
+    - list:
+        The User instances of the usernames that exist.
+    """
+
+    authorized_users = list(User.objects.filter(username__in=usernames))
+    bco_instance.acl_users = sorted(user.pk for user in authorized_users)
+    return authorized_users
+
+def rebuild_bco_acl(batch_size: int=1000) -> list:
+    """Rebuild BCO ACL
+
+    Recomputes the access control list of every BCO and writes the ones
+    that are out of date.
+
+    Parameters:
+    - batch_size (int):
+        Number of BCOs compared at a time.
+
+    Returns:
+    - list:
+        The object IDs of the BCOs that were updated.
+    """
+
+    updated = []
+    for object_id, _, (acl_public, acl_users) in bco_acl_mismatches(
+        batch_size
+    ):
+        Bco.objects.filter(object_id=object_id).update(
+            acl_public=acl_public, acl_users=acl_users
+        )
+        updated.append(object_id)
+    return updated
+
+def set_search_fields(bco_instance: Bco) -> list:
+    """Set Search Fields
+
+    Sets the search fields of a BCO (`name`, `version`, `created` and
+    `license`) to the values extracted from its contents. The caller saves
+    the BCO and then sets its keywords to the returned keywords with
+    `set_bco_keywords`, so the two stay in sync.
+
+    Parameters:
+    - bco_instance (Bco):
+        The BCO being created, modified or published.
+
+    Returns:
+    - list:
+        The keywords of the BCO.
+    """
+
+    fields = extract_search_fields(bco_instance.contents)
+    keywords = fields.pop("keywords")
+    for name, value in fields.items():
+        setattr(bco_instance, name, value)
+    return keywords
+
+def set_bco_keywords(bco_instance: Bco, keywords: list):
+    """Set BCO Keywords
+
+    Replaces the stored keywords of a saved BCO, writing only the keywords
+    that were added or removed.
+
+    Parameters:
+    - bco_instance (Bco):
+        The saved BCO.
+    - keywords (list):
+        The keywords of the BCO, from `set_search_fields`.
+    """
+
+    stored = set(BcoKeyword.objects.filter(bco=bco_instance).values_list(
+        "keyword", flat=True
+    ))
+    removed = stored.difference(keywords)
+    if removed:
+        BcoKeyword.objects.filter(
+            bco=bco_instance, keyword__in=removed
+        ).delete()
+    BcoKeyword.objects.bulk_create([
+        BcoKeyword(bco=bco_instance, keyword=keyword)
+        for keyword in keywords if keyword not in stored
+    ])
+
+def rebuild_search_fields(batch_size: int=1000) -> list:
+    """Rebuild Search Fields
+
+    Extracts the search fields and keywords of every BCO from its contents
+    and writes the ones that are out of date, e.g. for BCOs written before
+    the search fields existed or without the BioCompute services.
+
+    Parameters:
+    - batch_size (int):
+        Number of BCOs compared at a time.
+
+    Returns:
+    - list:
+        The object IDs of the BCOs that were updated.
+    """
+
+    updated = []
+    for object_id, _, expected in search_field_mismatches(batch_size):
+        keywords = expected.pop("keywords")
+        Bco.objects.filter(object_id=object_id).update(**expected)
+        set_bco_keywords(Bco(object_id=object_id), keywords)
+        updated.append(object_id)
+    return updated
+
 def validate_bco_object_id(object_id: str, prefix_name: str):
     """Validate BCO object ID
 
@@ -507,7 +1404,8 @@ def bco_counter_increment(bco_instance: Bco) -> int:
     """
     
     bco_instance.access_count = F('access_count') + 1
-    bco_instance.save()
+    # Only the counter is written, so the contents are not re-indexed.
+    bco_instance.save(update_fields=["access_count"])
 
     bco_instance.refresh_from_db()
 
@@ -578,6 +1476,8 @@ def publish_draft(bco_instance: Bco, user: User, object: dict):
     new_bco_instance = deepcopy(bco_instance)
     new_bco_instance.id = None
     new_bco_instance.state = "PUBLISHED"
+    # The copy has no authorized users of its own.
+    new_bco_instance.acl_users = []
     contents= new_bco_instance.contents
     if "published_object_id" in object:
         new_bco_instance.object_id = object["published_object_id"]
@@ -593,8 +1493,10 @@ def publish_draft(bco_instance: Bco, user: User, object: dict):
     )
     contents["etag"] = generate_etag(contents)
     score = bco_score(bco_instance=new_bco_instance)
+    keywords = set_search_fields(new_bco_instance)
 
     new_bco_instance.save()
+    set_bco_keywords(new_bco_instance, keywords)
 
     if "delete_draft" in object and object["delete_draft"] is True:
         deleted = delete_draft(bco_instance=bco_instance, user=user)
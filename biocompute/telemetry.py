@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# biocompute/telemetry.py
+
+"""Validation Telemetry
+
+Timing and error counters for `BcoValidator`. Each validated BCO gets a
+`ValidationTimings` record with the time spent per phase (`load`, `base`,
+`extension` and `score`), per schema URI, and the number of errors per
+schema keyword. The records are added up in the validator, for the request,
+and in the process-wide `validation_telemetry`, which backs the validation
+metrics endpoint and the `validation_profile` management command.
+
+Like the schema registry, the counters are per worker process; BCOs
+validated in the bulk validation process pool are not included. Schema URIs
+come from the validated BCOs, so the process totals keep the URIs of the
+shipped schemas and add up every other one under `OTHER_SCHEMAS`.
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from django.utils import timezone
+from biocompute.schemas import schema_registry
+
+OTHER_SCHEMAS = "other"
+
+class ValidationTimings:
+    """Validation Timings
+
+    Time spent, in seconds, per validation phase and per schema URI, and
+    error counts per schema keyword, for one or more validated BCOs.
+    """
+
+    def __init__(self):
+        self.objects = 0
+        self.phases = Counter()
+        self.schemas = Counter()
+        self.error_keywords = Counter()
+
+    @contextmanager
+    def phase(self, name: str, schema_uri: str=None):
+        """Time a block as phase `name`, and as `schema_uri` if given."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] += elapsed
+            if schema_uri is not None:
+                self.schemas[schema_uri] += elapsed
+
+    def update(self, other: "ValidationTimings"):
+        """Add the timings and counts of another record to this one."""
+
+        self.objects += other.objects
+        self.phases.update(other.phases)
+        self.schemas.update(other.schemas)
+        self.error_keywords.update(other.error_keywords)
+
+    def as_dict(self) -> dict:
+        """Returns the record with times in milliseconds."""
+
+        return {
+            "objects": self.objects,
+            "phases": {
+                name: round(seconds * 1000, 3)
+                for name, seconds in self.phases.items()
+            },
+            "schemas": {
+                uri: round(seconds * 1000, 3)
+                for uri, seconds in self.schemas.most_common()
+            },
+            "error_keywords": dict(self.error_keywords.most_common()),
+        }
+
+def _summary(samples: list) -> dict:
+    """Returns count, total, mean and max of `[count, total, max]` samples."""
+
+    count, total, longest = samples
+    return {
+        "count": count,
+        "total_ms": round(total * 1000, 3),
+        "mean_ms": round(total * 1000 / count, 3) if count else 0,
+        "max_ms": round(longest * 1000, 3),
+    }
+
+class ValidationTelemetry:
+    """Validation Telemetry
+
+    Process-wide totals of the `ValidationTimings` of every validated BCO.
+    For each phase and each schema URI it keeps the number of BCOs, the
+    total and the longest time, so that the expensive schemas stand out.
+    Schema URIs that the registry does not serve are counted together under
+    `OTHER_SCHEMAS`.
+
+    Parameters:
+    - registry (SchemaRegistry, optional):
+        Registry of the schema URIs that are counted on their own.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else schema_registry
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop every counter."""
+
+        with self._lock:
+            self.objects = 0
+            self.phases = {}
+            self.schemas = {}
+            self.error_keywords = Counter()
+            self.since = timezone.now()
+
+    @staticmethod
+    def _add(samples: dict, key: str, seconds: float):
+        entry = samples.setdefault(key, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    def record(self, timings: ValidationTimings):
+        """Add the record of one validated BCO to the totals."""
+
+        schemas = Counter()
+        for uri, seconds in timings.schemas.items():
+            schemas[uri if uri in self.registry else OTHER_SCHEMAS] += seconds
+        with self._lock:
+            self.objects += timings.objects
+            for name, seconds in timings.phases.items():
+                self._add(self.phases, name, seconds)
+            for uri, seconds in schemas.items():
+                self._add(self.schemas, uri, seconds)
+            self.error_keywords.update(timings.error_keywords)
+
+    def stats(self, top: int=None) -> dict:
+        """Stats
+
+        Returns the totals for the current worker process, with the schema
+        URIs ordered by total time.
+
+        Parameters:
+        - top (int, optional):
+            Only include the `top` most expensive schema URIs.
+        """
+
+        with self._lock:
+            schemas = sorted(
+                self.schemas.items(), key=lambda item: item[1][1],
+                reverse=True
+            )[:top]
+            return {
+                "pid": os.getpid(),
+                "since": self.since,
+                "objects": self.objects,
+                "phases": {
+                    name: _summary(samples)
+                    for name, samples in self.phases.items()
+                },
+                "schemas": {
+                    uri: _summary(samples) for uri, samples in schemas
+                },
+                "error_keywords": dict(self.error_keywords.most_common()),
+            }
+
+validation_telemetry = ValidationTelemetry()
@@ -9,6 +9,8 @@ from biocompute.apis import (
     DraftsPublishApi,
     PublishBcoApi,
     ValidateBcoApi,
+    ValidateBcoStreamApi,
+    ValidationMetricsApi,
     CompareBcoApi,
     ConverToLDH,
 )
@@ -18,6 +20,8 @@ urlpatterns = [
     path("objects/drafts/modify/", DraftsModifyApi.as_view()),
     path("objects/drafts/publish/", DraftsPublishApi.as_view()),
     path("objects/validate/", ValidateBcoApi.as_view()),
+    path("objects/validate/stream/", ValidateBcoStreamApi.as_view()),
+    path("objects/validate/metrics/", ValidationMetricsApi.as_view()),
     path("objects/publish/", PublishBcoApi.as_view()),
     path("objects/compare/", CompareBcoApi.as_view()),
     re_path("objects/convert_to_ldh/$", ConverToLDH.as_view()),
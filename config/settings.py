@@ -104,7 +104,8 @@ INSTALLED_APPS = [
     "reset_migrations",
     "authentication",
     "biocompute",
-    "prefix"
+    "prefix",
+    "search"
 ]
 
 # Source: https://dzone.com/articles/how-to-fix-django-cors-error
@@ -187,6 +188,90 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 # Make the object naming accessible as a dictionary.
 
+# Directory of the IEEE 2791 and extension JSON Schemas served by the
+# `biocompute.schemas.schema_registry`.
+BCO_SCHEMA_DIR = os.path.join(BASE_DIR, "config", "schemas")
+
+# Extension schemas that are not shipped in BCO_SCHEMA_DIR are fetched once
+# with a timeout (seconds). Each worker keeps the BCO_SCHEMA_CACHE_ENTRIES most
+# recently used ones in memory, and those from BCO_SCHEMA_CACHE_HOSTS are kept
+# in BCO_SCHEMA_CACHE_DIR. URIs that fail are not retried for
+# BCO_SCHEMA_NEGATIVE_TTL seconds. With BCO_SCHEMA_OFFLINE set, only the
+# shipped schemas and the cache directory are used.
+BCO_SCHEMA_RESOLVER = "biocompute.schemas.ExtensionSchemaResolver"
+BCO_SCHEMA_CACHE_DIR = os.path.join(BASE_DIR, "schema_cache")
+BCO_SCHEMA_CACHE_HOSTS = [
+    "raw.githubusercontent.com", "w3id.org", "www.w3id.org"
+]
+BCO_SCHEMA_CACHE_ENTRIES = 256
+BCO_SCHEMA_FETCH_TIMEOUT = 5
+BCO_SCHEMA_NEGATIVE_TTL = 300
+BCO_SCHEMA_OFFLINE = False
+
+# Validate with Python code generated from the shipped schemas instead of the
+# interpreted jsonschema validators. Schemas the generator does not support
+# fall back to jsonschema.
+BCO_VALIDATOR_CODEGEN = False
+
+# Size of the per-worker process pool used by bulk validation. Batches smaller
+# than BCO_VALIDATION_MIN_BATCH, or a pool size of 0 or 1, are validated
+# serially in the request process.
+BCO_VALIDATION_WORKERS = 0
+BCO_VALIDATION_MIN_BATCH = 32
+
+# Byte budget of the per-worker LRU cache of validation results.
+BCO_VALIDATION_CACHE_BYTES = 16 * 1024 * 1024
+
+# Django cache alias for the prefix permissions of users, and the lifetime of
+# an entry in seconds. None disables the cache. Entries are dropped only in the
+# cache of the process that changes a permission, so the alias must name a
+# backend shared by every worker process (Memcached, Redis or the database
+# cache, configured in CACHES). With a per-process cache, such as the default
+# LocMemCache, other gunicorn workers keep granting revoked permissions until
+# their entries expire.
+BCO_PERMISSION_CACHE = None
+BCO_PERMISSION_CACHE_TIMEOUT = 300
+
+# Users of verified bearer tokens, by token digest, are cached in this Django
+# cache for BCO_TOKEN_CACHE_TIMEOUT seconds at most, and never past the
+# token's expiry. None disables the cache. As with BCO_PERMISSION_CACHE, the
+# alias must name a backend shared by every worker process; with a
+# per-process cache, other workers keep authenticating the tokens of deleted
+# users and identities until their entries expire.
+BCO_TOKEN_CACHE = None
+BCO_TOKEN_CACHE_TIMEOUT = 60
+
+# Signing keys of JWT issuers (ORCID) are used for BCO_JWKS_TTL seconds and
+# refreshed in the background during the last BCO_JWKS_REFRESH_AHEAD seconds.
+# Unknown key ids refetch the keys at most every BCO_JWKS_MIN_REFETCH seconds.
+BCO_JWKS_TTL = 3600
+BCO_JWKS_REFRESH_AHEAD = 300
+BCO_JWKS_FETCH_TIMEOUT = 5
+BCO_JWKS_MIN_REFETCH = 60
+
+# BioCompute Portal tokens are verified locally when their issuer has a key
+# here, e.g. {"https://biocomputeobject.org": {"key": "<PEM public key>",
+# "algorithms": ["RS256"]}}. Other portal tokens are verified by the portal
+# and the result is kept in BCO_PORTAL_CACHE until the token expires, for
+# BCO_PORTAL_CACHE_TIMEOUT seconds at most.
+BCO_PORTAL_KEYS = {}
+BCO_PORTAL_CACHE = "default"
+BCO_PORTAL_CACHE_TIMEOUT = 3600
+BCO_PORTAL_VERIFY_TIMEOUT = 5
+
+# Searches of the BCO contents use the full-text index of the search app
+# (SQLite FTS5, or a tsvector column with a GIN index on PostgreSQL 12+) and
+# are ranked. Set to False to search the serialized contents with LIKE.
+BCO_SEARCH_FULL_TEXT = True
+
+# Search results are paginated with cursors: BCO_SEARCH_PAGE_SIZE BCOs per
+# page unless a `limit` of at most BCO_SEARCH_MAX_PAGE_SIZE is requested.
+BCO_SEARCH_PAGE_SIZE = 100
+BCO_SEARCH_MAX_PAGE_SIZE = 1000
+
+# Pagination headers of the search APIs that browsers may read.
+CORS_EXPOSE_HEADERS = ["Link", "X-Next-Cursor", "X-Total-Count"]
+
 # emailing notifications
 EMAIL_BACKEND = EMAIL_BACKEND
 EMAIL_HOST = "localhost"
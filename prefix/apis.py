@@ -9,7 +9,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from config.services import legacy_api_converter, bulk_response_constructor
 from prefix.services import PrefixSerializer, delete_prefix
-from prefix.selectors import get_prefix_object, get_user_prefixes
+from prefix.selectors import get_prefix_objects, get_user_prefixes
 
 user_permissions = {"tester": ["view_TEST", "publish_TEST"]}
 
@@ -342,9 +342,11 @@ class PrefixGetInfoApi(APIView):
                 data=NOPUB_data
             )
 
+        prefix_objects = get_prefix_objects(data)
         for index, object in enumerate(data):
             response_id = object
-            response_object = get_prefix_object(object)
+            response_object = prefix_objects.get(object) \
+                if isinstance(object, str) else None
             
             try: 
                 if response_object['public'] is True or \
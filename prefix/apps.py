@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class PrefixConfig(AppConfig):
+    name = "prefix"
+
+    def ready(self):
+        # Connects the request scope of the prefix permission resolvers.
+        import prefix.selectors
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+PREFIX_ACTIONS = ('view', 'add', 'change', 'delete', 'publish')
+
+
+def build_index(apps, schema_editor):
+    """Indexes the `<action>_<prefix>` permissions assigned to users."""
+
+    Prefix = apps.get_model('prefix', 'Prefix')
+    PrefixPermission = apps.get_model('prefix', 'PrefixPermission')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    prefixes = set(Prefix.objects.values_list('prefix', flat=True))
+    rows = []
+    for user_id, permission_id, codename in User.user_permissions.through\
+            .objects.filter(
+                permission__content_type__app_label='prefix'
+            ).values_list('user_id', 'permission_id', 'permission__codename'):
+        action, _, prefix_name = codename.partition('_')
+        if action in PREFIX_ACTIONS and prefix_name in prefixes:
+            rows.append(PrefixPermission(
+                prefix_id=prefix_name, user_id=user_id, action=action,
+                permission_id=permission_id
+            ))
+    PrefixPermission.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('prefix', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrefixPermission',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('view', 'view'), ('add', 'add'), ('change', 'change'), ('delete', 'delete'), ('publish', 'publish')], max_length=7)),
+                ('permission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prefix_permission_index', to='auth.permission')),
+                ('prefix', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_permission_index', to='prefix.prefix')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prefix_permission_index', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='prefixpermission',
+            index=models.Index(fields=['user', 'prefix'], name='prefix_pref_user_id_db5f61_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='prefixpermission',
+            constraint=models.UniqueConstraint(fields=('prefix', 'user', 'action'), name='unique_prefix_user_action'),
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
-from django.contrib.auth.models import Group, User
+from django.contrib.auth.models import Group, Permission, User
 from django.utils import timezone
 
+PREFIX_ACTIONS = ("view", "add", "change", "delete", "publish")
+
 class Prefix(models.Model):
     """
     """
@@ -31,4 +33,60 @@ class Prefix(models.Model):
 
     def __str__(self):
         """String for representing the BCO model (in Admin site etc.)."""
-        return f"{self.prefix}"
\ No newline at end of file
+        return f"{self.prefix}"
+class PrefixPermission(models.Model):
+    """Prefix Permission
+
+    Index of the prefix permissions assigned to users, one row per prefix,
+    user and action, so that the permissions of a prefix or a user are
+    looked up by key instead of by parsing `<action>_<prefix>` codenames.
+    Rows follow the user permissions through the `m2m_changed` receiver in
+    `prefix.selectors` and are deleted with the prefix, the user or the
+    permission.
+
+    Attributes:
+    -----------
+    prefix: ForeignKey(Prefix)
+        The prefix the permission is for
+    user: ForeignKey(User)
+        The user the permission is assigned to
+    action: str
+        One of view, add, change, delete and publish
+    permission: ForeignKey(Permission)
+        The `<action>_<prefix>` permission
+    """
+
+    prefix = models.ForeignKey(
+        Prefix,
+        on_delete=models.CASCADE,
+        to_field="prefix",
+        related_name="user_permission_index"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="prefix_permission_index"
+    )
+    action = models.CharField(
+        max_length=7,
+        choices=[(action, action) for action in PREFIX_ACTIONS]
+    )
+    permission = models.ForeignKey(
+        Permission,
+        on_delete=models.CASCADE,
+        related_name="prefix_permission_index"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["prefix", "user", "action"],
+                name="unique_prefix_user_action"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["user", "prefix"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.action}_{self.prefix_id}"
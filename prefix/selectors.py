@@ -5,10 +5,325 @@
 Functions to query the database related to Prefixes
 """
 
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import caches
 from django.core.serializers import serialize
 from django.contrib.auth.models import User, Permission
-from django.db import utils 
-from prefix.models import Prefix
+from django.core.signals import request_finished, request_started
+from django.db import transaction, utils 
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from prefix.models import PREFIX_ACTIONS, Prefix, PrefixPermission
+
+PERMISSION_CACHE = getattr(settings, "BCO_PERMISSION_CACHE", None)
+PERMISSION_CACHE_TIMEOUT = getattr(
+    settings, "BCO_PERMISSION_CACHE_TIMEOUT", 300
+)
+
+class PrefixPermissionCache:
+    """Prefix Permission Cache
+
+    Cross-request cache, in a Django cache, of the prefixes (name -> public)
+    and of each user's permission codenames. The entries are dropped by the
+    `post_save`, `post_delete` and `m2m_changed` receivers below whenever a
+    prefix, a permission or a user's permissions change, once when the
+    change is made and once more when its transaction commits.
+
+    Every key includes a generation number. Changes that can affect any
+    user, like deleting a permission, bump the generation instead of
+    deleting keys one by one.
+
+    Data read inside a transaction is not cached, so uncommitted or rolled
+    back changes are never served to other requests. With several worker
+    processes the cache must be shared (e.g. Memcached or Redis) for changes
+    to reach every worker, which is why it is disabled unless
+    `BCO_PERMISSION_CACHE` names a cache.
+
+    Parameters:
+    - alias (str):
+        Alias of the Django cache to use. `None` disables the cache.
+    - timeout (int):
+        Lifetime of an entry in seconds.
+    """
+
+    GENERATION_KEY = "prefix_permissions:generation"
+
+    def __init__(
+        self,
+        alias: str=PERMISSION_CACHE,
+        timeout: int=PERMISSION_CACHE_TIMEOUT
+    ):
+        self.alias = alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias] if self.alias else None
+
+    def _key(self, name: str) -> str:
+        generation = self.cache.get_or_set(self.GENERATION_KEY, 0, None)
+        return f"prefix_permissions:{generation}:{name}"
+
+    def _get(self, name: str, load):
+        if self.cache is None:
+            return load()
+        key = self._key(name)
+        value = self.cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = load()
+        if not transaction.get_connection().in_atomic_block:
+            self.cache.set(key, value, self.timeout)
+        return value
+
+    def _delete(self, name: str):
+        if self.cache is None:
+            return
+        self.cache.delete(self._key(name))
+
+    def _on_change(self, function, *args):
+        """Run an invalidation now and again when the transaction commits."""
+
+        function(*args)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: function(*args))
+
+    def prefixes(self) -> dict:
+        """Returns whether each existing prefix is public, by prefix name."""
+
+        return self._get("prefixes", lambda: dict(
+            Prefix.objects.values_list("prefix", "public")
+        ))
+
+    def user_codenames(self, user: User) -> list:
+        """Returns the codenames of the permissions assigned to a user."""
+
+        def load():
+            return list(user.user_permissions.values_list("codename", flat=True))
+
+        if user.pk is None:
+            return load()
+        return self._get(f"user:{user.pk}", load)
+
+    def invalidate_prefixes(self):
+        """Drop the cached prefixes."""
+
+        self._on_change(self._delete, "prefixes")
+
+    def invalidate_user(self, user_id: int):
+        """Drop the cached permissions of one user."""
+
+        self._on_change(self._delete, f"user:{user_id}")
+
+    def invalidate_all(self):
+        """Drop every entry by moving on to the next generation."""
+
+        def bump():
+            if self.cache is None:
+                return
+            try:
+                self.cache.incr(self.GENERATION_KEY)
+            except ValueError:
+                self.cache.set(self.GENERATION_KEY, 1, None)
+
+        self._on_change(bump)
+
+    def stats(self) -> dict:
+        """Returns the hit and miss counts of the current worker process."""
+
+        return {
+            "alias": self.alias,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+permission_cache = PrefixPermissionCache()
+
+@receiver(post_save, sender=Prefix)
+def _prefix_saved(sender, instance, **kwargs):
+    # Saving the counter on every new draft does not change the prefixes.
+    if permission_cache.cache is not None:
+        prefixes = permission_cache.cache.get(permission_cache._key("prefixes"))
+        if prefixes is not None \
+                and prefixes.get(instance.prefix) == instance.public:
+            return
+    permission_cache.invalidate_prefixes()
+
+@receiver(post_delete, sender=Prefix)
+def _prefix_deleted(sender, instance, **kwargs):
+    permission_cache.invalidate_prefixes()
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def _permission_changed(sender, instance, created=False, **kwargs):
+    # A new permission is not assigned to anyone yet.
+    if not created:
+        permission_cache.invalidate_all()
+
+@receiver(post_delete, sender=User)
+def _user_deleted(sender, instance, **kwargs):
+    permission_cache.invalidate_user(instance.pk)
+
+def _index_permissions(user_ids, permissions):
+    """Adds the `<action>_<prefix>` permissions among `permissions` to the
+    `PrefixPermission` index for every user. Rows that already exist are
+    left as they are."""
+
+    parsed = []
+    for permission in permissions:
+        action, _, prefix_name = permission.codename.partition("_")
+        if action in PREFIX_ACTIONS:
+            parsed.append((permission, action, prefix_name))
+    prefixes = set(Prefix.objects.filter(
+        prefix__in={prefix_name for _, _, prefix_name in parsed}
+    ).values_list("prefix", flat=True))
+    PrefixPermission.objects.bulk_create([
+        PrefixPermission(
+            prefix_id=prefix_name, user_id=user_id, action=action,
+            permission=permission
+        )
+        for permission, action, prefix_name in parsed
+        if prefix_name in prefixes
+        for user_id in user_ids
+    ], ignore_conflicts=True)
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def _user_permissions_changed(sender, instance, action, reverse, pk_set,
+        **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    # Keep the index in step with the assignments, however they are made.
+    if action == "post_add" and pk_set:
+        if reverse:
+            _index_permissions(pk_set, [instance])
+        else:
+            _index_permissions(
+                [instance.pk], Permission.objects.filter(pk__in=pk_set)
+            )
+    elif action == "post_remove" and pk_set:
+        if reverse:
+            PrefixPermission.objects.filter(
+                permission=instance, user_id__in=pk_set
+            ).delete()
+        else:
+            PrefixPermission.objects.filter(
+                user=instance, permission_id__in=pk_set
+            ).delete()
+    elif action == "post_clear":
+        if reverse:
+            PrefixPermission.objects.filter(permission=instance).delete()
+        else:
+            PrefixPermission.objects.filter(user=instance).delete()
+
+    if not reverse:
+        permission_cache.invalidate_user(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            permission_cache.invalidate_user(user_id)
+    else:
+        # `permission.user_set.clear()` does not say which users had it.
+        permission_cache.invalidate_all()
+
+# Memos of the current request by name, `None` outside of a request.
+_request_scope = ContextVar("request_scope", default=None)
+
+class PrefixPermissionResolver:
+    """Prefix Permission Resolver
+
+    The prefix permissions of one user, read from the `permission_cache`
+    or loaded with one query for the prefixes and one for the user's
+    permissions. Every action is allowed on a public prefix; on a private
+    prefix the user needs the `<action>_<prefix>` permission.
+
+    Attributes:
+    - prefixes (dict):
+        Whether each existing prefix is public, by prefix name.
+    - user_codenames (list):
+        Codenames of the permissions assigned to the user.
+    - codenames (set):
+        The same codenames, for lookups.
+    """
+
+    def __init__(self, user: User):
+        self.prefixes = permission_cache.prefixes()
+        self.user_codenames = permission_cache.user_codenames(user)
+        self.codenames = set(self.user_codenames)
+
+    def can(self, action: str, prefix_name: str) -> bool:
+        """Can
+
+        Returns a bool if the user can perform `action` on BCOs with the
+        prefix. If the prefix does not exist `None` is returned.
+
+        Parameters:
+        - action (str):
+            One of `PREFIX_ACTIONS`.
+        - prefix_name (str):
+            The prefix to check.
+        """
+
+        public = self.prefixes.get(prefix_name)
+        if public is None:
+            return None
+        return public or f"{action}_{prefix_name}" in self.codenames
+
+    def prefixes_for(self, action: str) -> set:
+        """Returns the prefixes the user can perform `action` on."""
+
+        return {
+            prefix_name for prefix_name, public in self.prefixes.items()
+            if public or f"{action}_{prefix_name}" in self.codenames
+        }
+
+@receiver(request_started)
+def _start_request_scope(**kwargs):
+    _request_scope.set({})
+
+@receiver(request_finished)
+def _end_request_scope(**kwargs):
+    _request_scope.set(None)
+
+def request_scope(name: str) -> dict:
+    """Request Scope
+
+    Returns the memo dictionary called `name` of the current request, which
+    is dropped when the request finishes. Outside of a request `None` is
+    returned and callers should not memoize.
+    """
+
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    return scope.setdefault(name, {})
+
+def get_permission_resolver(user: User) -> PrefixPermissionResolver:
+    """Get Permission Resolver
+
+    Returns the `PrefixPermissionResolver` for a user. During a request it
+    is built once per user and reused by every permission check of that
+    request; outside of a request a new one is built on each call.
+    """
+
+    resolvers = request_scope("prefix_permission_resolvers")
+    if resolvers is None:
+        return PrefixPermissionResolver(user)
+    key = user.pk
+    if key not in resolvers:
+        resolvers[key] = PrefixPermissionResolver(user)
+    return resolvers[key]
+
+def clear_permission_resolvers():
+    """Drop the resolvers of the current request, after permission changes."""
+
+    resolvers = request_scope("prefix_permission_resolvers")
+    if resolvers is not None:
+        resolvers.clear()
 
 def user_can_publish_prefix(user: User, prefix_name:str) -> bool:
     """User Can Publish
@@ -18,13 +333,7 @@ def user_can_publish_prefix(user: User, prefix_name:str) -> bool:
     returned.
     """
 
-    try:
-        Prefix.objects.get(prefix=prefix_name)
-    except Prefix.DoesNotExist:
-        return None
-    codename = f"publish_{prefix_name}"
-    user_prefixes = get_user_prefixes(user)
-    return codename in user_prefixes 
+    return get_permission_resolver(user).can("publish", prefix_name)
 
 def user_can_modify_prefix(user: User, prefix_name:str) -> bool:
     """User Can Modify
@@ -34,14 +343,7 @@ def user_can_modify_prefix(user: User, prefix_name:str) -> bool:
     returned.
     """
 
-    try:
-        Prefix.objects.get(prefix=prefix_name)
-    except Prefix.DoesNotExist:
-        return None
-    codename = f"change_{prefix_name}"
-    user_prefixes = get_user_prefixes(user)
-
-    return codename in user_prefixes 
+    return get_permission_resolver(user).can("change", prefix_name)
 
 def user_can_draft_prefix(user: User, prefix_name:str) -> bool:
     """User Can Draft
@@ -51,14 +353,7 @@ def user_can_draft_prefix(user: User, prefix_name:str) -> bool:
     is returned.
     """
 
-    try:
-        Prefix.objects.get(prefix=prefix_name)
-    except Prefix.DoesNotExist:
-        return None
-    codename = f"add_{prefix_name}"
-    user_prefixes = get_user_prefixes(user)
-
-    return codename in user_prefixes 
+    return get_permission_resolver(user).can("add", prefix_name)
 
 def user_can_view_prefix(prefix_name:str, user: User) -> bool:
     """User Can View
@@ -68,16 +363,7 @@ def user_can_view_prefix(prefix_name:str, user: User) -> bool:
     is returned.
     """
 
-    try:
-        prefix_instance = Prefix.objects.get(prefix=prefix_name)
-        if prefix_instance.public is True:
-            return True
-    except Prefix.DoesNotExist:
-        return None
-    codename = f"view_{prefix_name}"
-    user_prefixes = get_user_prefixes(user)
-
-    return codename in user_prefixes 
+    return get_permission_resolver(user).can("view", prefix_name)
 
 def get_user_prefixes(user: User) -> list:
     """Get User Prefixes
@@ -91,15 +377,13 @@ def get_user_prefixes(user: User) -> list:
     directly assigned to the user via user permissions.
     """
 
-    prefix_permissions = []
-
-    public_prefixes = Prefix.objects.filter(public=True)
-    for prefix_instance in public_prefixes:
-        for perm in [ "view", "add", "change", "delete", "publish"]:
-            codename = f"{perm}_{prefix_instance.prefix}"
-            prefix_permissions.append(codename)
-    for permission in user.user_permissions.all():
-        prefix_permissions.append(permission.codename)
+    resolver = get_permission_resolver(user)
+    prefix_permissions = [
+        f"{perm}_{prefix_name}"
+        for prefix_name, public in resolver.prefixes.items() if public
+        for perm in PREFIX_ACTIONS
+    ]
+    prefix_permissions.extend(resolver.user_codenames)
 
     return  prefix_permissions
 
@@ -112,45 +396,80 @@ def get_prefix_object(prefix_name:str) -> dict:
     be included.
     """
 
-    try:
-        prefix_instance = Prefix.objects.get(prefix=prefix_name)
-    except Prefix.DoesNotExist:
-        return None
+    return get_prefix_objects([prefix_name]).get(prefix_name)
+
+def get_prefix_objects(prefix_names: list) -> dict:
+    """Get Prefix Objects
+
+    Batch form of `get_prefix_object`. The prefixes and the users' prefix
+    permissions are read in one query, joining the `PrefixPermission`
+    index, so the permission codenames are not parsed or looked up one by
+    one.
+
+    Parameters:
+    - prefix_names (list):
+        The prefixes to serialize.
+
+    Returns:
+    - dict:
+        The serialized prefixes by name, for the prefixes that exist.
+    """
 
-    prefix_object = { #serialize('python', [prefix_instance])[0]
-        "pk": prefix_instance.pk,
-        "created": prefix_instance.created,
-        "description": prefix_instance.description,
-        "owner": prefix_instance.owner.username,
-        "public": prefix_instance.public,
-        "counter": prefix_instance.counter
+    rows = Prefix.objects.filter(
+        prefix__in=[name for name in prefix_names if isinstance(name, str)]
+    ).order_by(
+        "prefix", "user_permission_index__user__username"
+    ).values_list(
+        "prefix", "created", "description", "owner_id", "public", "counter",
+        "user_permission_index__user__username",
+        "user_permission_index__action"
+    )
+
+    prefix_objects = {}
+    user_actions = {}
+    for prefix_name, created, description, owner, public, counter, \
+            username, action in rows:
+        if prefix_name not in prefix_objects:
+            prefix_objects[prefix_name] = {
+                "pk": prefix_name,
+                "created": created,
+                "description": description,
+                "owner": owner,
+                "public": public,
+                "counter": counter
+            }
+            user_actions[prefix_name] = {}
+        if username is not None:
+            user_actions[prefix_name].setdefault(username, set()).add(action)
+
+    for prefix_name, prefix_object in prefix_objects.items():
+        if prefix_object["public"] is False:
+            prefix_object["user_permissions"] = _permission_codenames(
+                prefix_name, user_actions[prefix_name]
+            )
+    return prefix_objects
+
+def _permission_codenames(prefix_name: str, user_actions: dict) -> dict:
+    """Returns the `<action>_<prefix>` codenames of each user's actions."""
+
+    return {
+        username: [
+            f"{action}_{prefix_name}" for action in PREFIX_ACTIONS
+            if action in actions
+        ]
+        for username, actions in user_actions.items()
     }
-    if prefix_instance.public is False:
-        prefix_permissions = get_prefix_permissions(prefix_name)
-        prefix_object["user_permissions"] = prefix_permissions
-    return prefix_object
 
 def get_prefix_permissions(prefix_name:str) -> dict:
     """Get Prefix Permissions
 
-    Returns a dictionary with users and the associated Prefix permisssions.
+    Returns a dictionary with users and the associated Prefix permisssions,
+    read from the `PrefixPermission` index.
     """
 
-    users_permissions = {}
-    perms = []
-    for perm in [ "view", "add", "change", "delete", "publish"]:
-        codename = f"{perm}_{prefix_name}"
-        try:
-            perms.append(Permission.objects.get(codename__exact=codename))
-        except Permission.DoesNotExist:
-            pass
-
-    for perm in perms:
-        users_with_perm = User.objects.filter(user_permissions=perm).prefetch_related('user_permissions')
-        for user in users_with_perm:
-            if user.username not in users_permissions:
-                users_permissions[user.username] = []
-            if perm.codename not in users_permissions[user.username]:
-                users_permissions[user.username].append(perm.codename)
-    
-    return users_permissions
+    user_actions = {}
+    for username, action in PrefixPermission.objects.filter(
+        prefix_id=prefix_name
+    ).order_by("user__username").values_list("user__username", "action"):
+        user_actions.setdefault(username, set()).add(action)
+    return _permission_codenames(prefix_name, user_actions)
@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 # prefix/services.py
 
+from biocompute.models import Bco
 from django.conf import settings
 from django.contrib.auth.models import User, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction, utils 
 from django.db.models import F
 from django.utils import timezone
-from prefix.models import Prefix
-from prefix.selectors import get_prefix_object, get_prefix_permissions
+from prefix.models import PREFIX_ACTIONS, Prefix
+from prefix.selectors import (
+    clear_permission_resolvers,
+    get_prefix_object,
+    get_prefix_permissions
+)
 from rest_framework import serializers
 
 """Prefix Services
@@ -112,6 +117,7 @@ class PrefixSerializer(serializers.Serializer):
         if public is False:
             create_permissions_for_prefix(prefix_instance)
         prefix_instance.save()
+        clear_permission_resolvers()
         return prefix_instance
 
     @transaction.atomic
@@ -143,6 +149,9 @@ class PrefixSerializer(serializers.Serializer):
             # add permissions to public -> private
             # Remove permissions to private -> public
             prefix_instance.public = validated_data['public']
+            Bco.objects.filter(prefix_id=prefix_name).update(
+                acl_public=prefix_instance.public
+            )
         old_perms = get_prefix_permissions(prefix_name=prefix_name)
         if validated_data['user_permissions'] != old_perms:
             update_user_permissions(
@@ -155,6 +164,7 @@ class PrefixSerializer(serializers.Serializer):
             'description', prefix_instance.description
         )
         prefix_instance.save()
+        clear_permission_resolvers()
         prefix_object = get_prefix_object(prefix_name)
         return prefix_object
 
@@ -166,54 +176,52 @@ def update_user_permissions(prefix_name:str, new_perms:dict, old_perms:dict):
     Step 1: Build a list of permissions associated with the prefix
     Step 2: Iterate over users to update each user's permissions
     Step 3: Determine which permissions to add and which to remove
-    Step 4: Apply permission updates
+    Step 4: Apply permission updates. The `PrefixPermission` index follows
+        through the `m2m_changed` receiver in `prefix.selectors`
     """
 
     # Build a list of permissions associated with the prefix
-    prefix_permissions = []
-    for perm_type in ["view", "add", "change", "delete", "publish"]:
-        codename = f"{perm_type}_{prefix_name}"
-        try:
-            perm = Permission.objects.get(codename=codename)
-            prefix_permissions.append(perm)
-        except Permission.DoesNotExist:
-            pass
-
-    prefix_permissions_dict = {perm.codename: perm for perm in prefix_permissions}
+    prefix_permissions_dict = {
+        perm.codename: perm for perm in Permission.objects.filter(
+            codename__in=[
+                f"{perm_type}_{prefix_name}" for perm_type in PREFIX_ACTIONS
+            ]
+        )
+    }
 
     # Set of all users mentioned in either new or old perms
     all_users = set(new_perms.keys()) | set(old_perms.keys())
+    users = User.objects.in_bulk(all_users, field_name="username")
 
     for username in all_users:
-        try:
-            user = User.objects.get(username=username)
-            # Current permissions from old_perms or empty if not previously set
-            current_perms = set(
-                prefix_permissions_dict.get(perm_codename)
-                for perm_codename in old_perms.get(username, [])
-                if perm_codename in prefix_permissions_dict
-            )
-            
-            # New permissions from new_perms or empty if not provided
-            new_perms_set = set(
-                prefix_permissions_dict.get(perm_codename)
-                for perm_codename in new_perms.get(username, [])
-                if perm_codename in prefix_permissions_dict
-            )
+        user = users.get(username)
+        if user is None:
+            # Optionally handle the case where the user doesn't exist
+            continue
 
-            # Determine permissions to add and to remove
-            perms_to_add = new_perms_set - current_perms
-            perms_to_remove = current_perms - new_perms_set
+        # Current permissions from old_perms or empty if not previously set
+        current_perms = set(
+            prefix_permissions_dict.get(perm_codename)
+            for perm_codename in old_perms.get(username, [])
+            if perm_codename in prefix_permissions_dict
+        )
+        
+        # New permissions from new_perms or empty if not provided
+        new_perms_set = set(
+            prefix_permissions_dict.get(perm_codename)
+            for perm_codename in new_perms.get(username, [])
+            if perm_codename in prefix_permissions_dict
+        )
 
-            # Apply permission updates
-            if perms_to_add:
-                user.user_permissions.add(*perms_to_add)
-            if perms_to_remove:
-                user.user_permissions.remove(*perms_to_remove)
+        # Determine permissions to add and to remove
+        perms_to_add = new_perms_set - current_perms
+        perms_to_remove = current_perms - new_perms_set
 
-        except User.DoesNotExist:
-            # Optionally handle the case where the user doesn't exist
-            pass
+        # Apply permission updates
+        if perms_to_add:
+            user.user_permissions.add(*perms_to_add)
+        if perms_to_remove:
+            user.user_permissions.remove(*perms_to_remove)
 
 
 def create_permissions_for_prefix(instance=Prefix):
@@ -281,6 +289,7 @@ def delete_prefix(prefix_name: str, user: User) -> bool:
                     Permission.objects.get(codename=f"{perm}_{prefix_name}").delete()
                 except Permission.DoesNotExist:
                     pass
+        clear_permission_resolvers()
         return True
     
     return f"You do not have permissions to delete that prefix, {prefix_name}."
@@ -2,7 +2,7 @@
 
 import json
 from biocompute.models import Bco
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.contrib.auth.models import User
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -10,11 +10,87 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from search.selectors import controled_list, RETURN_VALUES
+from search.selectors import (
+    controled_list,
+    projection,
+    search_contents,
+    search_fields,
+    search_page,
+    search_query,
+    RETURN_VALUES,
+    SORT_FIELDS,
+    SUMMARY_VALUES,
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_PAGE_SIZE
+)
 from search.selectors import RETURN_VALUES as return_values
-from itertools import chain
 from config.services import legacy_api_converter
 
+def query_flag(request, name: str) -> bool:
+    """Whether a boolean query parameter is set."""
+
+    return request.GET.get(name, "").lower() in ("1", "true", "yes")
+
+def paginated_response(request, bcos) -> Response:
+    """Paginated Response
+
+    Responds with one page of BCOs, selected by the `cursor`, `limit`,
+    `sort` and `count` query parameters. The body is the list of BCOs, with the
+    `fields` requested, the `SUMMARY_VALUES` with `summary=true` or else
+    the `RETURN_VALUES`. When there are more, the `next` cursor is in the
+    `X-Next-Cursor` header and the URL of the next page in the `Link`
+    header; with `count=true` the number of matching BCOs is in the
+    `X-Total-Count` header.
+    """
+
+    fields = return_values
+    if request.GET.getlist("fields"):
+        if query_flag(request, "summary"):
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"message": "Use either fields or summary."}
+            )
+        try:
+            fields = projection(request.GET.getlist("fields"))
+        except ValueError as error:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST, data={"message": f"{error}"}
+            )
+    elif query_flag(request, "summary"):
+        fields = SUMMARY_VALUES
+
+    try:
+        limit = int(request.GET.get("limit", SEARCH_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= SEARCH_MAX_PAGE_SIZE:
+        return Response(
+            status=status.HTTP_400_BAD_REQUEST,
+            data={"message": "The limit must be a number from 1 to "\
+                + f"{SEARCH_MAX_PAGE_SIZE}."}
+        )
+    try:
+        bco_data, next_cursor = search_page(
+            bcos, fields, request.GET.get("cursor"), limit,
+            request.GET.get("sort")
+        )
+    except ValueError as error:
+        return Response(
+            status=status.HTTP_400_BAD_REQUEST, data={"message": f"{error}"}
+        )
+
+    headers = {}
+    if next_cursor is not None:
+        params = request.GET.copy()
+        params["cursor"] = next_cursor
+        next_url = request.build_absolute_uri(request.path) + "?"\
+            + params.urlencode()
+        headers["Link"] = f'<{next_url}>; rel="next"'
+        headers["X-Next-Cursor"] = next_cursor
+    if query_flag(request, "count"):
+        headers["X-Total-Count"] = str(bcos.count())
+    return Response(status=status.HTTP_200_OK, data=bco_data, headers=headers)
+
 class SearchUsersAPI(APIView):
     """
     Search the BCODB for Users
@@ -71,6 +147,25 @@ class SearchObjectsAPI(APIView):
     curl -X GET "http://localhost:8000/api/objects/?contents=review&prefix=BCO&owner=tester&object_id=BCO" -H "accept: application/json"
     ```
 
+    Results are paginated, newest first or best match first for `contents`
+    searches. A page has `limit` BCOs; the `Link` header has the URL of the
+    next page and the `X-Next-Cursor` header its `cursor`. With
+    `count=true` the `X-Total-Count` header has the number of matches.
+
+    `name`, `version`, `license`, `keyword`, `created_since` and
+    `created_before` filter BCOs by fields extracted from their contents,
+    and `sort` orders them by one of these fields or `last_update`.
+
+    `q` filters BCOs by structured queries on paths in their contents, such
+    as `provenance_domain.version = "1.0"` or
+    `execution_domain.software_prerequisites.name ^= "HIVE"`, combined with
+    `AND`, `OR`, `NOT` and parentheses.
+
+    `fields` selects the fields of each BCO, including paths into the
+    contents such as `contents.provenance_domain.name`, and `summary=true`
+    returns only the `object_id`, `name`, `state`, `owner` and
+    `last_update` of each BCO.
+
     This API view is accessible to any user without authentication requirements.
     """
 
@@ -86,7 +181,52 @@ class SearchObjectsAPI(APIView):
           ),
           openapi.Parameter('contents', 
             openapi.IN_QUERY,
-            description="Search in the BCO JSON contents.",
+            description="Full-text search of the BCO name, keywords, "\
+              + "pipeline steps and usability domain. Results are ranked, "\
+              + "best match first.",
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('name', 
+            openapi.IN_QUERY,
+            description="BCO name (provenance_domain.name) to search for.", 
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('version', 
+            openapi.IN_QUERY,
+            description="BCO version (provenance_domain.version) to search"\
+              + " for.", 
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('license', 
+            openapi.IN_QUERY,
+            description="BCO license (provenance_domain.license) to search"\
+              + " for.", 
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('keyword', 
+            openapi.IN_QUERY,
+            description="Keyword of the description domain to search for.", 
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('created_since', 
+            openapi.IN_QUERY,
+            description="BCOs created (provenance_domain.created) on or"\
+              + " after this ISO 8601 date or datetime.", 
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('created_before', 
+            openapi.IN_QUERY,
+            description="BCOs created (provenance_domain.created) before"\
+              + " this ISO 8601 date or datetime.", 
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('q', 
+            openapi.IN_QUERY,
+            description="Query on paths in the BCO contents, such as "\
+              + "provenance_domain.version = \"1.0\" AND "\
+              + "io_domain.input_subdomain.uri.uri ^= \"https://\". "\
+              + "Operators are =, ^= (starts with), >, >=, < and <=; "\
+              + "comparisons combine with AND, OR, NOT and parentheses.",
             type=openapi.TYPE_STRING
           ),
           openapi.Parameter('prefix', 
@@ -128,6 +268,43 @@ class SearchObjectsAPI(APIView):
             description="Then number of times this object has been downloaded or"\
               + " viewed.", 
             type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('limit', 
+            openapi.IN_QUERY,
+            description=f"Number of BCOs per page, at most {SEARCH_MAX_PAGE_SIZE}.", 
+            type=openapi.TYPE_INTEGER,
+            default=SEARCH_PAGE_SIZE
+          ),
+          openapi.Parameter('sort', 
+            openapi.IN_QUERY,
+            description=f"Sort by {', '.join(SORT_FIELDS)}; descending with"\
+              + " a leading -. Defaults to -last_update, or to the best"\
+              + " match first for contents searches.", 
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('cursor', 
+            openapi.IN_QUERY,
+            description="The `X-Next-Cursor` of the previous page.", 
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('fields', 
+            openapi.IN_QUERY,
+            description="Comma separated fields of each BCO: "\
+              + f"{', '.join(RETURN_VALUES)} or paths into the contents "\
+              + "such as contents.provenance_domain.name.", 
+            type=openapi.TYPE_STRING
+          ),
+          openapi.Parameter('summary', 
+            openapi.IN_QUERY,
+            description="Return only the object_id, name, state, owner and"\
+              + " last_update of each BCO.", 
+            type=openapi.TYPE_BOOLEAN
+          ),
+          openapi.Parameter('count', 
+            openapi.IN_QUERY,
+            description="Return the number of matching BCOs in the"\
+              + " `X-Total-Count` header.", 
+            type=openapi.TYPE_BOOLEAN
           )
         ],
         responses={
@@ -143,15 +320,40 @@ class SearchObjectsAPI(APIView):
 
         for field in return_values:
            values = request.GET.getlist(field)
-           if values:
+           if values and field != "contents":
               field_query = Q()
               for value in values:
-                    field_query |= Q(**{f'{field}__icontains': value})
+                    if field == "authorized_users":
+                       # An EXISTS per BCO, as a join would repeat the BCOs
+                       # with several matching users.
+                       field_query |= Exists(
+                          Bco.authorized_users.through.objects.filter(
+                             bco_id=OuterRef("pk"),
+                             user__username__icontains=value
+                          )
+                       )
+                    else:
+                       field_query |= Q(**{f'{field}__icontains': value})
               query &= field_query
 
         return_bco = viewable_bcos.filter(query)
-        bco_data = chain(return_bco.values(*return_values))
-        return Response(status=status.HTTP_200_OK, data=bco_data)
+        filters = {
+           field: request.GET.getlist(field)
+           for field in ["name", "version", "license", "keyword"]
+        }
+        filters["created_since"] = request.GET.get("created_since")
+        filters["created_before"] = request.GET.get("created_before")
+        try:
+           return_bco = search_fields(return_bco, filters)
+           return_bco = search_query(return_bco, request.GET.getlist("q"))
+        except ValueError as error:
+           return Response(
+              status=status.HTTP_400_BAD_REQUEST, data={"message": f"{error}"}
+           )
+        contents = request.GET.getlist("contents")
+        if contents:
+           return_bco = search_contents(return_bco, contents)
+        return paginated_response(request, return_bco)
 
 class DepreciatedSearchObjectsAPI(SearchObjectsAPI):
     swagger_schema = None
@@ -159,7 +361,9 @@ class DepreciatedSearchObjectsAPI(SearchObjectsAPI):
     def post(self, request) -> Response:
         """
         This POST method is deprecated.
-        Please use GET instead.
+        Please use GET instead. Results are paginated and projected like
+        GET results, with the `cursor`, `limit`, `count`, `fields` and
+        `summary` query parameters.
         """
         viewable_bcos = controled_list(request.user)
         data = legacy_api_converter(request.data)
@@ -185,5 +389,4 @@ class DepreciatedSearchObjectsAPI(SearchObjectsAPI):
               query &= field_query
 
         return_bco = viewable_bcos.filter(query)
-        bco_data = chain(return_bco.values(*return_values))
-        return Response(status=status.HTTP_200_OK, data=bco_data)
\ No newline at end of file
+        return paginated_response(request, return_bco)
\ No newline at end of file
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# search/management/commands/search_index.py
+
+"""Search Index
+
+Rebuilds the full-text search documents of every BCO. BCOs saved through
+the models are indexed when they are saved; run this after writing BCOs
+with `bulk_create`, `update` or SQL.
+
+    python manage.py search_index
+"""
+
+from django.core.management.base import BaseCommand
+from search.services import rebuild_search_index
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of the BCOs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Number of BCOs indexed at a time (default: 1000)."
+        )
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index(options["batch_size"])
+        self.stdout.write(f"Indexed {indexed} BCOs.")
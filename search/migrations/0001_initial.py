@@ -0,0 +1,149 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+FULL_TEXT_SQL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE search_bco_fts USING fts5("
+        " name, keywords, steps, usability,"
+        " content='search_bcodocument', content_rowid='id',"
+        " tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER search_bcodocument_ai AFTER INSERT ON search_bcodocument"
+        " BEGIN"
+        " INSERT INTO search_bco_fts(rowid, name, keywords, steps, usability)"
+        " VALUES (new.id, new.name, new.keywords, new.steps, new.usability);"
+        " END",
+        "CREATE TRIGGER search_bcodocument_ad AFTER DELETE ON search_bcodocument"
+        " BEGIN"
+        " INSERT INTO search_bco_fts("
+        "search_bco_fts, rowid, name, keywords, steps, usability)"
+        " VALUES ('delete', old.id, old.name, old.keywords, old.steps,"
+        " old.usability);"
+        " END",
+        "CREATE TRIGGER search_bcodocument_au AFTER UPDATE ON search_bcodocument"
+        " BEGIN"
+        " INSERT INTO search_bco_fts("
+        "search_bco_fts, rowid, name, keywords, steps, usability)"
+        " VALUES ('delete', old.id, old.name, old.keywords, old.steps,"
+        " old.usability);"
+        " INSERT INTO search_bco_fts(rowid, name, keywords, steps, usability)"
+        " VALUES (new.id, new.name, new.keywords, new.steps, new.usability);"
+        " END",
+    ],
+    'postgresql': [
+        "ALTER TABLE search_bcodocument ADD COLUMN document tsvector"
+        " GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', name), 'A')"
+        " || setweight(to_tsvector('simple', keywords), 'B')"
+        " || setweight(to_tsvector('simple', steps), 'C')"
+        " || setweight(to_tsvector('simple', usability), 'D')) STORED",
+        "CREATE INDEX search_bcodocument_document"
+        " ON search_bcodocument USING GIN (document)",
+    ],
+}
+
+DROP_FULL_TEXT_SQL = {
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS search_bcodocument_au",
+        "DROP TRIGGER IF EXISTS search_bcodocument_ad",
+        "DROP TRIGGER IF EXISTS search_bcodocument_ai",
+        "DROP TABLE IF EXISTS search_bco_fts",
+    ],
+    'postgresql': [
+        "ALTER TABLE search_bcodocument DROP COLUMN IF EXISTS document",
+    ],
+}
+
+
+def create_full_text_index(apps, schema_editor):
+    """Creates the full-text index of the database, if it has one."""
+
+    for statement in FULL_TEXT_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_full_text_index(apps, schema_editor):
+    for statement in DROP_FULL_TEXT_SQL.get(
+        schema_editor.connection.vendor, []
+    ):
+        schema_editor.execute(statement)
+
+
+def strings(value) -> list:
+    """The strings in a JSON value, depth first."""
+
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if not isinstance(value, list):
+        return []
+    return [string for item in value for string in strings(item)]
+
+
+def search_document(contents) -> dict:
+    """The search document of a BCO, as `search.services.search_document`
+    built it when this migration was written."""
+
+    if not isinstance(contents, dict):
+        contents = {}
+    provenance = contents.get('provenance_domain')
+    description = contents.get('description_domain')
+    if not isinstance(provenance, dict):
+        provenance = {}
+    if not isinstance(description, dict):
+        description = {}
+    steps = description.get('pipeline_steps')
+    return {
+        'name': ' '.join(strings(provenance.get('name'))),
+        'keywords': ' '.join(strings(description.get('keywords'))),
+        'steps': '\n'.join(
+            string
+            for step in (steps if isinstance(steps, list) else [])
+            if isinstance(step, dict)
+            for string in strings([step.get('name'), step.get('description')])
+        ),
+        'usability': '\n'.join(strings(contents.get('usability_domain'))),
+    }
+
+
+def build_documents(apps, schema_editor):
+    """Writes the search documents of the existing BCOs."""
+
+    Bco = apps.get_model('biocompute', 'Bco')
+    BcoDocument = apps.get_model('search', 'BcoDocument')
+    batch = []
+    for object_id, contents in Bco.objects.values_list(
+        'object_id', 'contents'
+    ).iterator():
+        batch.append(BcoDocument(bco_id=object_id, **search_document(contents)))
+        if len(batch) >= 1000:
+            BcoDocument.objects.bulk_create(batch)
+            batch = []
+    BcoDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('biocompute', '0003_bco_acl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BcoDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField(blank=True, default='')),
+                ('keywords', models.TextField(blank=True, default='')),
+                ('steps', models.TextField(blank=True, default='')),
+                ('usability', models.TextField(blank=True, default='')),
+                ('bco', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='biocompute.bco')),
+            ],
+        ),
+        migrations.RunPython(create_full_text_index, drop_full_text_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
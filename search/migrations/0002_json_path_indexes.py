@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# Expression indexes on the paths of the BCO contents that are queried
+# most, by index name. The expressions are those `search.query` compiles
+# the paths to, so that the database can match queries to the indexes.
+HOT_PATHS = {
+    'search_bco_provenance_name': ['provenance_domain', 'name'],
+    'search_bco_provenance_version': ['provenance_domain', 'version'],
+    'search_bco_provenance_created': ['provenance_domain', 'created'],
+    'search_bco_provenance_modified': ['provenance_domain', 'modified'],
+}
+
+
+def index_sql(vendor, name, keys):
+    if vendor == 'sqlite':
+        path = '$' + ''.join(f'."{key}"' for key in keys)
+        return f"CREATE INDEX {name} ON biocompute_bco"\
+            f" (json_extract(contents, '{path}'))"
+    path = '{' + ','.join(keys) + '}'
+    return f"CREATE INDEX {name} ON biocompute_bco"\
+        f" (((contents #>> '{path}') COLLATE \"C\"))"
+
+
+def create_json_path_indexes(apps, schema_editor):
+    """Creates the expression indexes of the database, if it has JSON
+    functions to index."""
+
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        return
+    for name, keys in HOT_PATHS.items():
+        schema_editor.execute(index_sql(vendor, name, keys))
+
+
+def drop_json_path_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    for name in HOT_PATHS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biocompute', '0004_bco_last_update_index'),
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_json_path_indexes, drop_json_path_indexes),
+    ]
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# search/models.py
+
+from django.db import models
+from biocompute.models import Bco
+
+# Columns of the full-text index, in the order of their weights.
+FULL_TEXT_FIELDS = ("name", "keywords", "steps", "usability")
+
+class BcoDocument(models.Model):
+    """BCO Search Document
+
+    The searchable text of a BCO, one row per BCO, written by
+    `search.services` when a BCO is saved. The database indexes these rows
+    for full-text search: on SQLite the FTS5 table `search_bco_fts` uses
+    them as external content and is kept in sync by triggers, on
+    PostgreSQL a generated `document` tsvector column has a GIN index.
+
+    Attributes:
+    -----------
+    bco: OneToOneField(Bco)
+        The BCO the text is from
+    name: str
+        `provenance_domain.name`
+    keywords: str
+        `description_domain.keywords`
+    steps: str
+        Names and descriptions of `description_domain.pipeline_steps`
+    usability: str
+        `usability_domain`
+    """
+
+    bco = models.OneToOneField(
+        Bco,
+        on_delete=models.CASCADE,
+        related_name="search_document"
+    )
+    name = models.TextField(blank=True, default="")
+    keywords = models.TextField(blank=True, default="")
+    steps = models.TextField(blank=True, default="")
+    usability = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return str(self.bco_id)
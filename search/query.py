@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# search/query.py
+
+"""Search Query Language
+Parses structured queries on JSON paths in the BCO contents, such as
+
+    provenance_domain.version = "1.0" AND (
+        io_domain.input_subdomain.uri.uri ^= "https://example.org/"
+        OR NOT execution_domain.software_prerequisites.name = HIVE
+    )
+
+and compiles them into SQL conditions on the contents column, with the
+JSON functions of SQLite (JSON1) or the `jsonb` operators of PostgreSQL.
+
+A comparison is a dotted path, an operator and a value. The operators are
+`=` (equal), `^=` (starts with), `>`, `>=`, `<` and `<=`. Values are JSON
+strings in double quotes, or bare words and numbers; a bare number is
+equal to that number or to the same text. Comparisons combine with `AND`,
+`OR`, `NOT` and parentheses, and adjacent comparisons are combined with
+`AND`.
+
+A path through an array of the IEEE 2791 schema, such as
+`io_domain.input_subdomain`, matches if any element of the array matches,
+unless the path gives the element's index. Scalar paths compile to the
+same expressions as the expression indexes of the `search` app, so the
+database can search those through the index.
+"""
+
+import json
+import re
+import threading
+from biocompute.schemas import IEEE_2791_URI, schema_registry
+
+MAX_QUERY_LENGTH = 4000
+MAX_QUERY_COMPARISONS = 32
+MAX_QUERY_NESTING = 16
+MAX_QUERY_PATH_DEPTH = 16
+
+KEYWORDS = ["AND", "OR", "NOT"]
+
+TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<paren>[()])
+        | (?P<operator>\^=|>=|<=|=|>|<)
+        | (?P<string>"(?:[^"\\]|\\.)*")
+        | (?P<word>[^\s()=<>^"]+)
+    )\s*
+""", re.VERBOSE)
+
+KEY = re.compile(r"[A-Za-z0-9_\-]+")
+NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?")
+
+_array_paths = None
+_array_paths_lock = threading.Lock()
+
+def array_paths() -> frozenset:
+    """Array Paths
+
+    The dotted paths of the arrays in the IEEE 2791 schema, without array
+    indexes, such as `io_domain.input_subdomain` and
+    `description_domain.pipeline_steps.input_list`. Derived from the schema
+    registry once, and again after the registry is reloaded.
+
+    Returns:
+    - frozenset:
+        The paths of the arrays.
+    """
+
+    global _array_paths
+    if _array_paths is None:
+        with _array_paths_lock:
+            if _array_paths is None:
+                paths = set()
+                _collect_arrays(
+                    schema_registry.get_schema(IEEE_2791_URI) or {}, [], paths
+                )
+                _array_paths = frozenset(paths)
+    return _array_paths
+
+def _collect_arrays(schema, keys: list, paths: set):
+    if not isinstance(schema, dict) or len(keys) > MAX_QUERY_PATH_DEPTH:
+        return
+    if schema.get("type") == "array" or "items" in schema:
+        paths.add(".".join(keys))
+        _collect_arrays(schema.get("items"), keys, paths)
+        return
+    for key, child in (schema.get("properties") or {}).items():
+        _collect_arrays(child, keys + [key], paths)
+
+@schema_registry.on_reload
+def _clear_array_paths(registry):
+    global _array_paths
+    _array_paths = None
+
+def tokenize(text: str) -> list:
+    """Splits a query into `(kind, text)` tokens. Raises `ValueError`."""
+
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(
+                f"Unexpected '{text[position]}' at position {position} of "\
+                    + "the query."
+            )
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+class _Parser:
+    """Recursive descent parser of the query grammar:
+
+        query      := or
+        or         := and ("OR" and)*
+        and        := not ("AND"? not)*
+        not        := "NOT" not | "(" or ")" | comparison
+        comparison := path operator value
+    """
+
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.position = 0
+        self.comparisons = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def keyword(self, name: str) -> bool:
+        kind, text = self.peek()
+        if kind == "word" and text.upper() == name:
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, kind: str, description: str) -> str:
+        token_kind, text = self.peek()
+        if token_kind != kind:
+            found = "the end of the query" if text is None else f"'{text}'"
+            raise ValueError(f"Expected {description}, found {found}.")
+        self.position += 1
+        return text
+
+    def parse(self) -> tuple:
+        if not self.tokens:
+            raise ValueError("The query is empty.")
+        node = self.parse_or(0)
+        if self.position < len(self.tokens):
+            raise ValueError(
+                f"Unexpected '{self.tokens[self.position][1]}' in the query."
+            )
+        return node
+
+    def parse_or(self, depth: int) -> tuple:
+        if depth > MAX_QUERY_NESTING:
+            raise ValueError(
+                f"Queries can be nested at most {MAX_QUERY_NESTING} deep."
+            )
+        nodes = [self.parse_and(depth)]
+        while self.keyword("OR"):
+            nodes.append(self.parse_and(depth))
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def parse_and(self, depth: int) -> tuple:
+        nodes = [self.parse_not(depth)]
+        while True:
+            if self.keyword("AND"):
+                nodes.append(self.parse_not(depth))
+                continue
+            kind, text = self.peek()
+            if (kind == "paren" and text == "(") \
+                    or (kind == "word" and text.upper() != "OR"):
+                nodes.append(self.parse_not(depth))
+                continue
+            break
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def parse_not(self, depth: int) -> tuple:
+        if self.keyword("NOT"):
+            return ("not", self.parse_not(depth + 1))
+        kind, text = self.peek()
+        if kind == "paren" and text == "(":
+            self.position += 1
+            node = self.parse_or(depth + 1)
+            self.expect("paren", "')'")
+            return node
+        return self.parse_comparison()
+
+    def parse_comparison(self) -> tuple:
+        path = self.expect("word", "a path")
+        if path.upper() in KEYWORDS:
+            raise ValueError(f"Expected a path, found '{path}'.")
+        keys = parse_path(path)
+        operator = self.expect("operator", f"an operator after '{path}'")
+        kind, text = self.peek()
+        if kind == "string":
+            try:
+                value = json.loads(text)
+            except ValueError as error:
+                raise ValueError(f"Invalid string {text} in the query.")\
+                    from error
+            number = None
+        elif kind == "word":
+            value = text
+            number = json.loads(text) if NUMBER.fullmatch(text) else None
+        else:
+            raise ValueError(f"Expected a value after '{path} {operator}'.")
+        self.position += 1
+        self.comparisons += 1
+        if self.comparisons > MAX_QUERY_COMPARISONS:
+            raise ValueError(
+                f"Queries can have at most {MAX_QUERY_COMPARISONS} comparisons."
+            )
+        return ("compare", keys, operator, value, number)
+
+def parse_path(path: str) -> list:
+    """Parse Path
+
+    Splits a dotted path into the BCO contents into its keys. The path may
+    start with `contents.`; keys are letters, digits, `_` and `-`, and
+    keys of digits index arrays.
+
+    Parameters:
+    - path (str):
+        The path, such as `provenance_domain.version`.
+
+    Returns:
+    - list:
+        The keys of the path.
+
+    Raises:
+    - ValueError: If the path is malformed or too deep.
+    """
+
+    keys = path.split(".")
+    if keys[0] == "contents" and len(keys) > 1:
+        keys = keys[1:]
+    if len(keys) > MAX_QUERY_PATH_DEPTH \
+            or not all(KEY.fullmatch(key) for key in keys):
+        raise ValueError(
+            f"Invalid path '{path}'. Paths are keys of letters, digits, '_' "\
+                + "and '-' separated by dots, such as "\
+                + "provenance_domain.version."
+        )
+    return keys
+
+def parse_query(text: str) -> tuple:
+    """Parse Query
+
+    Parses a query into a tree of `("and", nodes)`, `("or", nodes)`,
+    `("not", node)` and `("compare", keys, operator, value, number)`
+    nodes, where `number` is the value of bare numbers and otherwise None.
+
+    Parameters:
+    - text (str):
+        The query.
+
+    Returns:
+    - tuple:
+        The root node.
+
+    Raises:
+    - ValueError: If the query is malformed or too large.
+    """
+
+    if len(text) > MAX_QUERY_LENGTH:
+        raise ValueError(
+            f"Queries can be at most {MAX_QUERY_LENGTH} characters long."
+        )
+    return _Parser(tokenize(text)).parse()
+
+def next_prefix(prefix: str) -> str:
+    """The least string after every string that starts with `prefix`, or
+    None if there is none."""
+
+    prefix = prefix.rstrip(chr(0x10FFFF))
+    if not prefix:
+        return None
+    last = ord(prefix[-1]) + 1
+    if 0xD800 <= last <= 0xDFFF:
+        last = 0xE000
+    return prefix[:-1] + chr(last)
+
+class _Compiler:
+    """Compiles a parsed query into SQL for a database vendor."""
+
+    def __init__(self, vendor: str, column: str):
+        if vendor not in ("sqlite", "postgresql"):
+            raise ValueError(
+                "Structured queries are not supported by this database."
+            )
+        self.vendor = vendor
+        self.column = column
+        self.aliases = 0
+        self.arrays = array_paths()
+
+    def compile(self, node: tuple) -> tuple:
+        kind = node[0]
+        if kind in ("and", "or"):
+            parts = [self.compile(child) for child in node[1]]
+            separator = " AND " if kind == "and" else " OR "
+            return (
+                separator.join(f"({sql})" for sql, _ in parts),
+                [param for _, params in parts for param in params]
+            )
+        if kind == "not":
+            sql, params = self.compile(node[1])
+            return f"({sql}) IS NOT TRUE", params
+        _, keys, operator, value, number = node
+        return self.compare(self.column, keys, [], operator, value, number)
+
+    def compare(self, source: str, keys: list, schema_keys: list,
+            operator: str, value: str, number) -> tuple:
+        """Compiles a comparison of the value at `keys` in the JSON
+        `source`, iterating the arrays of the schema on the way."""
+
+        for index, key in enumerate(keys):
+            if key.isdigit():
+                continue
+            schema_keys = schema_keys + [key]
+            following = keys[index + 1] if index + 1 < len(keys) else None
+            if ".".join(schema_keys) in self.arrays \
+                    and (following is None or not following.isdigit()):
+                return self.any_element(
+                    source, keys[:index + 1], keys[index + 1:], schema_keys,
+                    operator, value, number
+                )
+        return self.condition(source, keys, operator, value, number)
+
+    def any_element(self, source: str, keys: list, rest: list,
+            schema_keys: list, operator: str, value: str, number) -> tuple:
+        self.aliases += 1
+        alias = f"search_element{self.aliases}"
+        sql, params = self.compare(
+            self.element(alias, rest), rest, schema_keys, operator, value,
+            number
+        )
+        if self.vendor == "sqlite":
+            path = self.sqlite_path(keys)
+            return (
+                f"EXISTS (SELECT 1 FROM json_each({source}, '{path}') AS "\
+                    + f"{alias} WHERE json_type({source}, '{path}') = 'array'"\
+                    + f" AND {sql})",
+                params
+            )
+        array = f"({source} #> '{self.postgresql_path(keys)}')"
+        return (
+            "EXISTS (SELECT 1 FROM jsonb_array_elements(CASE jsonb_typeof("\
+                + f"{array}) WHEN 'array' THEN {array} END) AS {alias}(value)"\
+                + f" WHERE {sql})",
+            params
+        )
+
+    def element(self, alias: str, rest: list) -> str:
+        """The JSON of an array element, as a source for the rest of the
+        path."""
+
+        if self.vendor == "sqlite" and rest:
+            # Only objects and arrays have paths into them; `json_extract`
+            # of a string element would parse the string as JSON.
+            return f"CASE WHEN {alias}.type IN ('object', 'array') THEN "\
+                + f"{alias}.value END"
+        return f"{alias}.value"
+
+    def sqlite_path(self, keys: list) -> str:
+        return "$" + "".join(
+            f"[{key}]" if key.isdigit() else f'."{key}"' for key in keys
+        )
+
+    def postgresql_path(self, keys: list) -> str:
+        return "{" + ",".join(keys) + "}"
+
+    def text(self, source: str, keys: list) -> str:
+        if self.vendor == "sqlite":
+            if not keys:
+                return source
+            return f"json_extract({source}, '{self.sqlite_path(keys)}')"
+        return f"(({source} #>> '{self.postgresql_path(keys)}') COLLATE \"C\")"
+
+    def condition(self, source: str, keys: list, operator: str, value: str,
+            number) -> tuple:
+        value_sql = self.text(source, keys)
+        if operator == "^=":
+            upper = next_prefix(value)
+            if upper is None:
+                return f"{value_sql} >= %s", [value]
+            return f"{value_sql} >= %s AND {value_sql} < %s", [value, upper]
+        if operator == "=":
+            if number is None:
+                return f"{value_sql} = %s", [value]
+            if self.vendor == "sqlite":
+                return f"{value_sql} IN (%s, %s)", [value, number]
+            return f"{value_sql} = %s", [value]
+        if number is None:
+            if self.vendor == "sqlite" and operator in ("<", "<="):
+                # SQLite orders numbers before strings.
+                return f"{value_sql} {operator} %s AND {value_sql} >= ''",\
+                    [value]
+            return f"{value_sql} {operator} %s", [value]
+        if self.vendor == "sqlite":
+            if operator in (">", ">="):
+                return f"{value_sql} {operator} %s AND {value_sql} < ''",\
+                    [number]
+            return f"{value_sql} {operator} %s", [number]
+        json_sql = f"({source} #> '{self.postgresql_path(keys)}')"
+        return (
+            f"(CASE jsonb_typeof({json_sql}) WHEN 'number' THEN "\
+                + f"({json_sql})::numeric END) {operator} %s",
+            [number]
+        )
+
+def compile_query(node: tuple, vendor: str,
+        column: str="biocompute_bco.contents") -> tuple:
+    """Compile Query
+
+    Compiles a parsed query into an SQL condition on a JSON column.
+
+    Parameters:
+    - node (tuple):
+        The query, from `parse_query`.
+    - vendor (str):
+        `sqlite` or `postgresql`.
+    - column (str, optional):
+        The JSON column to query.
+
+    Returns:
+    - tuple:
+        The SQL and its parameters.
+
+    Raises:
+    - ValueError: If the database has no JSON functions to compile to.
+    """
+
+    return _Compiler(vendor, column).compile(node)
@@ -4,11 +4,47 @@
 Set of selector functions to handle searching the BCODB
 """
 
-from biocompute.models import Bco
-from django.db.models import QuerySet
-from django.db.models.query import QuerySet
+import base64
+import json
+import re
+from datetime import datetime, time, timezone
+from biocompute.models import Bco, BcoKeyword
+from django.conf import settings
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Q, QuerySet, Value
+from django.db.models.functions import Concat
+from django.utils.dateparse import parse_date, parse_datetime
 from django.contrib.auth.models import User
-from prefix.selectors import get_user_prefixes
+from prefix.models import Prefix
+from search.query import compile_query, parse_query
+
+FULL_TEXT = getattr(settings, "BCO_SEARCH_FULL_TEXT", True)
+SEARCH_PAGE_SIZE = getattr(settings, "BCO_SEARCH_PAGE_SIZE", 100)
+SEARCH_MAX_PAGE_SIZE = getattr(settings, "BCO_SEARCH_MAX_PAGE_SIZE", 1000)
+
+# The tables joined to the BCOs for a full-text query, the conditions the
+# query matches with and the rank of a match, by database vendor. The index
+# drives the join, and higher ranks match better.
+FULL_TEXT_SQL = {
+    "sqlite": {
+        "tables": ["search_bcodocument", "search_bco_fts"],
+        "where": [
+            "search_bcodocument.bco_id = biocompute_bco.object_id",
+            "search_bcodocument.id = search_bco_fts.rowid",
+            "search_bco_fts MATCH %s",
+        ],
+        "rank": "-bm25(search_bco_fts, 10.0, 5.0, 2.0, 1.0)",
+    },
+    "postgresql": {
+        "tables": ["search_bcodocument"],
+        "where": [
+            "search_bcodocument.bco_id = biocompute_bco.object_id",
+            "search_bcodocument.document @@ to_tsquery('simple', %s)",
+        ],
+        "rank": "ts_rank(search_bcodocument.document,"
+            " to_tsquery('simple', %s))",
+    },
+}
 
 RETURN_VALUES = [
           "object_id",
@@ -22,6 +58,22 @@ RETURN_VALUES = [
           "access_count",
         ]
 
+# The compact fields of `summary` search results, by output name.
+SUMMARY_VALUES = {
+    "object_id": "object_id",
+    "name": "contents.provenance_domain.name",
+    "state": "state",
+    "owner": "owner",
+    "last_update": "last_update",
+}
+
+MAX_PROJECTED_FIELDS = 32
+MAX_CONTENTS_PATH_DEPTH = 16
+
+# The fields search results can be sorted by, ascending or with a leading
+# `-` descending. Each has an index on the field and `object_id`.
+SORT_FIELDS = ["last_update", "name", "version", "created", "license"]
+
 def controled_list(user: User) -> QuerySet:
     """
     Generates a list of viewable BioCompute Objects (BCOs) based on the user's
@@ -45,32 +97,438 @@ def controled_list(user: User) -> QuerySet:
     Returns:
     - QuerySet:
         A Django QuerySet containing the BCOs that the user is authorized to 
-        view. This QuerySet is distinct to ensure no duplicates are included.
+        view. It is built as a single query without joins that could
+        duplicate BCOs, so it needs no `distinct()`.
     """
 
-    prefix_permissions = get_user_prefixes(user=user)
-    viewable_prefixes = [
-        perm.split("_")[1] for perm in prefix_permissions
-        if perm.startswith("view_")
-    ]
-
+    bcos = Bco.objects.exclude(state="DELETE")
     if user.username == "AnonymousUser" or user.username == "":
-        bcos_by_permission = Bco.objects.filter(
-            prefix__prefix__in=viewable_prefixes).exclude(state="DELETE"
-        ).exclude(state="DRAFT")
-        
-        return bcos_by_permission.distinct()
+        return bcos.exclude(state="DRAFT").filter(visibility_filter(
+            user, authorized=False
+        ))
+
+    return bcos.filter(visibility_filter(user))
+
+def visibility_filter(user: User, authorized: bool=True) -> Q:
+    """Visibility Filter
+
+    Returns a filter for the BCOs a user can view: those with a public
+    prefix, a prefix the user has the `view_<prefix>` permission for, or
+    that list the user in `authorized_users`. Public prefixes are read from
+    the `acl_public` column of the BCO. The private prefixes the user can
+    view are an uncorrelated subquery, with an `EXISTS` on the
+    user-permission table per prefix, and the authorization an `EXISTS` on
+    the indexed authorized-user table per BCO. The filter neither joins
+    multi-valued relations nor needs `DISTINCT`.
+
+    Parameters:
+    - user (User):
+        The User to filter for.
+    - authorized (bool, optional):
+        Whether `authorized_users` grants access; False for anonymous
+        users.
+
+    Returns:
+    - Q:
+        The filter, for `Bco` querysets.
+    """
+
+    visible = Q(acl_public=True)
+    if user.pk is not None:
+        visible |= Q(prefix_id__in=Prefix.objects.filter(public=False).filter(
+            Exists(User.user_permissions.through.objects.filter(
+                user_id=user.pk,
+                permission__codename=Concat(Value("view_"), OuterRef("pk"))
+            ))
+        ))
+    if authorized and user.pk is not None:
+        visible |= Exists(Bco.authorized_users.through.objects.filter(
+            bco_id=OuterRef("pk"), user_id=user.pk
+        ))
+    return visible
+
+def full_text_query(values: list, vendor: str) -> str:
+    """Full Text Query
+
+    Translates search terms into a full-text query for the database: a
+    term matches the documents that contain every word of it, as a word or
+    the start of a word, and the query matches any of the terms. Words are
+    runs of letters and digits, so the terms can not inject query syntax.
+
+    Parameters:
+    - values (list):
+        The search terms.
+    - vendor (str):
+        `sqlite` for an FTS5 query, otherwise a PostgreSQL `tsquery`.
+
+    Returns:
+    - str:
+        The query, or None if a term has no words to search for.
+    """
+
+    clauses = []
+    for value in values:
+        words = re.findall(r"[^\W_]+", value.lower())
+        if not words:
+            return None
+        if vendor == "sqlite":
+            clauses.append(" ".join(f'"{word}"*' for word in words))
+        else:
+            clauses.append(" & ".join(f"{word}:*" for word in words))
+    separator = " OR " if vendor == "sqlite" else " | "
+    return separator.join(f"({clause})" for clause in clauses)
+
+def search_contents(bcos: QuerySet, values: list) -> QuerySet:
+    """Search Contents
+
+    Filters BCOs by search terms with the full-text index of the search
+    documents (name, keywords, pipeline steps and usability domain) and
+    orders them by rank, best first. The search documents are joined to
+    the BCOs and the index drives the join, so the contents of BCOs that
+    do not match are not read. Without a
+    full-text index for the database, with `BCO_SEARCH_FULL_TEXT` off or
+    for terms without words, the serialized contents are searched with
+    `icontains` instead.
+
+    Parameters:
+    - bcos (QuerySet):
+        The BCOs to search.
+    - values (list):
+        The search terms; BCOs matching any of them are returned.
+
+    Returns:
+    - QuerySet:
+        The matching BCOs, with a `search_rank` column when ranked.
+    """
+
+    vendor = connection.vendor
+    query = None
+    if FULL_TEXT and vendor in FULL_TEXT_SQL:
+        query = full_text_query(values, vendor)
+    if query is None:
+        contents_query = Q()
+        for value in values:
+            contents_query |= Q(contents__icontains=value)
+        return bcos.filter(contents_query)
+
+    sql = FULL_TEXT_SQL[vendor]
+    return bcos.extra(
+        select={"search_rank": sql["rank"]},
+        select_params=[query] * sql["rank"].count("%s"),
+        tables=sql["tables"],
+        where=sql["where"],
+        params=[query],
+    ).order_by("-search_rank", "object_id")
 
-    bcos_by_permission = Bco.objects.filter(
-        prefix__prefix__in=viewable_prefixes
-    ).exclude(state="DELETE")
+def search_query(bcos: QuerySet, values: list) -> QuerySet:
+    """Search Query
 
-    bcos_by_authorized = Bco.objects.filter(
-        authorized_users=user
-    ).exclude(state="DELETE")
+    Filters BCOs by structured queries on JSON paths in their contents, in
+    the language of `search.query`, such as
+    `provenance_domain.version = "1.0" AND io_domain.input_subdomain.uri.uri
+    ^= "https://"`. The queries are compiled into conditions with the JSON
+    functions of the database, which search the expression indexes of the
+    `search` app for the paths those cover.
 
-    viewable_bcos = bcos_by_permission | bcos_by_authorized
-    viewable_bcos = viewable_bcos.distinct()
+    Parameters:
+    - bcos (QuerySet):
+        The BCOs to search.
+    - values (list):
+        The queries; BCOs matching all of them are returned.
 
-    return viewable_bcos
+    Returns:
+    - QuerySet:
+        The matching BCOs.
+
+    Raises:
+    - ValueError: If a query is malformed, or the database has no JSON
+        functions to compile it to.
+    """
 
+    for value in values:
+        sql, params = compile_query(parse_query(value), connection.vendor)
+        bcos = bcos.extra(where=[sql], params=params)
+    return bcos
+
+def search_fields(bcos: QuerySet, filters: dict) -> QuerySet:
+    """Search Fields
+
+    Filters BCOs by the search fields extracted from their contents, which
+    are indexed columns of the BCOs (`name`, `version`, `license` and
+    `created`) and the indexed keywords table, so the filters are index
+    lookups instead of scans of the contents.
+
+    Parameters:
+    - bcos (QuerySet):
+        The BCOs to search.
+    - filters (dict):
+        Lists of exact `name`, `version`, `license` and `keyword` values,
+        of which a BCO must match one for each given field, and
+        `created_since` and `created_before` dates or datetimes, which
+        bound the `created` date of the BCOs (inclusive and exclusive).
+
+    Returns:
+    - QuerySet:
+        The matching BCOs.
+
+    Raises:
+    - ValueError: If a date is malformed.
+    """
+
+    for field in ["name", "version", "license"]:
+        if filters.get(field):
+            bcos = bcos.filter(**{f"{field}__in": filters[field]})
+    if filters.get("keyword"):
+        bcos = bcos.filter(object_id__in=BcoKeyword.objects.filter(
+            keyword__in=filters["keyword"]
+        ).values("bco_id"))
+    for name, lookup in [
+        ("created_since", "created__gte"), ("created_before", "created__lt")
+    ]:
+        value = filters.get(name)
+        if value:
+            try:
+                date = parse_datetime(value) or parse_date(value)
+            except ValueError:
+                date = None
+            if date is None:
+                raise ValueError(
+                    f"Invalid {name} '{value}'. Use an ISO 8601 date or "\
+                        + "datetime."
+                )
+            if not isinstance(date, datetime):
+                date = datetime.combine(date, time())
+            if date.tzinfo is None:
+                date = date.replace(tzinfo=timezone.utc)
+            bcos = bcos.filter(**{lookup: date})
+    return bcos
+
+def encode_cursor(keys: list) -> str:
+    """Encodes the sort keys of the last BCO of a page as a cursor."""
+
+    data = json.dumps(keys, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    """Decodes a cursor. Raises `ValueError` for malformed cursors."""
+
+    try:
+        keys = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+    except (TypeError, ValueError, UnicodeDecodeError) as error:
+        raise ValueError("Invalid cursor.") from error
+    if not isinstance(keys, list) or len(keys) != 3 \
+            or not isinstance(keys[2], str):
+        raise ValueError("Invalid cursor.")
+    return keys
+
+def projection(fields: list) -> dict:
+    """Projection
+
+    Parses the `fields` of a search request: names from `RETURN_VALUES` and
+    dotted paths into the BCO contents, such as
+    `contents.provenance_domain.name` or `contents.usability_domain.0`,
+    separated by commas or given as several parameters.
+
+    Parameters:
+    - fields (list):
+        The `fields` parameters.
+
+    Returns:
+    - dict:
+        The fields to return, by output name, for `search_page`.
+
+    Raises:
+    - ValueError: If a field is unknown, a path is malformed or there are
+        more than `MAX_PROJECTED_FIELDS` fields.
+    """
+
+    projected = {}
+    for value in fields:
+        for name in value.split(","):
+            name = name.strip()
+            if not name:
+                continue
+            head, _, path = name.partition(".")
+            keys = path.split(".")
+            if name not in RETURN_VALUES and (
+                head != "contents" or not path
+                or len(keys) > MAX_CONTENTS_PATH_DEPTH
+                or any(not key or "__" in key for key in keys)
+            ):
+                raise ValueError(
+                    f"Unknown field '{name}'. Fields are "\
+                        + f"{', '.join(RETURN_VALUES)} or paths into the "\
+                        + "contents such as contents.provenance_domain.name."
+                )
+            projected[name] = name
+    if not projected:
+        raise ValueError("No fields were requested.")
+    if len(projected) > MAX_PROJECTED_FIELDS:
+        raise ValueError(
+            f"At most {MAX_PROJECTED_FIELDS} fields can be requested."
+        )
+    return projected
+
+def search_page(
+    bcos: QuerySet,
+    fields,
+    cursor: str=None,
+    limit: int=SEARCH_PAGE_SIZE,
+    sort: str=None
+) -> tuple:
+    """Search Page
+
+    Returns one page of search results with keyset pagination. Results are
+    ordered newest first by `last_update` and `object_id`, by rank for
+    ranked full-text searches, or by one of the `SORT_FIELDS` and
+    `object_id`, and a page starts after the sort keys in the cursor
+    instead of at an offset, so the database seeks to it through an index
+    and deep pages cost as much as the first one.
+
+    The page's BCOs are selected by their keys first and only their rows
+    are then read, by primary key, with `fields`. The contents of BCOs
+    past the page are not read, and fields that join several rows per BCO
+    do not split a BCO across pages. Paths into the contents are extracted
+    by the database, so only the selected parts of the JSON are returned.
+
+    Parameters:
+    - bcos (QuerySet):
+        The BCOs to page through, from `controled_list` and optionally
+        `search_contents`.
+    - fields (list or dict):
+        The fields of each result, or the fields by output name, as
+        returned by `projection`. Fields are names from `RETURN_VALUES` or
+        dotted paths into the contents.
+    - cursor (str, optional):
+        The `next` cursor of the previous page; the first page without.
+    - limit (int, optional):
+        The number of BCOs on the page.
+    - sort (str, optional):
+        A field of `SORT_FIELDS` to sort by instead, descending with a
+        leading `-`. BCOs without a value for the field come last.
+
+    Returns:
+    - tuple:
+        The rows of the page, and the cursor of the next page or None if
+        this is the last page.
+
+    Raises:
+    - ValueError: If the cursor is malformed or from another ordering, or
+        the sort field is unknown.
+    """
+
+    ranked = sort is None and "search_rank" in bcos.query.extra
+    nullable = False
+    if ranked:
+        kind = "rank"
+        rank_sql, rank_params = bcos.query.extra["search_rank"]
+        ordering = ["-search_rank", "object_id"]
+        keys = bcos.order_by(*ordering).values_list("search_rank", "object_id")
+    else:
+        sort = sort or "-last_update"
+        descending = sort.startswith("-")
+        field = sort[1:] if descending else sort
+        if field not in SORT_FIELDS:
+            raise ValueError(
+                f"Invalid sort '{sort}'. Results can be sorted by "\
+                    + f"{', '.join(SORT_FIELDS)}, descending with a leading -."
+            )
+        # The cursors of the default order keep their original kind.
+        kind = "time" if sort == "-last_update" else sort
+        sign = "-" if descending else ""
+        keys = bcos.order_by(sign + field, sign + "object_id")\
+            .values_list(field, "object_id")
+        # BCOs without a value follow the others, in a second index range.
+        nullable = Bco._meta.get_field(field).null
+        if nullable:
+            null_keys = keys.filter(**{f"{field}__isnull": True})
+            keys = keys.filter(**{f"{field}__isnull": False})
+
+    if cursor is not None:
+        cursor_kind, first, object_id = decode_cursor(cursor)
+        if cursor_kind != kind:
+            raise ValueError("Invalid cursor.")
+        if ranked:
+            if not isinstance(first, (int, float)):
+                raise ValueError("Invalid cursor.")
+            keys = keys.extra(
+                where=[
+                    f"(({rank_sql}) < %s OR (({rank_sql}) = %s"
+                    " AND biocompute_bco.object_id > %s))"
+                ],
+                params=[
+                    *rank_params, first, *rank_params, first, object_id
+                ],
+            )
+        elif first is None and nullable:
+            keys = None
+            null_keys = null_keys.filter(**{
+                f"object_id__{'lt' if descending else 'gt'}": object_id
+            })
+        else:
+            value = first if isinstance(first, str) else None
+            if value is not None and field in ("last_update", "created"):
+                value = parse_datetime(value)
+            if value is None:
+                raise ValueError("Invalid cursor.")
+            before, after = ("lt", "gt") if descending else ("gt", "lt")
+            # The redundant bound limits the index range the page starts in.
+            keys = keys.filter(
+                Q(**{f"{field}__{before}e": value}) & (
+                    Q(**{f"{field}__{before}": value})
+                    | Q(**{f"object_id__{before}": object_id})
+                )
+            )
+
+    page_keys = [] if keys is None else list(keys[:limit + 1])
+    if nullable and len(page_keys) <= limit:
+        page_keys += list(null_keys[:limit + 1 - len(page_keys)])
+    next_cursor = None
+    if len(page_keys) > limit:
+        page_keys = page_keys[:limit]
+        first, object_id = page_keys[-1]
+        if isinstance(first, datetime):
+            first = first.isoformat()
+        next_cursor = encode_cursor([kind, first, object_id])
+
+    if not isinstance(fields, dict):
+        fields = {field: field for field in fields}
+    names = [
+        name for name, path in fields.items()
+        if name == path and name in RETURN_VALUES
+    ]
+    # Paths are selected under aliases that can not clash with the fields
+    # of the model, such as the `name` of summaries.
+    aliases = {
+        f"projected_{index}": name
+        for index, name in enumerate(
+            name for name in fields if name not in names
+        )
+    }
+    expressions = {
+        alias: F(fields[name].replace(".", "__"))
+        for alias, name in aliases.items()
+    }
+    hide_object_id = "object_id" not in fields
+    if hide_object_id:
+        names.append("object_id")
+
+    position = {object_id: index for index, (_, object_id) in enumerate(
+        page_keys
+    )}
+    rows = sorted(
+        Bco.objects.filter(object_id__in=list(position))\
+            .values(*names, **expressions),
+        key=lambda row: position[row["object_id"]]
+    )
+    if hide_object_id:
+        for row in rows:
+            del row["object_id"]
+    if aliases:
+        rows = [
+            {aliases.get(key, key): value for key, value in row.items()}
+            for row in rows
+        ]
+    return rows, next_cursor
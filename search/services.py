@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# search/services.py
+
+"""Search Services
+Functions that keep the full-text search documents of the BCOs up to date.
+"""
+
+from biocompute.models import Bco
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from search.models import BcoDocument
+
+def _strings(value) -> list:
+    """The strings in a JSON value, depth first."""
+
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if not isinstance(value, list):
+        return []
+    return [string for item in value for string in _strings(item)]
+
+def search_document(contents: dict) -> dict:
+    """Search Document
+
+    Extracts the searchable text of a BCO: the name, the keywords, the
+    names and descriptions of the pipeline steps and the usability domain.
+    Domains that are missing or malformed give empty text.
+
+    Parameters:
+    - contents (dict):
+        The BCO JSON contents.
+
+    Returns:
+    - dict:
+        The text of each full-text column of `BcoDocument`.
+    """
+
+    if not isinstance(contents, dict):
+        contents = {}
+    provenance = contents.get("provenance_domain")
+    description = contents.get("description_domain")
+    if not isinstance(provenance, dict):
+        provenance = {}
+    if not isinstance(description, dict):
+        description = {}
+    steps = description.get("pipeline_steps")
+    return {
+        "name": " ".join(_strings(provenance.get("name"))),
+        "keywords": " ".join(_strings(description.get("keywords"))),
+        "steps": "\n".join(
+            string
+            for step in (steps if isinstance(steps, list) else [])
+            if isinstance(step, dict)
+            for string in _strings([step.get("name"), step.get("description")])
+        ),
+        "usability": "\n".join(_strings(contents.get("usability_domain"))),
+    }
+
+def index_bco(bco: Bco):
+    """Index BCO
+
+    Writes the search document of a BCO, with one `UPDATE` for BCOs that
+    are indexed already.
+    """
+
+    document = search_document(bco.contents)
+    if not BcoDocument.objects.filter(bco_id=bco.object_id).update(**document):
+        BcoDocument.objects.create(bco_id=bco.object_id, **document)
+
+@receiver(post_save, sender=Bco)
+def _bco_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "contents" not in update_fields:
+        return
+    index_bco(instance)
+
+@transaction.atomic
+def rebuild_search_index(batch_size: int=1000) -> int:
+    """Rebuild Search Index
+
+    Rewrites the search documents of every BCO, for BCOs written without
+    `save()`, e.g. with `bulk_create` or `update`.
+
+    Parameters:
+    - batch_size (int):
+        Number of BCOs read and documents written at a time.
+
+    Returns:
+    - int:
+        The number of BCOs indexed.
+    """
+
+    BcoDocument.objects.all().delete()
+    indexed = 0
+    batch = []
+    for object_id, contents in Bco.objects.values_list(
+        "object_id", "contents"
+    ).iterator(chunk_size=batch_size):
+        batch.append(BcoDocument(bco_id=object_id, **search_document(contents)))
+        if len(batch) >= batch_size:
+            BcoDocument.objects.bulk_create(batch)
+            indexed += len(batch)
+            batch = []
+    BcoDocument.objects.bulk_create(batch)
+    return indexed + len(batch)
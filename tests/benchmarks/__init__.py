@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# tests/benchmarks/__init__.py
+
+"""Benchmarks
+
+Stand-alone timing scripts. They are not collected by `manage.py test`; run
+one from the repository root with, for example:
+
+    python -m tests.benchmarks.bench_bulk_validation
+"""
+
+import json
+import os
+import time
+
+def setup_django():
+    """Configure Django settings and load the apps for a benchmark script."""
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+
+def setup_test_database(fixtures: tuple=("tests/fixtures/test_data",)):
+    """Setup Test Database
+
+    Creates a throwaway test database, like `manage.py test` does, and loads
+    the fixtures into it. Returns a function that destroys the database.
+    """
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    call_command("loaddata", *fixtures, verbosity=0)
+    return lambda: connection.creation.destroy_test_db(old_name, verbosity=0)
+
+def load_bco_dump(path: str="tests/fixtures/bco_dump.json") -> list:
+    """Returns the BCO contents stored in a Django fixture dump."""
+
+    with open(path, "r", encoding="utf-8") as dump:
+        return [row["fields"]["contents"] for row in json.load(dump)]
+
+def timeit(function, *args, repeat: int=3, **kwargs) -> float:
+    """Returns the best wall-clock time, in seconds, of `repeat` calls."""
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_authorized_users.py
+
+"""Authorized Users Benchmark
+
+Times the `authorized_users` checks of a request that looks up each of its
+BCOs twice, as a modify followed by a retrieve does, on BCOs shared with
+hundreds of users:
+
+- scan: the previous `user in bco.authorized_users.all()` check, which
+    loads every authorized user of the BCO.
+- exists: `user_authorized_bcos`, one indexed query per check.
+- per request: `user_authorized_bcos` with the request scope, one query
+    for all BCOs of the request.
+- acl: `user_can_view_bco`, which reads the `acl_users` of the BCO row
+    and needs no query.
+
+    python -m tests.benchmarks.bench_authorized_users --authorized 500
+"""
+
+import argparse
+from tests.benchmarks import setup_django, setup_test_database, timeit
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bcos", type=int, default=50)
+    parser.add_argument("--authorized", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    teardown = setup_test_database()
+    try:
+        run(args)
+    finally:
+        teardown()
+
+def populate(args) -> list:
+    """Creates the BCOs and the users authorized for each of them."""
+
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from biocompute.models import Bco
+    from prefix.models import Prefix
+
+    User.objects.bulk_create([
+        User(username=f"shared{index}") for index in range(args.authorized)
+    ])
+    users = list(User.objects.filter(username__startswith="shared"))
+    prefix = Prefix.objects.get(prefix="NOPUB")
+    bcos = Bco.objects.bulk_create([
+        Bco(
+            object_id=f"http://bench/NOPUB_{index:06}/DRAFT",
+            contents={},
+            prefix=prefix,
+            owner=users[0],
+            state="DRAFT",
+            last_update=timezone.now(),
+            acl_users=sorted(user.pk for user in users)
+        )
+        for index in range(args.bcos)
+    ])
+    Authorized = Bco.authorized_users.through
+    Authorized.objects.bulk_create([
+        Authorized(bco_id=bco.object_id, user=user)
+        for bco in bcos for user in users
+    ])
+    return [bco.object_id for bco in bcos]
+
+def run(args):
+    from django.contrib.auth.models import User
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+    from biocompute.models import Bco
+    from biocompute.selectors import user_authorized_bcos, user_can_view_bco
+
+    object_ids = populate(args)
+    # The last user created is the last row of each BCO's authorized users.
+    user = User.objects.filter(username__startswith="shared").last()
+
+    # Both checks run after the BCO is loaded, so only the check is timed.
+    bcos = Bco.objects.in_bulk(object_ids)
+
+    def scan(object_id):
+        return user in bcos[object_id].authorized_users.all()
+
+    def exists(object_id):
+        return object_id in user_authorized_bcos([object_id], user)
+
+    def acl(object_id):
+        return user_can_view_bco(bcos[object_id], user)
+
+    def request(check, scoped: bool):
+        if scoped:
+            request_started.send(sender=None)
+            user_authorized_bcos(object_ids, user)
+        for object_id in object_ids + object_ids:
+            assert check(object_id)
+        if scoped:
+            request_finished.send(sender=None)
+
+    def requests(check, scoped: bool):
+        for _ in range(args.requests):
+            request(check, scoped)
+
+    queries = []
+
+    def count_query(execute, *query_args):
+        queries.append(None)
+        return execute(*query_args)
+
+    print(f"{connection.vendor}: {args.bcos} BCOs with {args.authorized}"\
+        + " authorized users each, 2 checks per BCO")
+    for name, check, scoped in [
+        ("scan", scan, False),
+        ("exists", exists, False),
+        ("per request", exists, True),
+        ("acl", acl, False),
+    ]:
+        queries.clear()
+        with connection.execute_wrapper(count_query):
+            request(check, scoped)
+        seconds = timeit(requests, check, scoped, repeat=args.repeat)
+        print(f"  {name:<12} {seconds * 1000 / args.requests:8.3f} ms/request"\
+            + f"  {len(queries):>4} queries/request")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_bulk_validation.py
+
+"""Bulk Validation Benchmark
+
+Compares serial and process-pool throughput of `validate_bco_batch` on the
+BCOs in `tests/fixtures/bco_dump.json`, repeated up to the batch size with a
+unique `object_id` each. The `validation_cache` is cleared before every run,
+so that each one validates the whole batch, and the throughput of a batch
+answered from the cache is reported separately.
+
+    python -m tests.benchmarks.bench_bulk_validation --batch 500 --workers 4
+"""
+
+import argparse
+import os
+from copy import deepcopy
+from tests.benchmarks import setup_django, load_bco_dump, timeit
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from biocompute.services import (
+        get_validation_pool, validate_bco_batch, validation_cache
+    )
+
+    dump = load_bco_dump()
+    batch = []
+    for index in range(args.batch):
+        bco = deepcopy(dump[index % len(dump)])
+        bco["object_id"] = f"http://bench/BCO_{index:06}/1.0"
+        batch.append(bco)
+
+    def uncached(workers):
+        validation_cache.clear()
+        return validate_bco_batch(batch, workers=workers)
+
+    serial = uncached(0)
+    get_validation_pool(args.workers)
+    parallel = uncached(args.workers)
+    assert serial == parallel, "Parallel results differ from serial results"
+
+    serial_time = timeit(uncached, 0, repeat=args.repeat)
+    parallel_time = timeit(uncached, args.workers, repeat=args.repeat)
+    cached_time = timeit(
+        validate_bco_batch, batch, workers=0, repeat=args.repeat
+    )
+
+    print(f"batch size: {args.batch}, workers: {args.workers}")
+    print(f"serial:   {serial_time:.3f}s  "\
+        + f"{args.batch / serial_time:,.0f} BCOs/s")
+    print(f"parallel: {parallel_time:.3f}s  "\
+        + f"{args.batch / parallel_time:,.0f} BCOs/s")
+    print(f"speedup:  {serial_time / parallel_time:.2f}x")
+    print(f"cached:   {cached_time:.3f}s  "\
+        + f"{args.batch / cached_time:,.0f} BCOs/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_codegen_validation.py
+
+"""Generated Validator Benchmark
+
+Compares `jsonschema.Draft7Validator` with the generated validators from
+`biocompute.codegen` on the BCOs in `tests/fixtures/bco_dump.json`, both
+for the bare 2791 schema and for `BcoValidator.parse_and_validate`.
+
+    python -m tests.benchmarks.bench_codegen_validation --batch 500
+"""
+
+import argparse
+from tests.benchmarks import setup_django, load_bco_dump, timeit
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from biocompute.schemas import (
+        ExtensionSchemaResolver,
+        SchemaRegistry,
+        IEEE_2791_URI
+    )
+    from biocompute.services import BcoValidator
+
+    dump = load_bco_dump()
+    batch = [dump[index % len(dump)] for index in range(args.batch)]
+
+    interpreted = BcoValidator(resolver=ExtensionSchemaResolver(
+        registry=SchemaRegistry(codegen=False)
+    ))
+    generated = BcoValidator(resolver=ExtensionSchemaResolver(
+        registry=SchemaRegistry(codegen=True)
+    ))
+
+    def validate_schema(validator):
+        schema_validator = validator.get_validator(IEEE_2791_URI)
+        for bco in batch:
+            validator.validate_json(schema_validator, bco)
+
+    def validate_bcos(validator):
+        return [validator.parse_and_validate(bco) for bco in batch]
+
+    assert validate_bcos(interpreted) == validate_bcos(generated), \
+        "Generated results differ from jsonschema results"
+
+    print(f"batch size: {args.batch}")
+    for name, function in [
+        ("2791 schema", validate_schema),
+        ("parse_and_validate", validate_bcos),
+    ]:
+        interpreted_time = timeit(function, interpreted, repeat=args.repeat)
+        generated_time = timeit(function, generated, repeat=args.repeat)
+        print(f"{name}:")
+        print(f"  jsonschema: {interpreted_time:.3f}s  "\
+            + f"{args.batch / interpreted_time:,.0f} BCOs/s")
+        print(f"  generated:  {generated_time:.3f}s  "\
+            + f"{args.batch / generated_time:,.0f} BCOs/s")
+        print(f"  speedup:    {interpreted_time / generated_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
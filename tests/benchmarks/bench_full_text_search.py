@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_full_text_search.py
+
+"""Full-Text Search Benchmark
+
+Compares `contents` searches with the full-text index of the search app
+against the previous `icontains` filter on the serialized contents, on a
+generated table of BCOs, and prints the query plan of each. The test
+database is created with the configured database engine, so pointing
+`DATABASES` at PostgreSQL benchmarks PostgreSQL instead of SQLite.
+
+    python -m tests.benchmarks.bench_full_text_search --rows 100000
+"""
+
+import argparse
+import random
+from tests.benchmarks import setup_django, setup_test_database, timeit
+
+WORDS = [
+    "alignment", "annotation", "assembly", "bacteria", "calling", "coverage",
+    "curation", "expression", "filtering", "genome", "haplotype", "isolate",
+    "metagenomics", "mutation", "pathogen", "phylogeny", "protein", "quality",
+    "reads", "reference", "sequencing", "transcript", "variant", "virus",
+]
+
+# Rare words, about one BCO in a thousand names each one.
+ORGANISMS = [
+    first + second
+    for first in ["ba", "ce", "di", "fo", "gu", "ha", "ki", "lo", "mu", "ne"]
+    for second in ["bacter", "coccus", "myces", "phyla", "virus"]
+] + [f"isolate{index:03}" for index in range(950)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    teardown = setup_test_database()
+    try:
+        run(args)
+    finally:
+        teardown()
+
+def sentence(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+def populate(args, rng: random.Random):
+    """Creates the BCOs to search and indexes them."""
+
+    from django.utils import timezone
+    from biocompute.models import Bco
+    from search.services import rebuild_search_index
+
+    now = timezone.now()
+    for start in range(0, args.rows, 10000):
+        Bco.objects.bulk_create([
+            Bco(
+                object_id=f"http://bench/{index:08}/1.0",
+                contents={
+                    "provenance_domain": {
+                        "name": f"{rng.choice(ORGANISMS)} "\
+                            + f"{sentence(rng, 4)} {index}",
+                        "version": "1.0",
+                    },
+                    "description_domain": {
+                        "keywords": rng.sample(WORDS, 3),
+                        "pipeline_steps": [
+                            {
+                                "step_number": step,
+                                "name": sentence(rng, 2),
+                                "description": sentence(rng, 12),
+                            }
+                            for step in range(3)
+                        ],
+                    },
+                    "usability_domain": [sentence(rng, 30)],
+                },
+                prefix_id="BCO",
+                owner_id="tester",
+                state="PUBLISHED",
+                last_update=now,
+                acl_public=True
+            )
+            for index in range(start, min(start + 10000, args.rows))
+        ])
+    rebuild_search_index(batch_size=5000)
+
+def run(args):
+    from django.db import connection
+    from django.db.models import Q
+    from biocompute.models import Bco
+    from search.selectors import search_contents
+
+    rng = random.Random(1)
+    populate(args, rng)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    def previous(values):
+        query = Q()
+        for value in values:
+            query |= Q(contents__icontains=value)
+        return Bco.objects.filter(query)
+
+    def full_text(values):
+        return search_contents(Bco.objects.all(), values)
+
+    def fetch(function, values):
+        return list(function(values).values_list("object_id", flat=True))
+
+    print(f"{connection.vendor}: {args.rows} BCOs")
+    for values in [
+        ["haplotype"], ["virus isolate"], ["isolate123"],
+        ["fomyces", "nephyla"], [f"{args.rows // 2}"]
+    ]:
+        print(f"contents={values}: {len(fetch(full_text, values))} matches "\
+            + f"(previous filter: {len(fetch(previous, values))})")
+        for name, function in [("previous", previous), ("full text", full_text)]:
+            elapsed = timeit(fetch, function, values, repeat=args.repeat)
+            print(f"  {name}: {elapsed * 1000:.1f} ms")
+            print("    " + function(values).explain().replace("\n", "\n    "))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_json_query.py
+
+"""Search Query Benchmark
+
+Times structured `q` queries of `search.selectors.search_query` on a
+generated table of BCOs, with the expression indexes of the `search` app
+and after dropping them, and prints the query plan of each. The test
+database is created with the configured database engine, so pointing
+`DATABASES` at PostgreSQL benchmarks PostgreSQL instead of SQLite.
+
+    python -m tests.benchmarks.bench_json_query --rows 100000
+"""
+
+import argparse
+import random
+from datetime import timedelta
+from importlib import import_module
+from tests.benchmarks import setup_django, setup_test_database, timeit
+
+SOFTWARE = ["HIVE", "BLAST", "bowtie2", "samtools", "GATK", "Excel", "R"]
+
+QUERIES = [
+    'provenance_domain.version = "3.7"',
+    "provenance_domain.name ^= \"Assembly 12\"",
+    'provenance_domain.created >= "2023-06-01"'\
+        + ' provenance_domain.created < "2023-06-08"',
+    'provenance_domain.version = "3.7" OR provenance_domain.version = "9.1"',
+    'provenance_domain.version ^= "1." AND'\
+        + " execution_domain.software_prerequisites.name = GATK",
+    'io_domain.input_subdomain.uri.uri = "https://data.example/1234.fasta"',
+    "execution_domain.software_prerequisites.name = HIVE",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    teardown = setup_test_database()
+    try:
+        run(args)
+    finally:
+        teardown()
+
+def populate(args, rng: random.Random):
+    """Creates the BCOs to query."""
+
+    from datetime import datetime
+    from django.utils import timezone
+    from biocompute.models import Bco
+
+    now = timezone.now()
+    start_date = datetime(2020, 1, 1)
+    for start in range(0, args.rows, 10000):
+        Bco.objects.bulk_create([
+            Bco(
+                object_id=f"http://bench/{index:08}/1.0",
+                contents={
+                    "provenance_domain": {
+                        "name": f"Assembly {index}",
+                        "version": f"{rng.randint(1, 9)}.{rng.randint(0, 99)}",
+                        "created": (start_date + timedelta(
+                            minutes=rng.randint(0, 60 * 24 * 365 * 5)
+                        )).isoformat(),
+                    },
+                    "execution_domain": {"software_prerequisites": [
+                        {"name": name, "version": "1.0"}
+                        for name in rng.sample(SOFTWARE, 2)
+                    ]},
+                    "io_domain": {"input_subdomain": [
+                        {"uri": {"uri": "https://data.example/"\
+                            + f"{rng.randint(0, args.rows)}.fasta"}}
+                        for _ in range(3)
+                    ]},
+                    "usability_domain": ["x" * rng.randint(100, 2000)],
+                },
+                prefix_id="BCO",
+                owner_id="tester",
+                state="PUBLISHED",
+                last_update=now - timedelta(seconds=rng.randint(0, 10**7)),
+                acl_public=True
+            )
+            for index in range(start, min(start + 10000, args.rows))
+        ])
+
+def run(args):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from search.selectors import (
+        SUMMARY_VALUES, controled_list, search_page, search_query
+    )
+
+    populate(args, random.Random(1))
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    bcos = controled_list(User.objects.get(username="tester"))
+
+    def page(query):
+        return search_page(
+            search_query(bcos, [query]), SUMMARY_VALUES, limit=args.limit
+        )
+
+    def count(query):
+        return search_query(bcos, [query]).count()
+
+    def measure(label):
+        print(f"{label}:")
+        for query in QUERIES:
+            print(f"  q={query}: {count(query)} matches")
+            for name, function in [("first page", page), ("count", count)]:
+                elapsed = timeit(function, query, repeat=args.repeat)
+                print(f"    {name}: {elapsed * 1000:.1f} ms")
+            plan = search_query(bcos, [query]).order_by(
+                "-last_update", "-object_id"
+            ).values_list("object_id")[:args.limit].explain()
+            print("    " + plan.replace("\n", "\n    "))
+
+    print(f"{connection.vendor}: {args.rows} BCOs, {args.limit} per page")
+    measure("with expression indexes")
+
+    hot_paths = import_module("search.migrations.0002_json_path_indexes")\
+        .HOT_PATHS
+    with connection.cursor() as cursor:
+        for name in hot_paths:
+            cursor.execute(f"DROP INDEX {name}")
+        cursor.execute("ANALYZE")
+    measure("without expression indexes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_prefix_permissions.py
+
+"""Prefix Permission Benchmark
+
+Times the authorization overhead of a bulk request that checks the prefix
+permissions of every object, as a bulk draft create does, in a test
+database with extra public and private prefixes:
+
+- per check: every check loads the permissions again (no request scope).
+- per request: the resolver is loaded once per request.
+- cached: the resolver is read from the cross-request `permission_cache`,
+  in the "default" cache when `BCO_PERMISSION_CACHE` is not set.
+
+    python -m tests.benchmarks.bench_prefix_permissions --checks 200
+"""
+
+import argparse
+from tests.benchmarks import setup_django, setup_test_database, timeit
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--checks", type=int, default=200)
+    parser.add_argument("--prefixes", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    teardown = setup_test_database()
+    try:
+        run(args)
+    finally:
+        teardown()
+
+def run(args):
+    from django.contrib.auth.models import User
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+    from prefix.models import Prefix
+    from prefix.selectors import permission_cache, user_can_draft_prefix
+    from prefix.services import create_permissions_for_prefix
+
+    owner = User.objects.get(username="bco_api_user")
+    for index in range(args.prefixes):
+        prefix = Prefix.objects.create(
+            prefix=f"B{index:04}", owner=owner, public=index % 2 == 0
+        )
+        if not prefix.public:
+            create_permissions_for_prefix(prefix)
+    names = list(Prefix.objects.values_list("prefix", flat=True))
+    checks = [names[index % len(names)] for index in range(args.checks)]
+
+    def request(scoped: bool):
+        if scoped:
+            request_started.send(sender=None)
+        for prefix_name in checks:
+            user_can_draft_prefix(owner, prefix_name)
+        if scoped:
+            request_finished.send(sender=None)
+
+    def requests(scoped: bool):
+        for _ in range(args.requests):
+            request(scoped)
+
+    queries = []
+
+    def count_query(execute, *query_args):
+        queries.append(None)
+        return execute(*query_args)
+
+    alias = permission_cache.alias
+    print(f"prefixes: {len(names)}  checks per request: {args.checks}")
+    for name, scoped, cached in [
+        ("per check", False, False),
+        ("per request", True, False),
+        ("cached", True, True),
+    ]:
+        permission_cache.alias = (alias or "default") if cached else None
+        request(scoped)
+        queries.clear()
+        with connection.execute_wrapper(count_query):
+            request(scoped)
+        seconds = timeit(requests, scoped, repeat=args.repeat)
+        print(f"  {name:<12} {seconds * 1000 / args.requests:8.3f} ms/request"\
+            + f"  {len(queries):>4} queries/request")
+    permission_cache.alias = alias
+
+if __name__ == "__main__":
+    main()
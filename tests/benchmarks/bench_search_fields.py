@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_search_fields.py
+
+"""Search Fields Benchmark
+
+Times filters and sorts on the extracted search fields of
+`search.selectors.search_fields` and `search_page` on a generated table of
+BCOs, against the equivalent structured `q` queries on the JSON contents,
+and prints the query plan of each.
+
+    python -m tests.benchmarks.bench_search_fields --rows 100000
+"""
+
+import argparse
+import random
+from datetime import timedelta
+from tests.benchmarks import setup_django, setup_test_database, timeit
+
+KEYWORDS = ["glycan", "protein", "variant", "assembly", "rna-seq", "qc"]
+
+SEARCHES = [
+    (
+        {"version": ["3.7"]},
+        'provenance_domain.version = "3.7"',
+    ),
+    (
+        {"name": ["Assembly 1234"]},
+        'provenance_domain.name = "Assembly 1234"',
+    ),
+    (
+        {"created_since": "2023-06-01", "created_before": "2023-06-08"},
+        'provenance_domain.created >= "2023-06-01"'\
+            + ' provenance_domain.created < "2023-06-08"',
+    ),
+    (
+        {"keyword": ["glycan"], "license": ["CC0"]},
+        "description_domain.keywords = glycan"\
+            + " provenance_domain.license = CC0",
+    ),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    teardown = setup_test_database()
+    try:
+        run(args)
+    finally:
+        teardown()
+
+def populate(args, rng: random.Random):
+    """Creates the BCOs to search, with their search fields."""
+
+    from datetime import datetime
+    from django.utils import timezone
+    from biocompute.models import Bco, BcoKeyword
+    from biocompute.selectors import extract_search_fields
+
+    now = timezone.now()
+    start_date = datetime(2020, 1, 1)
+    for start in range(0, args.rows, 10000):
+        bcos = []
+        keywords = []
+        for index in range(start, min(start + 10000, args.rows)):
+            contents = {
+                "provenance_domain": {
+                    "name": f"Assembly {index}",
+                    "version": f"{rng.randint(1, 9)}.{rng.randint(0, 99)}",
+                    "created": (start_date + timedelta(
+                        minutes=rng.randint(0, 60 * 24 * 365 * 5)
+                    )).isoformat(),
+                    "license": rng.choice(["CC0", "MIT", "CC-BY-4.0"]),
+                },
+                "description_domain": {
+                    "keywords": rng.sample(KEYWORDS, 2)
+                },
+                "usability_domain": ["x" * rng.randint(100, 2000)],
+            }
+            fields = extract_search_fields(contents)
+            bco = Bco(
+                object_id=f"http://bench/{index:08}/1.0",
+                contents=contents,
+                prefix_id="BCO",
+                owner_id="tester",
+                state="PUBLISHED",
+                last_update=now - timedelta(seconds=rng.randint(0, 10**7)),
+                acl_public=True,
+                **{
+                    name: value for name, value in fields.items()
+                    if name != "keywords"
+                }
+            )
+            bcos.append(bco)
+            keywords.extend(
+                BcoKeyword(bco=bco, keyword=keyword)
+                for keyword in fields["keywords"]
+            )
+        Bco.objects.bulk_create(bcos)
+        BcoKeyword.objects.bulk_create(keywords)
+
+def run(args):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from search.selectors import (
+        SUMMARY_VALUES, controled_list, search_fields, search_page,
+        search_query
+    )
+
+    populate(args, random.Random(1))
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    bcos = controled_list(User.objects.get(username="tester"))
+
+    def page(queryset, sort=None, cursor=None):
+        return search_page(
+            queryset, SUMMARY_VALUES, cursor=cursor, limit=args.limit,
+            sort=sort
+        )
+
+    print(f"{connection.vendor}: {args.rows} BCOs, {args.limit} per page")
+    for filters, query in SEARCHES:
+        print(f"  {filters}: {search_fields(bcos, filters).count()} matches")
+        for label, queryset in [
+            ("columns", search_fields(bcos, filters)),
+            ("q", search_query(bcos, [query])),
+        ]:
+            elapsed = timeit(page, queryset, repeat=args.repeat)
+            print(f"    {label} first page: {elapsed * 1000:.1f} ms")
+        plan = search_fields(bcos, filters).values_list("object_id")\
+            [:args.limit].explain()
+        print("    " + plan.replace("\n", "\n    "))
+
+    for sort in ["name", "-version", "created", "-created"]:
+        print(f"  sort={sort}:")
+        _, cursor = page(bcos, sort)
+        for _ in range(9):
+            _, cursor = page(bcos, sort, cursor)
+        for label, start in [("first page", None), ("tenth page", cursor)]:
+            elapsed = timeit(page, bcos, sort, start, repeat=args.repeat)
+            print(f"    {label}: {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
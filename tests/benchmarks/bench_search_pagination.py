@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_search_pagination.py
+
+"""Search Pagination Benchmark
+
+Times pages of search results at increasing depths with the keyset
+pagination of `search.selectors.search_page` and with `OFFSET`, on a
+generated table of BCOs, and prints the query plan of the page keys. The
+test database is created with the configured database engine, so pointing
+`DATABASES` at PostgreSQL benchmarks PostgreSQL instead of SQLite.
+
+    python -m tests.benchmarks.bench_search_pagination --rows 100000
+"""
+
+import argparse
+import random
+from datetime import timedelta
+from tests.benchmarks import setup_django, setup_test_database, timeit
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    teardown = setup_test_database()
+    try:
+        run(args)
+    finally:
+        teardown()
+
+def populate(args, rng: random.Random):
+    """Creates the BCOs to page through."""
+
+    from django.utils import timezone
+    from biocompute.models import Bco
+
+    now = timezone.now()
+    states = ["DRAFT", "PUBLISHED", "PUBLISHED", "DELETE"]
+    for start in range(0, args.rows, 10000):
+        Bco.objects.bulk_create([
+            Bco(
+                object_id=f"http://bench/{index:08}/1.0",
+                contents={"provenance_domain": {"name": f"BCO {index}"},
+                    "usability_domain": ["x" * rng.randint(100, 2000)]},
+                prefix_id=rng.choice(["BCO", "TEST"]),
+                owner_id="tester",
+                state=rng.choice(states),
+                last_update=now - timedelta(seconds=rng.randint(0, 10**7)),
+                acl_public=True
+            )
+            for index in range(start, min(start + 10000, args.rows))
+        ])
+
+def run(args):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from search.selectors import RETURN_VALUES, controled_list, search_page
+
+    rng = random.Random(1)
+    populate(args, rng)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    user = User.objects.get(username="tester")
+    bcos = controled_list(user)
+    total = bcos.count()
+
+    # The cursors of the pages at each depth, found by paging through once.
+    depths = [0, total // 10, total // 2, total - args.limit]
+    cursors = {0: None}
+    cursor, offset = None, 0
+    while offset + args.limit <= depths[-1]:
+        _, cursor = search_page(bcos, ["object_id"], cursor, args.limit)
+        offset += args.limit
+        if offset in [depth - depth % args.limit for depth in depths]:
+            cursors[offset] = cursor
+
+    def keyset(offset):
+        return search_page(bcos, RETURN_VALUES, cursors[offset], args.limit)
+
+    def with_offset(offset):
+        return list(bcos.order_by("-last_update", "-object_id")\
+            .values(*RETURN_VALUES)[offset:offset + args.limit])
+
+    print(f"{connection.vendor}: {args.rows} BCOs, {total} visible, "\
+        + f"{args.limit} per page")
+    for offset in sorted(cursors):
+        cursor_time = timeit(keyset, offset, repeat=args.repeat)
+        offset_time = timeit(with_offset, offset, repeat=args.repeat)
+        print(f"page at {offset}: cursor {cursor_time * 1000:.1f} ms, "\
+            + f"offset {offset_time * 1000:.1f} ms")
+    keys = bcos.order_by("-last_update", "-object_id")\
+        .values_list("last_update", "object_id")[:args.limit + 1]
+    print("  " + keys.explain().replace("\n", "\n  "))
+
+if __name__ == "__main__":
+    main()
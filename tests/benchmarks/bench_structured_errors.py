@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_structured_errors.py
+
+"""Structured Errors Benchmark
+
+Times validation of badly broken BCOs with legacy message strings and with
+structured error objects, for `jsonschema` and for the generated validators,
+and compares the size of the serialized results. The broken BCOs are the
+ones from `bench_validation_modes`.
+
+    python -m tests.benchmarks.bench_structured_errors --steps 500
+"""
+
+import argparse
+import json
+from tests.benchmarks import setup_django, load_bco_dump, timeit
+from tests.benchmarks.bench_validation_modes import break_bco
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--objects", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from biocompute.schemas import ExtensionSchemaResolver, SchemaRegistry
+    from biocompute.services import BcoValidator, ERROR_FORMATS
+
+    dump = load_bco_dump()
+    bcos = [
+        break_bco(dump[index % len(dump)], args.steps)
+        for index in range(args.objects)
+    ]
+
+    def run(validator, error_format):
+        return [
+            validator.parse_and_validate(bco, error_format=error_format)
+            for bco in bcos
+        ]
+
+    def serialize(validator, error_format):
+        return json.dumps(run(validator, error_format), default=str)
+
+    print(f"objects: {args.objects}  steps: {args.steps}")
+    for codegen in (False, True):
+        validator = BcoValidator(resolver=ExtensionSchemaResolver(
+            registry=SchemaRegistry(codegen=codegen)
+        ))
+        run(validator, "legacy")
+        print("generated:" if codegen else "jsonschema:")
+        for error_format in ERROR_FORMATS:
+            errors = sum(
+                results["number_of_errors"]
+                for bco_results in run(validator, error_format)
+                for results in bco_results.values()
+            )
+            validate_time = timeit(
+                run, validator, error_format, repeat=args.repeat
+            )
+            serialize_time = timeit(
+                serialize, validator, error_format, repeat=args.repeat
+            )
+            size = len(serialize(validator, error_format))
+            print(f"  {error_format:<10}  {errors:>6} errors  "\
+                + f"validate {validate_time:.3f}s  "\
+                + f"validate+dumps {serialize_time:.3f}s  "\
+                + f"{size / 1024:,.0f} KiB")
+
+if __name__ == "__main__":
+    main()
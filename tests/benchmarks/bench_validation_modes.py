@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_validation_modes.py
+
+"""Validation Modes Benchmark
+
+Times full, error-limited and fast-fail validation of badly broken BCOs,
+where walking every error costs the most. The broken BCOs are built from
+`tests/fixtures/bco_dump.json` by multiplying the pipeline steps and
+breaking the type of every field in them.
+
+    python -m tests.benchmarks.bench_validation_modes --steps 500
+"""
+
+import argparse
+from copy import deepcopy
+from tests.benchmarks import setup_django, load_bco_dump, timeit
+
+def break_bco(bco: dict, steps: int) -> dict:
+    """Returns a copy of a BCO with `steps` invalid pipeline steps."""
+
+    broken = deepcopy(bco)
+    broken["provenance_domain"]["contributors"] = [{"name": 1}] * steps
+    broken["description_domain"]["pipeline_steps"] = [
+        {
+            "step_number": str(index),
+            "name": index,
+            "description": None,
+            "input_list": [{"uri": index}],
+            "output_list": "not a list",
+        }
+        for index in range(steps)
+    ]
+    return broken
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--objects", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from biocompute.services import BcoValidator, VALIDATION_MODES
+
+    dump = load_bco_dump()
+    bcos = [
+        break_bco(dump[index % len(dump)], args.steps)
+        for index in range(args.objects)
+    ]
+    validator = BcoValidator()
+
+    def run(max_errors):
+        return [validator.parse_and_validate(bco, max_errors) for bco in bcos]
+
+    run(None)
+    modes = [
+        ("full", VALIDATION_MODES["full"]),
+        ("max_errors=10", 10),
+        ("fast", VALIDATION_MODES["fast"]),
+    ]
+    full_time = None
+    print(f"{args.objects} broken BCOs with {args.steps} bad steps each")
+    for name, max_errors in modes:
+        _, results = run(max_errors)[0].popitem()
+        elapsed = timeit(run, max_errors, repeat=args.repeat)
+        full_time = full_time or elapsed
+        print(f"{name:>14}: {elapsed:.3f}s  "\
+            + f"{results['number_of_errors']:>6} errors/BCO  "\
+            + f"{full_time / elapsed:6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# tests/benchmarks/bench_visibility_filter.py
+
+"""Visibility Filter Benchmark
+
+Compares the `EXISTS` visibility filter of `search.selectors.controled_list`
+with the previous prefix-list and `distinct()` filter on a generated table
+of BCOs, and prints the query plan of each. The test database is created
+with the configured database engine, so pointing `DATABASES` at PostgreSQL
+benchmarks PostgreSQL instead of SQLite.
+
+    python -m tests.benchmarks.bench_visibility_filter --rows 1000000
+"""
+
+import argparse
+import random
+from tests.benchmarks import setup_django, setup_test_database, timeit
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--prefixes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    teardown = setup_test_database()
+    try:
+        run(args)
+    finally:
+        teardown()
+
+def populate(args, rng: random.Random):
+    """Creates the users, prefixes, permissions and BCOs to search."""
+
+    from django.contrib.auth.models import Permission, User
+    from django.utils import timezone
+    from biocompute.models import Bco
+    from prefix.models import Prefix
+    from prefix.services import create_permissions_for_prefix
+
+    User.objects.bulk_create([
+        User(username=f"bench{index}") for index in range(args.users)
+    ])
+    users = list(User.objects.filter(username__startswith="bench"))
+    prefixes = []
+    for index in range(args.prefixes):
+        prefix = Prefix.objects.create(
+            prefix=f"P{index:04}", owner=rng.choice(users),
+            public=index % 2 == 0
+        )
+        if not prefix.public:
+            create_permissions_for_prefix(prefix)
+        prefixes.append(prefix)
+
+    view_permissions = list(Permission.objects.filter(
+        codename__startswith="view_P"
+    ))
+    UserPermission = User.user_permissions.through
+    UserPermission.objects.bulk_create([
+        UserPermission(user=user, permission=permission)
+        for user in users
+        for permission in rng.sample(view_permissions, 5)
+    ], ignore_conflicts=True)
+
+    states = ["DRAFT", "PUBLISHED", "PUBLISHED", "DELETE"]
+    now = timezone.now()
+    Authorized = Bco.authorized_users.through
+    for start in range(0, args.rows, 10000):
+        bcos = []
+        for index in range(start, min(start + 10000, args.rows)):
+            prefix = rng.choice(prefixes)
+            bcos.append(Bco(
+                object_id=f"http://bench/{index:08}/DRAFT",
+                contents={},
+                prefix=prefix,
+                owner=rng.choice(users),
+                state=rng.choice(states),
+                last_update=now,
+                acl_public=prefix.public
+            ))
+        Bco.objects.bulk_create(bcos)
+        Authorized.objects.bulk_create([
+            Authorized(bco_id=bco.object_id, user=user)
+            for bco in bcos if rng.random() < 0.05
+            for user in rng.sample(users, rng.randint(1, 3))
+        ])
+    return users
+
+def run(args):
+    from django.db import connection
+    from search.selectors import controled_list
+    from tests.test_apis.test_search.test_object_search import (
+        reference_controled_list
+    )
+
+    rng = random.Random(1)
+    users = populate(args, rng)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    user = rng.choice(users)
+
+    def fetch(function):
+        return list(function(user).values_list("object_id", flat=True))
+
+    def fetch_rows(function):
+        return list(function(user))
+
+    assert sorted(fetch(controled_list)) \
+        == sorted(fetch(reference_controled_list)), \
+        "Visibility filter differs from the previous filter"
+
+    print(f"{connection.vendor}: {args.rows} BCOs, {args.users} users, "\
+        + f"{args.prefixes} prefixes, {len(fetch(controled_list))} visible")
+    for name, function in [
+        ("previous", reference_controled_list),
+        ("exists", controled_list),
+    ]:
+        ids = timeit(fetch, function, repeat=args.repeat)
+        rows = timeit(fetch_rows, function, repeat=args.repeat)
+        print(f"{name}: object_ids {ids * 1000:.1f} ms, "\
+            + f"rows {rows * 1000:.1f} ms")
+        print("  " + function(user).explain().replace("\n", "\n  "))
+
+if __name__ == "__main__":
+    main()
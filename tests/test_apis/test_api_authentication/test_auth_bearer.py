@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""Bearer Authentication
+Tests for the `Identity` index that resolves ORCID tokens to users and for
+the `token_cache` of users of verified bearer tokens.
+"""
+
+import time
+import jwt
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from authentication.models import Authentication, Identity
+from authentication.selectors import get_identity_user
+from authentication.services import token_cache
+
+class IdentityTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+        token = Token.objects.get(user=User.objects.get(username='tester')).key
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token)
+
+    def test_fixture_identities(self):
+        """Existing `auth_service` entries are indexed.
+        """
+
+        with self.assertNumQueries(1):
+            user = get_identity_user("Reeya1", "ReeyaGupta1")
+        self.assertEqual(user.username, "bco_api_user")
+        self.assertIsNone(get_identity_user("Reeya1", "ReeyaGupta"))
+        self.assertIsNone(get_identity_user("Reeya", "ReeyaGupta1"))
+
+    def test_add_and_remove(self):
+        """Adding and removing an `auth_service` entry updates the index.
+        """
+
+        orcid = {"iss": "https://orcid.org", "sub": "0000-0001-2345-6789"}
+        response = self.client.post('/api/auth/add/', data=orcid, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            get_identity_user(orcid["iss"], orcid["sub"]).username, "tester"
+        )
+
+        response = self.client.post('/api/auth/remove/', data=orcid, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(get_identity_user(orcid["iss"], orcid["sub"]))
+
+    def test_claimed_identity(self):
+        """An identity stays with the first account that lists it.
+        """
+
+        Authentication.objects.create(
+            username=User.objects.get(username="jdoe"),
+            auth_service=[{"iss": "Reeya1", "sub": "ReeyaGupta1"}, "invalid"]
+        )
+        self.assertEqual(
+            get_identity_user("Reeya1", "ReeyaGupta1").username, "bco_api_user"
+        )
+        self.assertEqual(Identity.objects.count(), 1)
+
+class TokenCacheTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.alias = token_cache.alias
+        token_cache.alias = "default"
+        token_cache.cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.get(username='tester')
+        self.token = jwt.encode({
+            "iss": "http://localhost:8080",
+            "email": self.user.email,
+            "exp": int(time.time()) + 3600
+        }, "secret").decode("utf-8")
+
+    def tearDown(self):
+        token_cache.cache.clear()
+        token_cache.alias = self.alias
+
+    def request(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        return self.client.post('/api/prefixes/user/')
+
+    def test_verified_once(self):
+        """A token is verified once and then served from the cache.
+        """
+
+        verified = mock.Mock(status_code=201)
+        with mock.patch(
+            "authentication.services.requests.post", return_value=verified
+        ) as verify:
+            self.assertEqual(self.request().status_code, 200)
+            self.assertEqual(self.request().status_code, 200)
+        self.assertEqual(verify.call_count, 1)
+
+    def test_failed_not_cached(self):
+        """Tokens that fail verification are checked on every request.
+        """
+
+        rejected = mock.Mock(status_code=401, reason="Invalid token")
+        with mock.patch(
+            "authentication.services.requests.post", return_value=rejected
+        ) as verify:
+            self.assertEqual(self.request().status_code, 403)
+            self.assertEqual(self.request().status_code, 403)
+        self.assertEqual(verify.call_count, 2)
+
+    def test_user_changes(self):
+        """Changing the user drops the cached tokens.
+        """
+
+        verified = mock.Mock(status_code=201)
+        with mock.patch(
+            "authentication.services.requests.post", return_value=verified
+        ) as verify:
+            self.request()
+            self.user.is_active = False
+            self.user.save()
+            self.assertIsNone(token_cache.get(self.token))
+            self.request()
+        # The portal's verification of the token itself is still cached.
+        self.assertEqual(verify.call_count, 1)
+
+    def test_identity_changes(self):
+        """Reassigning an identity drops the cached tokens.
+        """
+
+        identity = Identity.objects.create(
+            issuer="https://orcid.org", subject="0000-0001",
+            username=self.user,
+            authentication=Authentication.objects.create(
+                username=self.user, auth_service=[]
+            )
+        )
+        token_cache.set(self.token, self.user)
+        identity.username = User.objects.get(username="bco_api_user")
+        identity.save()
+        self.assertIsNone(token_cache.get(self.token))
+
+    def test_expiry(self):
+        """Entries do not outlive the token.
+        """
+
+        token_cache.set("expired", self.user, time.time() - 1)
+        self.assertIsNone(token_cache.get("expired"))
+        token_cache.set("valid", self.user, time.time() + 30)
+        self.assertEqual(token_cache.get("valid"), self.user)
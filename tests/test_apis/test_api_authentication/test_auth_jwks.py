@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+"""JWKS Cache
+Tests for the `JwksCache` of issuer signing keys against a local stand-in
+JWKS server, for ORCID token verification with it and for 'Authentication
+metrics. 200'.
+"""
+
+import json
+import threading
+import time
+import jwt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework import exceptions
+from rest_framework.test import APIClient
+from authentication import services
+from authentication.jwks import JwksCache, JwksFetchError
+from authentication.models import Authentication
+
+def make_key(kid: str):
+    """Returns a private key and its public JWK."""
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(
+        jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key())
+    )
+    jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return private_key, jwk
+
+class JwksHandler(BaseHTTPRequestHandler):
+    """Local stand-in for an issuer's JWKS endpoint."""
+
+    keys = []
+    status = 200
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        if self.path != "/oauth/jwks" or self.status != 200:
+            self.send_error(404 if self.status == 200 else self.status)
+            return
+        body = json.dumps({"keys": self.keys}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class JwksServerMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.first_key, cls.first_jwk = make_key("first")
+        cls.second_key, cls.second_jwk = make_key("second")
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), JwksHandler)
+        cls.issuer = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        JwksHandler.keys = [self.first_jwk]
+        JwksHandler.status = 200
+        JwksHandler.requests_seen = []
+
+class JwksCacheTestCase(JwksServerMixin, SimpleTestCase):
+
+    def test_fetched_once(self):
+        """Keys are fetched once and then served from memory.
+        """
+
+        cache = JwksCache(timeout=2)
+        self.assertIsNotNone(cache.get_key(self.issuer, "first"))
+        self.assertIsNotNone(cache.get_key(self.issuer, "first"))
+        self.assertIsNotNone(cache.get_key(self.issuer))
+        self.assertEqual(len(JwksHandler.requests_seen), 1)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertEqual(stats["issuers"][self.issuer]["kids"], ["first"])
+
+    def test_unknown_kid(self):
+        """An unknown `kid` refetches the keys, at most once per interval.
+        """
+
+        cache = JwksCache(timeout=2, min_refetch=60)
+        cache.get_key(self.issuer, "first")
+        JwksHandler.keys = [self.first_jwk, self.second_jwk]
+        self.assertIsNotNone(cache.get_key(self.issuer, "second"))
+        self.assertIsNone(cache.get_key(self.issuer, "made-up"))
+        self.assertIsNone(cache.get_key(self.issuer, "made-up"))
+        self.assertEqual(len(JwksHandler.requests_seen), 2)
+
+    def test_background_refresh(self):
+        """Keys near the end of their TTL are refreshed in the background.
+        """
+
+        cache = JwksCache(timeout=2, ttl=60, refresh_ahead=30)
+        cache.get_key(self.issuer, "first")
+        cache._issuers[self.issuer].fetched_at -= 40
+        JwksHandler.keys = [self.second_jwk]
+        self.assertIsNotNone(cache.get_key(self.issuer, "first"))
+        deadline = time.monotonic() + 5
+        while cache._issuers[self.issuer].refreshing \
+                and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.stats()["background_refreshes"], 1)
+        self.assertEqual(len(JwksHandler.requests_seen), 2)
+        self.assertIsNotNone(cache.get_key(self.issuer, "second"))
+        self.assertEqual(len(JwksHandler.requests_seen), 2)
+
+    def test_expired_keys(self):
+        """Keys past their TTL are fetched again before answering.
+        """
+
+        cache = JwksCache(timeout=2, ttl=60)
+        cache.get_key(self.issuer, "first")
+        cache._issuers[self.issuer].fetched_at -= 60
+        JwksHandler.keys = [self.second_jwk]
+        self.assertIsNone(cache.get_key(self.issuer, "first"))
+        self.assertEqual(len(JwksHandler.requests_seen), 2)
+
+    def test_issuer_down(self):
+        """Old keys are served while the issuer fails.
+        """
+
+        cache = JwksCache(timeout=2, ttl=60)
+        JwksHandler.status = 503
+        with self.assertRaises(JwksFetchError):
+            cache.get_key(self.issuer, "first")
+
+        JwksHandler.status = 200
+        cache._issuers[self.issuer].failed_at -= 60
+        cache.get_key(self.issuer, "first")
+        cache._issuers[self.issuer].fetched_at -= 60
+        JwksHandler.status = 503
+        self.assertIsNotNone(cache.get_key(self.issuer, "first"))
+        self.assertIsNotNone(cache.get_key(self.issuer, "first"))
+        self.assertEqual(len(JwksHandler.requests_seen), 3)
+        self.assertEqual(cache.stats()["errors"], 2)
+
+    def test_issuer_down_without_keys(self):
+        """Failed fetches are not retried within `min_refetch`, also when
+        there are no keys to serve.
+        """
+
+        cache = JwksCache(timeout=2, min_refetch=60)
+        JwksHandler.status = 503
+        for _ in range(3):
+            with self.assertRaises(JwksFetchError):
+                cache.get_key(self.issuer, "first")
+        self.assertEqual(len(JwksHandler.requests_seen), 1)
+        self.assertEqual(cache.stats()["errors"], 1)
+
+        JwksHandler.status = 200
+        with self.assertRaises(JwksFetchError):
+            cache.get_key(self.issuer, "first")
+        cache._issuers[self.issuer].failed_at -= 60
+        self.assertIsNotNone(cache.get_key(self.issuer, "first"))
+        self.assertEqual(len(JwksHandler.requests_seen), 2)
+
+class OrcidAuthenticationTestCase(JwksServerMixin, TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        super().setUp()
+        self.jwks_cache = services.jwks_cache
+        services.jwks_cache = JwksCache(timeout=2)
+        self.subject = "0000-0001-2345-6789"
+        Authentication.objects.create(
+            username=User.objects.get(username="tester"),
+            auth_service=[{"iss": self.issuer, "sub": self.subject}]
+        )
+
+    def tearDown(self):
+        services.jwks_cache = self.jwks_cache
+
+    def token(self, private_key, kid: str) -> tuple:
+        payload = {
+            "iss": self.issuer,
+            "sub": self.subject,
+            "aud": "APP-88DEA42BRILGEHKC",
+            "exp": int(time.time()) + 600,
+        }
+        token = jwt.encode(
+            payload, private_key, algorithm="RS256", headers={"kid": kid}
+        ).decode("utf-8")
+        return payload, token
+
+    def test_verified_with_cached_keys(self):
+        """ORCID tokens are verified without fetching the keys each time.
+        """
+
+        payload, token = self.token(self.first_key, "first")
+        for _ in range(3):
+            user = services.authenticate_orcid(payload, token)
+            self.assertEqual(user.username, "tester")
+        self.assertEqual(len(JwksHandler.requests_seen), 1)
+
+    def test_rotated_key(self):
+        """A token signed with a new key refetches the keys once.
+        """
+
+        services.authenticate_orcid(*self.token(self.first_key, "first"))
+        JwksHandler.keys = [self.first_jwk, self.second_jwk]
+        payload, token = self.token(self.second_key, "second")
+        self.assertEqual(
+            services.authenticate_orcid(payload, token).username, "tester"
+        )
+        self.assertEqual(len(JwksHandler.requests_seen), 2)
+
+    def test_wrong_key(self):
+        """Tokens with an unknown `kid` or a forged signature are refused.
+        """
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            services.authenticate_orcid(*self.token(self.second_key, "second"))
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            services.authenticate_orcid(*self.token(self.second_key, "first"))
+
+class AuthMetricsTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def test_metrics(self):
+        """200: Admin users get the authentication cache counters.
+        """
+
+        client = APIClient()
+        user = User.objects.get(username="tester")
+        client.force_authenticate(user=user)
+        self.assertEqual(client.get('/api/auth/metrics/').status_code, 403)
+        user.is_staff = True
+        response = client.get('/api/auth/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("hits", response.data["jwks_cache"])
+        self.assertIn("hits", response.data["token_cache"])
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+"""Portal Tokens
+Tests for the `PortalTokenVerifier` of BioCompute Portal tokens: local
+verification with configured keys, cached portal verifications and
+deduplicated concurrent calls to the portal.
+"""
+
+import threading
+import time
+import jwt
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import exceptions
+from authentication import services
+from authentication.portal import PortalTokenVerifier
+
+PORTAL = "http://localhost:8080"
+VERIFY_URL = PORTAL + "/users/auth/verify/"
+
+class PortalTokenTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.verifier = PortalTokenVerifier(alias="default")
+        self.verifier.cache.clear()
+        self.portal_verifier = services.portal_verifier
+        services.portal_verifier = self.verifier
+        self.user = User.objects.get(username="tester")
+
+    def tearDown(self):
+        services.portal_verifier = self.portal_verifier
+        self.verifier.cache.clear()
+
+    def token(self, secret: str="portal secret", expires: float=3600) -> tuple:
+        payload = {
+            "iss": PORTAL,
+            "email": self.user.email,
+            "exp": int(time.time() + expires),
+        }
+        return payload, jwt.encode(payload, secret).decode("utf-8")
+
+    def test_remote_verification_cached(self):
+        """The portal is asked once per token.
+        """
+
+        payload, token = self.token()
+        verified = mock.Mock(status_code=201)
+        with mock.patch(
+            "authentication.portal.requests.post", return_value=verified
+        ) as verify:
+            for _ in range(3):
+                user = services.authenticate_portal(payload, token)
+                self.assertEqual(user, self.user)
+        self.assertEqual(verify.call_count, 1)
+        self.assertEqual(verify.call_args[0][0], VERIFY_URL)
+        self.assertEqual(self.verifier.stats()["hits"], 2)
+
+    def test_expired_not_cached(self):
+        """Verifications are not kept past the expiry of the token.
+        """
+
+        payload, token = self.token(expires=-1)
+        verified = mock.Mock(status_code=201)
+        with mock.patch(
+            "authentication.portal.requests.post", return_value=verified
+        ) as verify:
+            services.authenticate_portal(payload, token)
+            services.authenticate_portal(payload, token)
+        self.assertEqual(verify.call_count, 2)
+
+    def test_rejected(self):
+        """Rejected tokens fail with the portal's reason every time.
+        """
+
+        payload, token = self.token()
+        rejected = mock.Mock(status_code=401, reason="Invalid token")
+        with mock.patch(
+            "authentication.portal.requests.post", return_value=rejected
+        ) as verify:
+            for _ in range(2):
+                with self.assertRaisesMessage(
+                    exceptions.AuthenticationFailed, "Invalid token"
+                ):
+                    services.authenticate_portal(payload, token)
+        self.assertEqual(verify.call_count, 2)
+
+    def test_concurrent_requests(self):
+        """Concurrent requests with one token make a single portal call.
+        """
+
+        payload, token = self.token()
+        release = threading.Event()
+
+        def slow_portal(*args, **kwargs):
+            release.wait(5)
+            return mock.Mock(status_code=201)
+
+        results = []
+
+        def verify():
+            results.append(self.verifier.verify(token, VERIFY_URL, payload))
+
+        with mock.patch(
+            "authentication.portal.requests.post", side_effect=slow_portal
+        ) as portal:
+            threads = [threading.Thread(target=verify) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 5
+            while self.verifier.deduplicated < 4 \
+                    and time.monotonic() < deadline:
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(portal.call_count, 1)
+        self.assertEqual(results, [(True, None)] * 5)
+
+    def test_local_verification(self):
+        """Tokens of issuers with a key are verified without the portal.
+        """
+
+        self.verifier.keys = {
+            PORTAL: {"key": "portal secret", "algorithms": ["HS256"]}
+        }
+        with mock.patch("authentication.portal.requests.post") as verify:
+            user = services.authenticate_portal(*self.token())
+            self.assertEqual(user, self.user)
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                services.authenticate_portal(*self.token(secret="forged"))
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                services.authenticate_portal(*self.token(expires=-60))
+        verify.assert_not_called()
+        self.assertEqual(self.verifier.stats()["local"], 3)
+
+    def test_validate_token(self):
+        """Registration tokens are checked with the portal they name.
+        """
+
+        self.verifier.keys = {
+            PORTAL: {"key": "portal secret", "algorithms": ["HS256"]}
+        }
+        _, token = self.token()
+        verified = mock.Mock(status_code=201)
+        with mock.patch(
+            "authentication.portal.requests.post", return_value=verified
+        ) as verify:
+            self.assertTrue(services.validate_token(token, PORTAL + "/users/"))
+            self.assertTrue(services.validate_token(token, PORTAL + "/users/"))
+        self.assertEqual(verify.call_count, 1)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+"""Prefixes Info
+Tests for 'Retrieving prefix info was successful. 200', 207 and 404, and for
+the `PrefixPermission` index behind `get_prefix_permissions`.
+"""
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+from prefix.models import PrefixPermission
+from prefix.selectors import get_prefix_objects, get_prefix_permissions
+from prefix.services import update_user_permissions
+
+def indexed_permissions() -> set:
+    """The index as `(username, codename)` pairs."""
+
+    return {
+        (username, f"{action}_{prefix_name}")
+        for username, action, prefix_name in PrefixPermission.objects\
+            .values_list("user__username", "action", "prefix_id")
+    }
+
+def assigned_permissions(prefix_names: set) -> set:
+    """The `<action>_<prefix>` permissions assigned to users."""
+
+    return {
+        (username, codename)
+        for username, codename in User.user_permissions.through.objects\
+            .values_list("user__username", "permission__codename")
+        if codename.partition("_")[2] in prefix_names
+    }
+
+class PrefixInfoTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(username='tester'))
+
+    def test_prefix_info(self):
+        """207: Public and permitted prefixes are returned with one query.
+        """
+
+        queries = []
+
+        def count_query(execute, *args):
+            queries.append(args[0])
+            return execute(*args)
+
+        with connection.execute_wrapper(count_query):
+            response = self.client.post(
+                '/api/prefixes/info/', ["TEST", "NOPUB", "NOPE"], format='json'
+            )
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [result["status_code"] for result in response.data],
+            [200, 200, 404]
+        )
+        self.assertNotIn("user_permissions", response.data[0]["data"])
+        self.assertEqual(response.data[1]["data"]["user_permissions"], {
+            "bco_api_user": [
+                f"{perm}_NOPUB"
+                for perm in ("view", "add", "change", "delete", "publish")
+            ],
+            "tester": [
+                f"{perm}_NOPUB" for perm in ("view", "add", "change", "delete")
+            ],
+        })
+
+    def test_forbidden(self):
+        """207: Users without permissions for a private prefix get a 403.
+        """
+
+        self.client.force_authenticate(user=User.objects.get(username='jdoe'))
+        response = self.client.post(
+            '/api/prefixes/info/', ["TEST", "NOPUB"], format='json'
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data[1]["status_code"], 403)
+
+class PrefixPermissionIndexTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def test_fixture_index(self):
+        """The index holds the prefix permissions assigned to users.
+        """
+
+        self.assertEqual(
+            indexed_permissions(), assigned_permissions({"BCO", "NOPUB", "TEST"})
+        )
+
+    def test_update_user_permissions(self):
+        """Updating the permissions of a prefix updates the index.
+        """
+
+        old_perms = get_prefix_permissions("NOPUB")
+        new_perms = dict(old_perms)
+        new_perms["tester"] = ["view_NOPUB"]
+        new_perms["jdoe"] = ["view_NOPUB", "publish_NOPUB"]
+        new_perms["nobody"] = ["view_NOPUB"]
+        update_user_permissions("NOPUB", new_perms, old_perms)
+
+        del new_perms["nobody"]
+        self.assertEqual(get_prefix_permissions("NOPUB"), new_perms)
+        self.assertEqual(indexed_permissions(), assigned_permissions({"NOPUB"}))
+        with self.assertNumQueries(1):
+            get_prefix_objects(["NOPUB", "TEST"])
+
+    def test_private_prefix_created(self):
+        """The owner of a new private prefix is indexed with every action.
+        """
+
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(username='tester'))
+        response = client.post('/api/prefixes/create/', [{
+            "prefix": "PRIV",
+            "description": "Private prefix.",
+            "public": False,
+            "user_permissions": {},
+        }], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(get_prefix_permissions("PRIV"), {
+            "tester": [
+                f"{perm}_PRIV"
+                for perm in ("view", "add", "change", "delete", "publish")
+            ]
+        })
+
+    def test_permission_deleted(self):
+        """Deleting a permission removes it from the index.
+        """
+
+        Permission.objects.get(codename="publish_NOPUB").delete()
+        self.assertNotIn(
+            "publish_NOPUB", get_prefix_permissions("NOPUB")["bco_api_user"]
+        )
+
+    def test_orm_assignments(self):
+        """Permissions assigned through the ORM, from either side, are
+        indexed and read back through the API.
+        """
+
+        jdoe = User.objects.get(username="jdoe")
+        view = Permission.objects.get(codename="view_NOPUB")
+        publish = Permission.objects.get(codename="publish_NOPUB")
+        jdoe.user_permissions.add(view)
+        publish.user_set.add(jdoe)
+        self.assertEqual(indexed_permissions(), assigned_permissions({"NOPUB"}))
+
+        client = APIClient()
+        client.force_authenticate(user=jdoe)
+        response = client.post(
+            '/api/prefixes/info/', ["TEST", "NOPUB"], format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data[1]["data"]["user_permissions"]["jdoe"],
+            ["view_NOPUB", "publish_NOPUB"]
+        )
+
+        for change in [
+            lambda: jdoe.user_permissions.remove(view),
+            lambda: publish.user_set.remove(jdoe),
+            lambda: User.objects.get(username="tester")\
+                .user_permissions.clear(),
+            lambda: Permission.objects.get(codename="add_NOPUB")\
+                .user_set.clear(),
+        ]:
+            change()
+            self.assertEqual(
+                indexed_permissions(),
+                assigned_permissions({"BCO", "NOPUB", "TEST"})
+            )
+        self.assertNotIn("jdoe", get_prefix_permissions("NOPUB"))
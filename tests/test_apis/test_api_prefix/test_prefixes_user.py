@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+"""Prefixes for User
+Tests for 'Authorization is successful. 200' and for the
+`PrefixPermissionResolver` and `permission_cache` behind the prefix
+permission selectors.
+"""
+
+from django.contrib.auth.models import AnonymousUser, Permission, User
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from prefix.models import Prefix
+from prefix.services import (
+    create_permissions_for_prefix,
+    prefix_counter_increment
+)
+from prefix.selectors import (
+    PrefixPermissionResolver,
+    get_permission_resolver,
+    permission_cache,
+    get_user_prefixes,
+    user_can_draft_prefix,
+    user_can_modify_prefix,
+    user_can_publish_prefix,
+    user_can_view_prefix
+)
+
+class PrefixesForUserTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_prefixes_for_user(self):
+        """200: Public prefixes and the user's prefix permissions are listed.
+        """
+
+        self.client.force_authenticate(
+            user=User.objects.get(username='bco_api_user')
+        )
+        response = self.client.post('/api/prefixes/user/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("publish_BCO", response.data)
+        self.assertIn("publish_NOPUB", response.data)
+
+class PrefixPermissionResolverTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def test_permissions(self):
+        """Public prefixes allow every action, private ones need permissions.
+        """
+
+        owner = User.objects.get(username='bco_api_user')
+        other = User.objects.get(username='jdoe')
+        for user in (owner, other, AnonymousUser()):
+            with self.subTest(user=user.username):
+                resolver = PrefixPermissionResolver(user)
+                self.assertTrue(resolver.can("publish", "BCO"))
+                self.assertIsNone(resolver.can("view", "NOPE"))
+        self.assertTrue(user_can_publish_prefix(owner, "NOPUB"))
+        self.assertTrue(user_can_view_prefix("NOPUB", owner))
+        self.assertFalse(user_can_draft_prefix(other, "NOPUB"))
+        self.assertFalse(user_can_modify_prefix(other, "NOPUB"))
+        self.assertIsNone(user_can_modify_prefix(other, "NOPE"))
+        self.assertEqual(
+            PrefixPermissionResolver(other).prefixes_for("view"),
+            {"BCO", "TEST"}
+        )
+        self.assertEqual(
+            sorted(get_user_prefixes(owner)),
+            sorted(
+                [f"{perm}_{prefix}" for prefix in ("BCO", "TEST")
+                    for perm in ("view", "add", "change", "delete", "publish")]
+                + [f"{perm}_NOPUB"
+                    for perm in ("view", "add", "change", "delete", "publish")]
+            )
+        )
+
+    def test_resolved_once_per_request(self):
+        """Within a request the resolver is built once per user.
+        """
+
+        user = User.objects.get(username='tester')
+        self.assertIsNot(
+            get_permission_resolver(user), get_permission_resolver(user)
+        )
+        request_started.send(sender=self.__class__)
+        try:
+            resolver = get_permission_resolver(user)
+            with self.assertNumQueries(0):
+                for _ in range(100):
+                    self.assertIs(get_permission_resolver(user), resolver)
+                    user_can_draft_prefix(user, "NOPUB")
+        finally:
+            request_finished.send(sender=self.__class__)
+        self.assertIsNot(get_permission_resolver(user), resolver)
+
+class PrefixPermissionCacheTestCase(TransactionTestCase):
+    """Runs outside of a transaction, where the cache is filled."""
+
+    def setUp(self):
+        self.alias = permission_cache.alias
+        permission_cache.alias = "default"
+        permission_cache.cache.clear()
+        owner = User.objects.create(username='bco_api_user')
+        self.user = User.objects.create(username='jdoe')
+        Prefix.objects.create(prefix="TEST", owner=owner)
+        create_permissions_for_prefix(
+            Prefix.objects.create(prefix="NOPUB", owner=owner, public=False)
+        )
+
+    def tearDown(self):
+        permission_cache.cache.clear()
+        permission_cache.alias = self.alias
+
+    def test_cached_across_resolvers(self):
+        """Permissions are loaded once and then served from the cache.
+        """
+
+        PrefixPermissionResolver(self.user)
+        with self.assertNumQueries(0):
+            resolver = PrefixPermissionResolver(self.user)
+        self.assertFalse(resolver.can("view", "NOPUB"))
+
+    def test_user_permission_changes(self):
+        """Adding or removing a user's permissions drops their entry.
+        """
+
+        permission = Permission.objects.get(codename="view_NOPUB")
+        self.assertFalse(user_can_view_prefix("NOPUB", self.user))
+        self.user.user_permissions.add(permission)
+        self.assertTrue(user_can_view_prefix("NOPUB", self.user))
+        permission.user_set.remove(self.user)
+        self.assertFalse(user_can_view_prefix("NOPUB", self.user))
+        permission.user_set.add(self.user)
+        permission.user_set.clear()
+        self.assertFalse(user_can_view_prefix("NOPUB", self.user))
+
+    def test_prefix_changes(self):
+        """Prefix changes drop the prefixes; counter updates do not.
+        """
+
+        self.assertTrue(user_can_view_prefix("TEST", self.user))
+        prefix_counter_increment(Prefix.objects.get(prefix="TEST"))
+        with self.assertNumQueries(0):
+            PrefixPermissionResolver(self.user)
+        Prefix.objects.filter(prefix="TEST").update(public=False)
+        Prefix.objects.get(prefix="TEST").save()
+        self.assertFalse(user_can_view_prefix("TEST", self.user))
+        Prefix.objects.get(prefix="TEST").delete()
+        self.assertIsNone(user_can_view_prefix("TEST", self.user))
+
+    def test_permission_deleted(self):
+        """Deleting a permission drops every user's entry.
+        """
+
+        owner = User.objects.get(username='bco_api_user')
+        self.assertTrue(user_can_publish_prefix(owner, "NOPUB"))
+        Permission.objects.get(codename="publish_NOPUB").delete()
+        self.assertFalse(user_can_publish_prefix(owner, "NOPUB"))
+
+    def test_no_caching_inside_transactions(self):
+        """Data read inside a transaction is not cached.
+        """
+
+        with transaction.atomic():
+            PrefixPermissionResolver(self.user)
+        with self.assertNumQueries(2):
+            PrefixPermissionResolver(self.user)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""BCO Search Fields
+Tests for the search fields extracted from the contents of BCOs by the
+draft create, modify and publish services, and the `bco_search_fields`
+backfill command.
+"""
+
+from copy import deepcopy
+from datetime import datetime, timezone
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from biocompute.models import Bco
+from biocompute.selectors import extract_search_fields, search_field_mismatches
+from tests.fixtures.testing_bcos import BCO_000001_DRAFT
+
+HOSTNAME = settings.PUBLIC_HOSTNAME
+
+class BcoSearchFieldsTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(username="tester"))
+
+    def fields(self, object_id: str) -> dict:
+        bco = Bco.objects.get(object_id=object_id)
+        return {
+            "name": bco.name,
+            "version": bco.version,
+            "created": bco.created,
+            "license": bco.license,
+            "keywords": sorted(bco.keywords.values_list("keyword", flat=True)),
+        }
+
+    def test_create_and_modify(self):
+        """Creating and modifying drafts sets their search fields.
+        """
+
+        object_id = f"{HOSTNAME}/TEST_000010/DRAFT"
+        contents = deepcopy(BCO_000001_DRAFT)
+        contents["object_id"] = object_id
+        contents["provenance_domain"].update({
+            "name": "Wombat burrow survey", "version": "2.0",
+            "created": "2024-03-01T12:00:00+01:00", "license": "CC0",
+        })
+        contents["description_domain"]["keywords"] = ["wombat", "burrow"]
+        response = self.client.post('/api/objects/drafts/create/', [{
+            "object_id": object_id,
+            "prefix": "TEST",
+            "contents": contents,
+        }], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.fields(object_id), {
+            "name": "Wombat burrow survey",
+            "version": "2.0",
+            "created": datetime(2024, 3, 1, 11, tzinfo=timezone.utc),
+            "license": "CC0",
+            "keywords": ["burrow", "wombat"],
+        })
+
+        contents["provenance_domain"]["name"] = "Wombat census"
+        contents["provenance_domain"]["created"] = "not a date"
+        contents["description_domain"]["keywords"] = ["wombat", "census"]
+        response = self.client.post('/api/objects/drafts/modify/', [{
+            "object_id": object_id, "contents": contents,
+        }], format='json')
+        self.assertEqual(response.status_code, 200)
+        fields = self.fields(object_id)
+        self.assertEqual(fields["name"], "Wombat census")
+        self.assertIsNone(fields["created"])
+        self.assertEqual(fields["keywords"], ["census", "wombat"])
+
+    def test_publish(self):
+        """Published BCOs have the search fields of their contents.
+        """
+
+        response = self.client.post('/api/objects/drafts/publish/', [{
+            "object_id": f"{HOSTNAME}/BCO_000001/DRAFT",
+            "published_object_id": f"{HOSTNAME}/BCO_000001/1.1",
+            "prefix": "BCO",
+        }], format='json')
+        self.assertEqual(response.status_code, 200)
+        published = Bco.objects.get(object_id=f"{HOSTNAME}/BCO_000001/1.1")
+        expected = extract_search_fields(published.contents)
+        expected["keywords"] = sorted(expected["keywords"])
+        self.assertEqual(self.fields(published.object_id), expected)
+        self.assertEqual(published.version, "1.1")
+
+    def test_backfill(self):
+        """`bco_search_fields --verify` reports stale search fields and
+        `bco_search_fields` backfills them in batches.
+        """
+
+        object_id = f"{HOSTNAME}/BCO_000001/DRAFT"
+        self.assertEqual(list(search_field_mismatches()), [])
+        Bco.objects.filter(object_id=object_id).update(name="", created=None)
+        Bco.objects.get(object_id=object_id).keywords.all().delete()
+        with self.assertRaises(CommandError):
+            call_command("bco_search_fields", "--verify", stdout=StringIO())
+        output = StringIO()
+        call_command("bco_search_fields", "--batch-size", "4", stdout=output)
+        self.assertIn("of 1 BCOs", output.getvalue())
+        self.assertEqual(
+            self.fields(object_id)["name"],
+            "HCV1a ledipasvir resistance SNP detection"
+        )
+        call_command("bco_search_fields", "--verify", stdout=StringIO())
+
+    def test_malformed_contents(self):
+        """Missing or malformed values are extracted as empty.
+        """
+
+        self.assertEqual(extract_search_fields([]), {
+            "name": "", "version": "", "license": "", "created": None,
+            "keywords": [],
+        })
+        fields = extract_search_fields({
+            "provenance_domain": {
+                "name": ["list"], "version": 1.5, "created": "2020-02-30",
+                "license": "x" * 300,
+            },
+            "description_domain": {"keywords": ["a", 1, "", "a", "b"]},
+        })
+        self.assertEqual(fields["version"], "1.5")
+        self.assertEqual(fields["name"], "")
+        self.assertIsNone(fields["created"])
+        self.assertEqual(len(fields["license"]), 255)
+        self.assertEqual(fields["keywords"], ["a", "b"])
+        self.assertEqual(
+            extract_search_fields({"provenance_domain": {
+                "created": "2020-02-03"
+            }})["created"],
+            datetime(2020, 2, 3, tzinfo=timezone.utc)
+        )
@@ -8,10 +8,24 @@ returns 207, 400, 403 (needs to be reviewed)
 
 
 import json
-from django.test import TestCase
-from django.contrib.auth.models import User
+from copy import deepcopy
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished, request_started
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth.models import AnonymousUser, User
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
+from biocompute.models import Bco
+from biocompute.selectors import (
+    bco_acl_mismatches,
+    retrieve_bco,
+    user_can_convert_bco,
+    user_can_modify_bco,
+    user_can_modify_bcos
+)
+from biocompute.services import BcoValidator, publish_draft
+from prefix.selectors import get_prefix_permissions
 from tests.fixtures.testing_bcos import NOPUB_000001_DRAFT, BCO_000000_DRAFT, BCO_000001_DRAFT
 
 class BcoDraftModifyTestCase(TestCase):
@@ -121,4 +135,263 @@ class BcoDraftModifyTestCase(TestCase):
         }
         self.client.credentials(HTTP_AUTHORIZATION='Token InvalidToken')
         response = self.client.post('/api/objects/drafts/modify/', data=data, format='json')
-        self.assertEqual(response.status_code, 403)
\ No newline at end of file
+        self.assertEqual(response.status_code, 403)
+
+    def test_without_spec_version(self):
+        """200: Invalid drafts are accepted, and contents without a
+        `spec_version` get an empty validity record.
+        """
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        data = deepcopy(self.data[:1])
+        del data[0]["contents"]["spec_version"]
+        object_id = data[0]["object_id"]
+        response = self.client.post(
+            '/api/objects/drafts/modify/', data, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Bco.objects.get(object_id=object_id).validity, {})
+
+    def test_unchanged_domains_not_revalidated(self):
+        """200: Modifications store a validity record with the draft, and
+        only the changed domains are revalidated.
+        """
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        data = deepcopy(self.data[:1])
+        object_id = data[0]["object_id"]
+        response = self.client.post(
+            '/api/objects/drafts/modify/', data, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        validity = Bco.objects.get(object_id=object_id).validity
+        self.assertIn("io_domain", validity["domains"])
+        self.assertIn("usability_domain", validity["domains"])
+
+        validity["domains"]["io_domain"]["errors"] = ["Trusted."]
+        usability = validity["domains"]["usability_domain"]
+        Bco.objects.filter(object_id=object_id).update(validity=validity)
+        data[0]["contents"]["usability_domain"] = ["Changed usability."]
+        response = self.client.post(
+            '/api/objects/drafts/modify/', data, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        validity = Bco.objects.get(object_id=object_id).validity
+        self.assertEqual(validity["domains"]["io_domain"]["errors"], ["Trusted."])
+        self.assertNotEqual(validity["domains"]["usability_domain"], usability)
+        self.assertFalse(validity["valid"])
+
+class BatchModifyPermissionTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def test_decisions(self):
+        """Authorized users, prefix permissions and missing BCOs.
+        """
+
+        host = "http://127.0.0.1:8000"
+        object_ids = [
+            f"{host}/BCO_000001/DRAFT",
+            f"{host}/NOPUB_000001/DRAFT",
+            f"{host}/BCO_000009/DRAFT",
+        ]
+        jdoe = User.objects.get(username="jdoe")
+        hivelab = User.objects.get(username="hivelab")
+        with self.assertNumQueries(4):
+            permissions = user_can_modify_bcos(object_ids, jdoe)
+        self.assertEqual(
+            permissions, dict(zip(object_ids, [True, False, None]))
+        )
+        self.assertTrue(
+            user_can_modify_bcos(object_ids, hivelab)[object_ids[1]]
+        )
+
+    def test_authorizations_shared_within_request(self):
+        """Authorized users are looked up once per request until they change.
+        """
+
+        object_id = "http://127.0.0.1:8000/NOPUB_000001/DRAFT"
+        jdoe = User.objects.get(username="jdoe")
+        request_started.send(sender=self.__class__)
+        try:
+            self.assertFalse(user_can_modify_bco(object_id, jdoe))
+            with self.assertNumQueries(1):
+                self.assertFalse(user_can_modify_bco(object_id, jdoe))
+            Bco.objects.get(object_id=object_id).authorized_users.add(jdoe)
+            self.assertTrue(user_can_modify_bco(object_id, jdoe))
+        finally:
+            request_finished.send(sender=self.__class__)
+
+class BcoAclTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(username="tester"))
+        self.object_id = "http://127.0.0.1:8000/NOPUB_000001/DRAFT"
+
+    def test_fixture_acl_up_to_date(self):
+        """The fixture BCOs have the access control list of their data.
+        """
+
+        self.assertEqual(list(bco_acl_mismatches()), [])
+
+    def test_modify_updates_acl(self):
+        """Modifying the authorized users updates `acl_users`.
+        """
+
+        jdoe = User.objects.get(username="jdoe")
+        self.assertFalse(retrieve_bco("NOPUB_000001", jdoe))
+        data = deepcopy(NOPUB_000001_DRAFT)
+        data["object_id"] = self.object_id
+        response = self.client.post('/api/objects/drafts/modify/', [{
+            "object_id": self.object_id,
+            "contents": data,
+            "authorized_users": ["jdoe"],
+        }], format='json')
+        self.assertEqual(response.status_code, 200)
+        bco = Bco.objects.get(object_id=self.object_id)
+        self.assertEqual(bco.acl_users, [jdoe.pk])
+        with self.assertNumQueries(1):
+            self.assertEqual(retrieve_bco("NOPUB_000001", jdoe), bco)
+        self.assertEqual(list(bco_acl_mismatches()), [])
+
+    def test_prefix_public_updates_acl(self):
+        """Making a prefix public updates `acl_public` of its BCOs.
+        """
+
+        bco_api_user = User.objects.get(username="bco_api_user")
+        self.client.force_authenticate(user=bco_api_user)
+        response = self.client.post('/api/prefixes/modify/', [{
+            "prefix": "NOPUB",
+            "description": "Test non-public prefix.",
+            "public": True,
+            "user_permissions": get_prefix_permissions("NOPUB"),
+        }], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Bco.objects.get(object_id=self.object_id).acl_public)
+        self.assertEqual(list(bco_acl_mismatches()), [])
+
+    def test_publish_private_draft(self):
+        """Users authorized on a private draft can not view its published
+        version, which starts without authorized users.
+        """
+
+        hivelab = User.objects.get(username="hivelab")
+        self.assertTrue(retrieve_bco("NOPUB_000001", hivelab))
+        published = publish_draft(
+            Bco.objects.get(object_id=self.object_id),
+            User.objects.get(username="tester"),
+            {
+                "object_id": self.object_id,
+                "published_object_id": "http://127.0.0.1:8000/NOPUB_000001/1.21",
+            }
+        )
+        self.assertEqual(published.acl_users, [])
+        self.assertFalse(retrieve_bco("NOPUB_000001", hivelab, "1.21"))
+        self.assertTrue(retrieve_bco(
+            "NOPUB_000001", User.objects.get(username="tester"), "1.21"
+        ))
+        self.assertEqual(list(bco_acl_mismatches()), [])
+
+    def test_rebuild_and_verify(self):
+        """`bco_acl --verify` fails on a stale list, `bco_acl` rebuilds it.
+        """
+
+        Bco.objects.filter(object_id=self.object_id).update(
+            acl_public=True, acl_users=[]
+        )
+        with self.assertRaises(CommandError):
+            call_command("bco_acl", "--verify", stdout=StringIO())
+        out = StringIO()
+        call_command("bco_acl", "--batch-size", "4", stdout=out)
+        self.assertIn("1 BCOs", out.getvalue())
+        bco = Bco.objects.get(object_id=self.object_id)
+        self.assertEqual((bco.acl_public, bco.acl_users), (False, [5]))
+        call_command("bco_acl", "--verify", stdout=StringIO())
+
+    def test_convert_to_ldh(self):
+        """LDH conversion follows the owner and the access control list.
+        """
+
+        self.assertTrue(user_can_convert_bco(
+            self.object_id, User.objects.get(username="tester")
+        ))
+        self.assertTrue(user_can_convert_bco(
+            self.object_id, User.objects.get(username="hivelab")
+        ))
+        self.assertFalse(user_can_convert_bco(
+            self.object_id, User.objects.get(username="jdoe")
+        ))
+        self.assertFalse(user_can_convert_bco(self.object_id, AnonymousUser()))
+        response = self.client.get(
+            '/api/objects/convert_to_ldh/',
+            {"object_id": "http://127.0.0.1:8000/BCO_000000/1.0"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        client = APIClient()
+        response = client.get(
+            '/api/objects/convert_to_ldh/', {"object_id": self.object_id}
+        )
+        self.assertEqual(response.status_code, 404)
+        token = Token.objects.get(user__username="hivelab")
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        response = client.get(
+            '/api/objects/convert_to_ldh/', {"object_id": self.object_id}
+        )
+        self.assertEqual(response.status_code, 200)
+
+class IncrementalValidationTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.validator = BcoValidator()
+        _, self.validity = self.validator.validate_incremental(BCO_000000_DRAFT)
+
+    def test_only_changed_domains_revalidated(self):
+        """Unchanged domains are trusted from the validity record.
+        """
+
+        bco = deepcopy(BCO_000000_DRAFT)
+        bco["io_domain"] = {"input_subdomain": "not a list"}
+        results, validity = self.validator.validate_incremental(
+            bco, self.validity
+        )
+        _, results = results.popitem()
+        self.assertEqual(results["revalidated"], ["io_domain"])
+        self.assertFalse(validity["valid"])
+        self.assertEqual(
+            sorted(results["error_detail"]),
+            sorted(self.validator.parse_and_validate(bco)[
+                bco["object_id"]]["error_detail"])
+        )
+
+    def test_stops_at_max_errors(self):
+        """Validation stops at `max_errors`, leaving out the domains whose
+        errors may have been cut short.
+        """
+
+        bco = deepcopy(BCO_000000_DRAFT)
+        bco["io_domain"] = {"input_subdomain": "x", "output_subdomain": "y"}
+        bco["usability_domain"] = "not a list"
+        results, validity = self.validator.validate_incremental(
+            bco, self.validity, max_errors=1
+        )
+        _, results = results.popitem()
+        self.assertEqual(results["number_of_errors"], 1)
+        self.assertTrue(results["truncated"])
+        self.assertEqual(len(results["revalidated"]), 1)
+        self.assertNotIn(results["revalidated"][0], validity["domains"])
+        self.assertFalse(validity["valid"])
+
+    def test_stale_record_is_ignored(self):
+        """A record built against other schema files revalidates everything.
+        """
+
+        stale = dict(self.validity, fingerprint="stale")
+        results, _ = self.validator.validate_incremental(
+            BCO_000000_DRAFT, stale
+        )
+        _, results = results.popitem()
+        self.assertEqual(
+            sorted(results["revalidated"]), sorted(self.validity["domains"])
+        )
@@ -26,6 +26,8 @@ from django.test import TestCase
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
+from biocompute.models import Bco
+from biocompute.selectors import user_can_publish_drafts
 
 class BcoDraftPublishTestCase(TestCase):
     fixtures = ['tests/fixtures/test_data']
@@ -92,3 +94,105 @@ class BcoDraftPublishTestCase(TestCase):
         response = self.client.post('/api/objects/drafts/publish/', data=data, format='json')
         self.assertEqual(response.status_code, 207)
 
+    def test_same_draft_twice(self):
+        """207: A draft published earlier in the request is a conflict.
+        """
+
+        data = [{"object_id": "http://127.0.0.1:8000/BCO_000001/DRAFT"}] * 2
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        response = self.client.post(
+            '/api/objects/drafts/publish/?mode=full', data=data, format='json'
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data[0]["status_code"], 200)
+        self.assertEqual(response.data[1]["status_code"], 409)
+
+    def test_validity_record(self):
+        """400: A failed publish stores a validity record on the draft, and
+        the next attempt trusts the domains that have not changed.
+        """
+
+        object_id = "http://127.0.0.1:8000/BCO_000001/DRAFT"
+        draft = Bco.objects.get(object_id=object_id)
+        io_domain = draft.contents["io_domain"]
+        draft.contents["io_domain"] = {"input_subdomain": "not a list"}
+        draft.save()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        data = [{"object_id": object_id}]
+        response = self.client.post(
+            '/api/objects/drafts/publish/?mode=full', data, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        validity = Bco.objects.get(object_id=object_id).validity
+        self.assertFalse(validity["valid"])
+        self.assertNotEqual(validity["domains"]["io_domain"]["errors"], [])
+
+        draft = Bco.objects.get(object_id=object_id)
+        draft.contents["io_domain"] = io_domain
+        draft.validity["domains"]["usability_domain"]["errors"] = ["Trusted."]
+        draft.save()
+        response = self.client.post(
+            '/api/objects/drafts/publish/?mode=full', data, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0]["data"]["error_detail"], ["Trusted."])
+
+        del draft.contents["spec_version"]
+        draft.save()
+        response = self.client.post(
+            '/api/objects/drafts/publish/', data, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+class BatchPublishPermissionTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def test_decisions(self):
+        """Each object gets the `user_can_publish_draft` decision.
+        """
+
+        host = "http://127.0.0.1:8000"
+        user = User.objects.get(username="tester")
+        decisions = user_can_publish_drafts([
+            {
+                "object_id": f"{host}/BCO_000001/DRAFT",
+                "published_object_id": f"{host}/BCO_000001/1.1",
+            },
+            {
+                "object_id": f"{host}/BCO_000001/DRAFT",
+                "published_object_id": f"{host}/BCO_000001/1.0",
+            },
+            {"object_id": f"{host}/TEST_000002/DRAFT"},
+            {"object_id": f"{host}/NOPUB_000001/DRAFT"},
+            {"object_id": f"{host}/BCO_000009/DRAFT"},
+            {
+                "object_id": f"{host}/BCO_000002/DRAFT",
+                "published_object_id": f"{host}/BCO_000003/1.21",
+            },
+            {
+                "object_id": f"{host}/BCO_000002/DRAFT",
+                "published_object_id": f"{host}/BCO_000002/2.0",
+            },
+        ], user)
+        self.assertEqual(decisions[0].object_id, f"{host}/BCO_000001/DRAFT")
+        self.assertEqual(decisions[1].object_id, f"{host}/BCO_000001/1.0")
+        self.assertEqual(decisions[2].object_id, f"{host}/TEST_000002/DRAFT")
+        self.assertEqual(decisions[3].object_id, f"{host}/NOPUB_000001/DRAFT")
+        self.assertIsNone(decisions[4])
+        self.assertEqual(decisions[5], ("BCO_000003", "BCO_000002"))
+        self.assertIsInstance(decisions[6], str)
+
+    def test_constant_queries(self):
+        """The number of queries does not grow with the number of objects.
+        """
+
+        user = User.objects.get(username="hivelab")
+        objects = [
+            {"object_id": object_id} for object_id in Bco.objects.filter(
+                state="DRAFT"
+            ).values_list("object_id", flat=True)
+        ]
+        with self.assertNumQueries(4):
+            user_can_publish_drafts(objects[:2], user)
+        with self.assertNumQueries(4):
+            user_can_publish_drafts(objects, user)
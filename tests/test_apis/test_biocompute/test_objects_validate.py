@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+
+"""Objects/Validate
+Tests for 'All BCO validations are successful. 200' and 'Some or all BCO
+validations failed. 207', and for the process-wide `schema_registry` that
+serves the schemas used by `BcoValidator`.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from biocompute.schemas import (
+    ExtensionSchemaResolver,
+    SchemaRegistry,
+    schema_registry,
+    IEEE_2791_URI
+)
+from biocompute.services import (
+    BcoValidator,
+    ValidationResultCache,
+    validate_bco,
+    validate_bco_batch,
+    validation_cache,
+    validation_error_format,
+    validation_error_limit
+)
+from tests.fixtures.testing_bcos import BCO_000000_DRAFT, BCO_000001_DRAFT
+
+class ValidateBcoTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_successful_validation(self):
+        """200: All BCO validations are successful.
+        """
+
+        data = [BCO_000000_DRAFT, BCO_000001_DRAFT]
+        response = self.client.post('/api/objects/validate/', data=data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    def test_partial_failure(self):
+        """207: Some BCO validations failed.
+        """
+
+        bad_bco = deepcopy(BCO_000001_DRAFT)
+        del bad_bco["provenance_domain"]
+        data = [BCO_000000_DRAFT, bad_bco]
+        response = self.client.post('/api/objects/validate/', data=data, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data[1]["request_status"], "FAILED")
+
+    def test_fast_mode(self):
+        """`?mode=fast` stops at the first error and flags the truncation.
+        """
+
+        bad_bco = deepcopy(BCO_000001_DRAFT)
+        del bad_bco["provenance_domain"]
+        del bad_bco["io_domain"]
+        response = self.client.post(
+            '/api/objects/validate/?mode=fast', data=[bad_bco], format='json'
+        )
+        self.assertEqual(response.status_code, 207)
+        results = response.data[0]["data"]
+        self.assertEqual(results["number_of_errors"], 1)
+        self.assertTrue(results["truncated"])
+
+    def test_max_errors(self):
+        """`?max_errors=N` caps the number of reported errors.
+        """
+
+        bad_bco = deepcopy(BCO_000001_DRAFT)
+        for domain in ["provenance_domain", "io_domain", "execution_domain"]:
+            del bad_bco[domain]
+        response = self.client.post(
+            '/api/objects/validate/?max_errors=2', data=[bad_bco], format='json'
+        )
+        results = response.data[0]["data"]
+        self.assertEqual(results["number_of_errors"], 2)
+
+    def test_bad_mode(self):
+        """400: An unknown mode or a non-positive limit is rejected.
+        """
+
+        for query in ["mode=bogus", "max_errors=0", "max_errors=x"]:
+            response = self.client.post(
+                f'/api/objects/validate/?{query}',
+                data=[BCO_000000_DRAFT], format='json'
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_structured_errors(self):
+        """`?errors=structured` reports errors as objects with pointers.
+        """
+
+        bad_bco = deepcopy(BCO_000001_DRAFT)
+        del bad_bco["provenance_domain"]
+        bad_bco["description_domain"]["keywords"] = "not a list"
+        response = self.client.post(
+            '/api/objects/validate/?errors=structured',
+            data=[bad_bco], format='json'
+        )
+        self.assertEqual(response.status_code, 207)
+        errors = response.data[0]["data"]["error_detail"]
+        self.assertIn({
+            "pointer": "",
+            "keyword": "required",
+            "schema_path": "/required",
+            "params": {"property": "provenance_domain"},
+        }, errors)
+        self.assertIn({
+            "pointer": "/description_domain/keywords",
+            "keyword": "type",
+            "schema_path": "/properties/description_domain/properties/"\
+                + "keywords/type",
+            "value": "not a list",
+        }, errors)
+
+    def test_bad_error_format(self):
+        """400: An unknown error format is rejected.
+        """
+
+        response = self.client.post(
+            '/api/objects/validate/?errors=xml',
+            data=[BCO_000000_DRAFT], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+class ValidationModeTestCase(SimpleTestCase):
+
+    def test_error_limit(self):
+        """`max_errors` wins over `mode`; modes map to their limits.
+        """
+
+        self.assertIsNone(validation_error_limit())
+        self.assertIsNone(validation_error_limit("full"))
+        self.assertEqual(validation_error_limit("fast"), 1)
+        self.assertEqual(validation_error_limit("fast", "5"), 5)
+        with self.assertRaises(ValueError):
+            validation_error_limit("slow")
+
+    def test_error_format(self):
+        """Error formats default to "legacy"; unknown formats are rejected.
+        """
+
+        self.assertEqual(validation_error_format(), "legacy")
+        self.assertEqual(validation_error_format("structured"), "structured")
+        with self.assertRaises(ValueError):
+            validation_error_format("xml")
+
+    def test_structured_extension_errors(self):
+        """Structured extension errors point into the BCO and name the schema.
+        """
+
+        bco = deepcopy(BCO_000001_DRAFT)
+        extension = bco["extension_domain"][0]
+        del extension[next(
+            key for key in extension if key != "extension_schema"
+        )]
+        _, legacy = validate_bco(bco).popitem()
+        _, results = validate_bco(bco, error_format="structured").popitem()
+        self.assertEqual(
+            results["number_of_errors"], legacy["number_of_errors"]
+        )
+        error = results["error_detail"][0]
+        self.assertEqual(error["pointer"], "/extension_domain/0")
+        self.assertEqual(error["schema"], extension["extension_schema"])
+
+    def test_limited_results_are_cached_apart(self):
+        """Full and limited results for one BCO do not share a cache entry.
+        """
+
+        bad_bco = deepcopy(BCO_000001_DRAFT)
+        del bad_bco["provenance_domain"]
+        del bad_bco["io_domain"]
+        _, fast = validate_bco(bad_bco, max_errors=1).popitem()
+        _, full = validate_bco(bad_bco).popitem()
+        self.assertEqual(fast["number_of_errors"], 1)
+        self.assertGreater(full["number_of_errors"], 1)
+        self.assertNotIn("truncated", full)
+
+class BulkValidationTestCase(SimpleTestCase):
+
+    def test_parallel_matches_serial(self):
+        """Pool validation returns the serial results in input order.
+        """
+
+        bad_bco = deepcopy(BCO_000001_DRAFT)
+        del bad_bco["provenance_domain"]
+        batch = [BCO_000000_DRAFT, bad_bco, BCO_000001_DRAFT] * 12
+        serial = validate_bco_batch(batch, workers=0)
+        parallel = validate_bco_batch(batch, workers=2)
+        self.assertEqual(parallel, serial)
+
+class ValidationResultCacheTestCase(SimpleTestCase):
+
+    def test_repeat_submission_is_cached(self):
+        """A resubmitted BCO is answered from the shared cache.
+        """
+
+        bco = deepcopy(BCO_000001_DRAFT)
+        bco["usability_domain"].append("Cache test")
+        first = validate_bco(bco)
+        hits = validation_cache.hits
+        second = validate_bco(bco)
+        self.assertEqual(first, second)
+        self.assertEqual(validation_cache.hits, hits + 1)
+        self.assertEqual(validate_bco_batch([bco], workers=0), [first])
+        self.assertEqual(validation_cache.hits, hits + 2)
+
+    def test_key_is_canonical(self):
+        """Key order does not change the cache key.
+        """
+
+        reordered = dict(reversed(list(BCO_000000_DRAFT.items())))
+        self.assertEqual(
+            ValidationResultCache.make_key(BCO_000000_DRAFT),
+            ValidationResultCache.make_key(reordered)
+        )
+
+    def test_lru_byte_budget(self):
+        """Least recently used entries are evicted past the byte budget.
+        """
+
+        cache = ValidationResultCache(max_bytes=50)
+        cache.set("a", {"a": "x" * 10})
+        cache.set("b", {"b": "x" * 10})
+        cache.get("a")
+        cache.set("c", {"c": "x" * 10})
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertLessEqual(cache.size, 50)
+
+    def test_cleared_on_registry_reload(self):
+        """Reloading the schema registry invalidates cached results.
+        """
+
+        validate_bco(BCO_000000_DRAFT)
+        schema_registry.reload()
+        self.assertEqual(validation_cache.stats()["entries"], 0)
+
+class SchemaRegistryTestCase(SimpleTestCase):
+
+    def test_validators_are_compiled_once(self):
+        """A schema URI compiles one validator that is reused after that.
+        """
+
+        registry = SchemaRegistry()
+        first = registry.get_validator(IEEE_2791_URI)
+        second = registry.get_validator(IEEE_2791_URI)
+        self.assertIs(first, second)
+        self.assertEqual(registry.misses, 1)
+        self.assertEqual(registry.hits, 1)
+
+    def test_extension_aliases(self):
+        """GitHub and w3id extension URIs resolve to the same local schema.
+        """
+
+        registry = SchemaRegistry()
+        github = registry.get_validator(
+            "https://raw.githubusercontent.com/biocompute-objects/"\
+            + "extension_domain/1.2.0/dataset/dataset_extension.json"
+        )
+        w3id = registry.get_validator(
+            "http://www.w3id.org/biocompute/extension_domain/1.2.0/"\
+            + "dataset/dataset_extension.json"
+        )
+        self.assertIs(github, w3id)
+        self.assertIsNone(registry.get_validator("https://example.org/x.json"))
+
+    def test_reload(self):
+        """Reloading drops compiled validators and notifies callbacks.
+        """
+
+        registry = SchemaRegistry()
+        reloaded = []
+        registry.on_reload(reloaded.append)
+        first = registry.get_validator(IEEE_2791_URI)
+        version = registry.version
+        registry.reload()
+        self.assertEqual(reloaded, [registry])
+        self.assertEqual(registry.version, version + 1)
+        self.assertIsNot(first, registry.get_validator(IEEE_2791_URI))
+
+    def test_validator_uses_registry(self):
+        """`BcoValidator` reads its schemas from the shared registry.
+        """
+
+        BcoValidator().parse_and_validate(BCO_000000_DRAFT)
+        self.assertIs(
+            BcoValidator().get_validator(IEEE_2791_URI),
+            schema_registry.get_validator(IEEE_2791_URI)
+        )
+
+EXTENSION_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "required": ["extension_schema", "lab"],
+    "properties": {"lab": {"type": "string"}}
+}
+
+class SchemaHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a remote extension schema host."""
+
+    requests_seen = []
+    down = False
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        if self.down:
+            self.send_error(503)
+            return
+        if self.path.split("?")[0] != "/lab_extension.json":
+            self.send_error(404)
+            return
+        body = json.dumps(EXTENSION_SCHEMA).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class ExtensionSchemaResolverTestCase(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), SchemaHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        SchemaHandler.requests_seen.clear()
+        SchemaHandler.down = False
+        self.cache_dir = tempfile.mkdtemp()
+        self.uri = f"{self.base_url}/lab_extension.json"
+
+    def test_remote_schema_fetched_once(self):
+        """A remote schema is fetched once and then validates locally.
+        """
+
+        resolver = ExtensionSchemaResolver(cache_dir=self.cache_dir, timeout=2)
+        validator = BcoValidator(resolver=resolver)
+        extension = {"extension_schema": self.uri}
+        bco = deepcopy(BCO_000000_DRAFT)
+        bco["extension_domain"] = [extension, extension]
+        identifier, results = validator.parse_and_validate(bco).popitem()
+        self.assertEqual(results["number_of_errors"], 2)
+        validator.parse_and_validate(bco)
+        self.assertEqual(SchemaHandler.requests_seen, ["/lab_extension.json"])
+
+    def test_offline_from_cache_dir(self):
+        """An offline resolver is served from the on-disk cache.
+        """
+
+        ExtensionSchemaResolver(
+            cache_dir=self.cache_dir, cache_hosts=["127.0.0.1"]
+        ).get_schema(self.uri)
+        offline = ExtensionSchemaResolver(
+            cache_dir=self.cache_dir, offline=True, cache_hosts=["127.0.0.1"]
+        )
+        self.assertIsNotNone(offline.get_validator(self.uri))
+        self.assertEqual(offline.fetches, 0)
+        self.assertEqual(len(SchemaHandler.requests_seen), 1)
+
+    def test_negative_cache(self):
+        """Failed URIs are not retried until their entry expires.
+        """
+
+        missing = f"{self.base_url}/missing_extension.json"
+        resolver = ExtensionSchemaResolver(
+            cache_dir=self.cache_dir, negative_ttl=60
+        )
+        self.assertIsNone(resolver.get_validator(missing))
+        self.assertIsNone(resolver.get_validator(missing))
+        self.assertEqual(resolver.fetches, 1)
+        self.assertIsNotNone(resolver.failure_reason(missing))
+
+        expired = ExtensionSchemaResolver(
+            cache_dir=self.cache_dir, negative_ttl=0
+        )
+        expired.get_validator(missing)
+        expired.get_validator(missing)
+        self.assertEqual(expired.fetches, 2)
+
+    def test_bounded_caches(self):
+        """Only trusted hosts are kept on disk and the in-memory caches keep
+        the most recently used URIs.
+        """
+
+        resolver = ExtensionSchemaResolver(
+            cache_dir=self.cache_dir, max_entries=2
+        )
+        uris = [f"{self.uri}?n={number}" for number in range(3)]
+        for uri in uris + [f"{self.base_url}/missing_extension.json"]:
+            resolver.get_validator(uri)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+        self.assertEqual(len(resolver._documents), 2)
+        self.assertEqual(len(resolver._validators), 2)
+        self.assertIsNotNone(resolver.get_validator(uris[2]))
+        self.assertEqual(resolver.fetches, 4)
+        resolver.get_validator(uris[0])
+        self.assertEqual(resolver.fetches, 5)
+
+    def test_local_files(self):
+        """`file://` URIs are rejected, or fail as schema errors when local
+        files are allowed.
+        """
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as local:
+            local.write("not json")
+            local.flush()
+            uri = f"file://{local.name}"
+            schema = BcoValidator.load_schema(
+                uri, resolver=ExtensionSchemaResolver(cache_dir=None)
+            )
+            self.assertEqual(schema, {uri: [
+                "Failed to load schema. Local schema files are not allowed."
+            ]})
+            resolver = ExtensionSchemaResolver(cache_dir=None, local_files=True)
+            for uri, reason in [
+                (uri, "JSON Decode Error."),
+                ("file:///nonexistent.json", "No such file or directory."),
+            ]:
+                schema = BcoValidator.load_schema(uri, resolver=resolver)
+                self.assertEqual(
+                    schema, {uri: [f"Failed to load schema. {reason}"]}
+                )
+
+        bco = deepcopy(BCO_000000_DRAFT)
+        bco["extension_domain"] = [{"extension_schema": "file:///etc/hostname"}]
+        identifier, results = BcoValidator().parse_and_validate(bco).popitem()
+        self.assertEqual(results["number_of_errors"], 0)
+
+    def test_unresolved_results_not_cached(self):
+        """Results of a BCO whose extension schema could not be fetched are
+        not cached, so it is validated again once the schema loads.
+        """
+
+        resolver = ExtensionSchemaResolver(cache_dir=None, negative_ttl=0)
+        validator = BcoValidator(resolver=resolver)
+        bco = deepcopy(BCO_000000_DRAFT)
+        bco["object_id"] = f"{self.base_url}/UNRESOLVED_000001/1.0"
+        bco["extension_domain"] = [{"extension_schema": self.uri}]
+        SchemaHandler.down = True
+        _, results = validate_bco(bco, validator).popitem()
+        self.assertEqual(results["number_of_errors"], 0)
+        self.assertEqual(validator.unresolved, {self.uri})
+        SchemaHandler.down = False
+        _, results = validate_bco(bco, validator).popitem()
+        self.assertEqual(results["number_of_errors"], 1)
+        self.assertEqual(validator.unresolved, set())
+        self.assertEqual(resolver.fetches, 2)
+
+    def test_load_schema_error(self):
+        """`load_schema` reports an unreachable schema as an error entry.
+        """
+
+        resolver = ExtensionSchemaResolver(cache_dir=self.cache_dir, offline=True)
+        schema = BcoValidator.load_schema(self.uri, resolver=resolver)
+        self.assertIn(self.uri, schema)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+"""Objects/Validate/Metrics
+Tests for the validation telemetry, the admin-only metrics endpoint and the
+`validation_profile` management command.
+"""
+
+import json
+from copy import deepcopy
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from biocompute.services import BcoValidator
+from biocompute.telemetry import (
+    OTHER_SCHEMAS,
+    ValidationTelemetry,
+    validation_telemetry
+)
+from tests.fixtures.testing_bcos import BCO_000000_DRAFT, BCO_000001_DRAFT
+
+class ValidationTimingsTestCase(SimpleTestCase):
+
+    def test_phases_and_keywords(self):
+        """Each phase, schema and error keyword is recorded per BCO.
+        """
+
+        bad_bco = deepcopy(BCO_000001_DRAFT)
+        del bad_bco["io_domain"]
+        bad_bco["etag"] = 1
+        validator = BcoValidator()
+        validator.parse_and_validate(BCO_000000_DRAFT)
+        validator.parse_and_validate(bad_bco)
+
+        timings = validator.timings
+        self.assertEqual(timings.objects, 2)
+        self.assertTrue({"load", "base", "score"} <= set(timings.phases))
+        self.assertIn(BCO_000000_DRAFT["spec_version"], timings.schemas)
+        self.assertEqual(timings.error_keywords["required"], 1)
+        self.assertEqual(timings.error_keywords["type"], 1)
+
+    def test_telemetry_totals(self):
+        """The process totals keep the count, total and longest time.
+        """
+
+        telemetry = ValidationTelemetry()
+        validator = BcoValidator()
+        validator.parse_and_validate(BCO_000000_DRAFT)
+        telemetry.record(validator.timings)
+        telemetry.record(validator.timings)
+        stats = telemetry.stats(top=1)
+        self.assertEqual(stats["objects"], 2)
+        self.assertEqual(stats["phases"]["base"]["count"], 2)
+        self.assertLessEqual(len(stats["schemas"]), 1)
+        telemetry.reset()
+        self.assertEqual(telemetry.stats()["objects"], 0)
+
+    def test_other_schemas(self):
+        """Schema URIs that are not shipped are counted together.
+        """
+
+        telemetry = ValidationTelemetry()
+        validator = BcoValidator()
+        bco = deepcopy(BCO_000000_DRAFT)
+        bco["extension_domain"] = [
+            {"extension_schema": f"http://127.0.0.1:9/{number}.json"}
+            for number in range(5)
+        ]
+        validator.parse_and_validate(bco)
+        telemetry.record(validator.timings)
+        self.assertEqual(
+            set(telemetry.stats()["schemas"]),
+            {BCO_000000_DRAFT["spec_version"], OTHER_SCHEMAS}
+        )
+        self.assertEqual(
+            telemetry.stats()["schemas"][OTHER_SCHEMAS]["count"], 1
+        )
+
+class ValidationMetricsTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_admin_metrics(self):
+        """200: Admin users can read the worker's validation metrics.
+        """
+
+        validation_telemetry.reset()
+        self.client.post(
+            '/api/objects/validate/', data=[BCO_000000_DRAFT], format='json'
+        )
+        self.client.force_authenticate(
+            user=User.objects.get(username="bco_api_user")
+        )
+        response = self.client.get('/api/objects/validate/metrics/?top=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("schema_registry", response.data)
+        self.assertIn("validation_cache", response.data)
+        self.assertIn("phases", response.data["telemetry"])
+
+    def test_forbidden(self):
+        """403: Other users can not read the metrics.
+        """
+
+        self.client.force_authenticate(user=User.objects.get(username="tester"))
+        response = self.client.get('/api/objects/validate/metrics/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_validation_profile_command(self):
+        """`validation_profile` validates stored BCOs and reports timings.
+        """
+
+        out = StringIO()
+        call_command("validation_profile", "--json", "--top", "3", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertGreater(report["objects"], 0)
+        self.assertIn("base", report["phases"])
+        self.assertLessEqual(len(report["schemas"]), 3)
+
+        out = StringIO()
+        call_command("validation_profile", "--state", "DRAFT", stdout=out)
+        self.assertIn("Validated", out.getvalue())
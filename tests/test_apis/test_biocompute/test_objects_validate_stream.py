@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""Objects/Validate/Stream
+Tests for the streaming validation endpoint. Each BCO in a JSON array or
+NDJSON request body gets its own result, streamed back in input order.
+"""
+
+import io
+import json
+from copy import deepcopy
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from biocompute.services import iter_bco_stream
+from tests.fixtures.testing_bcos import BCO_000000_DRAFT, BCO_000001_DRAFT
+
+class ValidateBcoStreamTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.bad_bco = deepcopy(BCO_000001_DRAFT)
+        del self.bad_bco["provenance_domain"]
+
+    def test_ndjson(self):
+        """NDJSON in, one NDJSON result line per BCO out.
+        """
+
+        body = "\n".join(
+            json.dumps(bco) for bco in [BCO_000000_DRAFT, self.bad_bco]
+        )
+        response = self.client.post(
+            '/api/objects/validate/stream/',
+            data=body,
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        results = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [result["request_status"] for result in results],
+            ["SUCCESS", "FAILED"]
+        )
+
+    def test_json_array(self):
+        """A JSON array in, a JSON array of results out.
+        """
+
+        response = self.client.post(
+            '/api/objects/validate/stream/',
+            data=json.dumps([BCO_000000_DRAFT, BCO_000001_DRAFT]),
+            content_type='application/json'
+        )
+        results = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[1]["identifier"], BCO_000001_DRAFT["object_id"])
+
+    def test_malformed_body(self):
+        """A malformed body ends the stream with a BAD REQUEST result.
+        """
+
+        body = json.dumps([BCO_000000_DRAFT])[:-40]
+        response = self.client.post(
+            '/api/objects/validate/stream/',
+            data=body,
+            content_type='application/json'
+        )
+        results = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(results[-1]["request_status"], "BAD REQUEST")
+
+class IterBcoStreamTestCase(SimpleTestCase):
+
+    def test_chunk_boundaries(self):
+        """Objects split across tiny chunks, escapes and brackets in strings.
+        """
+
+        bcos = [
+            {"object_id": "a", "text": "brace } and [ \"quoted\" \\", "n": [1, {}]},
+            {"object_id": "b", "text": "café ☃"},
+        ]
+        body = json.dumps(bcos, ensure_ascii=False).encode("utf-8")
+        for chunk_size in [1, 2, 3, 7, 64]:
+            parsed = list(iter_bco_stream(io.BytesIO(body), chunk_size))
+            self.assertEqual(parsed, bcos)
+            ndjson = "\n".join(json.dumps(bco) for bco in bcos).encode()
+            parsed = list(iter_bco_stream(io.BytesIO(ndjson), chunk_size))
+            self.assertEqual(parsed, bcos)
+
+    def test_empty_and_invalid(self):
+        """Empty bodies yield nothing; non-object items are rejected.
+        """
+
+        self.assertEqual(list(iter_bco_stream(io.BytesIO(b" [ ] "))), [])
+        self.assertEqual(list(iter_bco_stream(io.BytesIO(b""))), [])
+        with self.assertRaises(ValueError):
+            list(iter_bco_stream(io.BytesIO(b"[1, 2]")))
+        with self.assertRaises(ValueError):
+            list(iter_bco_stream(io.BytesIO(b'[{"a": 1} {"b": 2}]')))
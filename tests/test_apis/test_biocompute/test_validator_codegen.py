@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+"""Generated Validators
+Conformance tests for `biocompute.codegen.GeneratedValidator` against the
+`jsonschema` errors for the shipped schemas, on the BCO fixtures and on
+seeded random mutations of them.
+"""
+
+import json
+import random
+import jsonschema
+from copy import deepcopy
+from django.test import SimpleTestCase
+from biocompute.codegen import CodegenError, GeneratedValidator
+from biocompute.schemas import (
+    ExtensionSchemaResolver,
+    SchemaRegistry,
+    schema_registry,
+    IEEE_2791_URI
+)
+from biocompute.services import BcoValidator, jsonschema_details
+
+MUTATION_VALUES = [
+    None, 0, 1, True, False, 1.5, 2.0, "", "x", "not a uri", [], [1], {},
+    {"a": 1}
+]
+
+def load_fixture_bcos() -> list:
+    with open("tests/fixtures/bco_dump.json", "r", encoding="utf-8") as dump:
+        return [row["fields"]["contents"] for row in json.load(dump)]
+
+def mutate(instance, rng: random.Random):
+    """Returns a copy of a JSON value with a few random edits."""
+
+    instance = deepcopy(instance)
+    for _ in range(rng.randint(1, 6)):
+        parent, key, node = None, None, instance
+        for _ in range(rng.randint(1, 6)):
+            if isinstance(node, dict) and node:
+                key = rng.choice(list(node))
+            elif isinstance(node, list) and node:
+                key = rng.randrange(len(node))
+            else:
+                break
+            parent, node = node, node[key]
+        if parent is None:
+            continue
+        edit = rng.random()
+        if edit < 0.4:
+            parent[key] = deepcopy(rng.choice(MUTATION_VALUES))
+        elif edit < 0.6 and isinstance(parent, dict):
+            del parent[key]
+        elif edit < 0.8 and isinstance(parent, dict):
+            parent[rng.choice(["extra", "a b"])] = rng.choice(MUTATION_VALUES)
+        elif isinstance(parent, list):
+            parent.append(deepcopy(rng.choice(parent)))
+    return instance
+
+def jsonschema_errors(schema, instance) -> list:
+    validator = jsonschema.Draft7Validator(schema)
+    return [
+        (tuple(error.path), error.validator, error.message)
+        for error in validator.iter_errors(instance)
+    ]
+
+def structured(details: list) -> list:
+    return [
+        (detail.path, detail.keyword, detail.schema_path, detail.params,
+            detail.message)
+        for detail in details
+    ]
+
+class GeneratedValidatorConformanceTestCase(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.bcos = load_fixture_bcos()
+        cls.extensions = {}
+        for bco in cls.bcos:
+            for extension in bco.get("extension_domain", []):
+                cls.extensions.setdefault(
+                    extension["extension_schema"], []
+                ).append(extension)
+
+    def assertConforms(self, schema_uri: str, instances: list, seed: int):
+        schema = schema_registry.get_schema(schema_uri)
+        generated = GeneratedValidator(schema)
+        rng = random.Random(seed)
+        cases = list(instances)\
+            + [mutate(rng.choice(instances), rng) for _ in range(200)]
+        for instance in cases:
+            expected = jsonschema_errors(schema, instance)
+            self.assertEqual(generated.errors(instance), expected)
+            self.assertEqual(generated.errors(instance, 2), expected[:2])
+            self.assertEqual(generated.is_valid(instance), not expected)
+            self.assertEqual(
+                structured(generated.details(instance)),
+                structured(jsonschema_details(
+                    jsonschema.Draft7Validator(schema), instance
+                ))
+            )
+
+    def test_ieee_2791(self):
+        """The 2791 object schema reports the `jsonschema` errors.
+        """
+
+        self.assertConforms(IEEE_2791_URI, self.bcos, seed=2791)
+
+    def test_extensions(self):
+        """Extension schemas report the `jsonschema` errors.
+        """
+
+        self.assertTrue(self.extensions)
+        for seed, (uri, extensions) in enumerate(self.extensions.items()):
+            with self.subTest(uri=uri):
+                self.assertConforms(uri, extensions, seed=seed)
+
+    def test_all_shipped_schemas_generate(self):
+        """Every schema in `config/schemas/` is supported by the generator.
+        """
+
+        for uri in schema_registry.uris():
+            with self.subTest(uri=uri):
+                GeneratedValidator(schema_registry.get_schema(uri))
+
+    def test_unsupported_keyword(self):
+        """Keywords outside the generated subset raise `CodegenError`.
+        """
+
+        with self.assertRaises(CodegenError):
+            GeneratedValidator({"type": "array", "minItems": 1})
+
+class CodegenRegistryTestCase(SimpleTestCase):
+
+    def test_validator_results_match(self):
+        """`BcoValidator` results are the same with generated validators.
+        """
+
+        registry = SchemaRegistry(codegen=True)
+        self.assertIsInstance(
+            registry.get_validator(IEEE_2791_URI), GeneratedValidator
+        )
+        generated = BcoValidator(
+            resolver=ExtensionSchemaResolver(registry=registry)
+        )
+        interpreted = BcoValidator()
+        rng = random.Random(7)
+        for bco in load_fixture_bcos():
+            broken = mutate(bco, rng)
+            broken["spec_version"] = bco["spec_version"]
+            broken["usability_domain"] = bco["usability_domain"]
+            for instance in (bco, broken):
+                for error_format in ("legacy", "structured"):
+                    self.assertEqual(
+                        generated.parse_and_validate(
+                            instance, error_format=error_format
+                        ),
+                        interpreted.parse_and_validate(
+                            instance, error_format=error_format
+                        )
+                    )
+
+    def test_fallback(self):
+        """Schemas the generator does not support use `jsonschema`.
+        """
+
+        registry = SchemaRegistry(codegen=True)
+        validator = registry._compile({"type": "array", "minItems": 1})
+        self.assertIsInstance(validator, jsonschema.Draft7Validator)
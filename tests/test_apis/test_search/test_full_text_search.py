@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+"""Objects/Search Full Text
+Tests for 'Search successfull 200' with `contents` searches, which use the
+full-text index of the search documents and are ranked.
+"""
+
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from biocompute.models import Bco
+from biocompute.services import bco_counter_increment
+from search.models import BcoDocument
+from search.selectors import full_text_query
+from search.services import rebuild_search_index, search_document
+
+def bco_contents(name: str, keywords: list=(), steps: list=(),
+        usability: list=()) -> dict:
+    return {
+        "provenance_domain": {"name": name},
+        "description_domain": {
+            "keywords": list(keywords),
+            "pipeline_steps": [
+                {"step_number": index, "name": step, "description": step}
+                for index, step in enumerate(steps)
+            ],
+        },
+        "usability_domain": list(usability),
+    }
+
+class FullTextSearchTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(username="tester"))
+
+    def create(self, number: int, contents: dict) -> Bco:
+        return Bco.objects.create(
+            object_id=f"http://127.0.0.1:8000/TEST_{number:06}/1.0",
+            contents=contents,
+            prefix_id="TEST",
+            acl_public=True,
+            owner_id="tester",
+            state="PUBLISHED",
+            last_update=timezone.now()
+        )
+
+    def search(self, *values) -> list:
+        response = self.client.get(
+            '/api/objects/search/', {"contents": list(values)}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [bco["object_id"] for bco in response.json()]
+
+    def test_fixture_indexed(self):
+        """Every BCO has a search document.
+        """
+
+        self.assertEqual(BcoDocument.objects.count(), Bco.objects.count())
+        self.assertIn(
+            "http://127.0.0.1:8000/BCO_000001/1.0", self.search("argosdb")
+        )
+
+    def test_ranked(self):
+        """200: Matches in the name rank above matches in the usability text.
+        """
+
+        usability = self.create(101, bco_contents(
+            "Okapi calling", usability=["Calls okapi variants in zebrafish."]
+        ))
+        name = self.create(102, bco_contents("Zebrafish genome assembly"))
+        keywords = self.create(103, bco_contents(
+            "Genome assembly", keywords=["zebrafish", "assembly"]
+        ))
+        self.create(104, bco_contents("Mouse genome assembly"))
+        self.assertEqual(
+            self.search("zebra"),
+            [name.object_id, keywords.object_id, usability.object_id]
+        )
+        self.assertEqual(
+            self.search("zebrafish calling"), [usability.object_id]
+        )
+        self.assertEqual(
+            set(self.search("okapi", "mouse")),
+            {usability.object_id, f"http://127.0.0.1:8000/TEST_{104:06}/1.0"}
+        )
+
+    def test_maintained_on_save(self):
+        """Saving or deleting a BCO updates its search document.
+        """
+
+        bco = self.create(101, bco_contents("Platypus alignment"))
+        self.assertEqual(self.search("platypus"), [bco.object_id])
+        bco.contents = bco_contents("Echidna alignment", steps=["Trim reads"])
+        bco.save()
+        self.assertEqual(self.search("platypus"), [])
+        self.assertEqual(self.search("echidna trim"), [bco.object_id])
+        bco.delete()
+        self.assertEqual(self.search("echidna"), [])
+
+    def test_not_reindexed_on_access(self):
+        """Counting an access to a BCO does not rewrite its search document.
+        """
+
+        bco = self.create(101, bco_contents("Quokka census"))
+        with mock.patch("search.services.index_bco") as index_bco:
+            self.assertEqual(bco_counter_increment(bco), 1)
+            self.assertEqual(bco_counter_increment(bco), 2)
+        index_bco.assert_not_called()
+        self.assertEqual(self.search("quokka"), [bco.object_id])
+
+    def test_query_syntax(self):
+        """Query syntax in search terms is not interpreted.
+        """
+
+        bco = self.create(101, bco_contents("Quoted terms OR NEAR"))
+        self.assertEqual(self.search('"quoted" OR NEAR(*'), [bco.object_id])
+        self.assertEqual(
+            full_text_query(['"quoted" OR'], "sqlite"), '("quoted"* "or"*)'
+        )
+        self.assertEqual(
+            full_text_query(["a:b", "c"], "postgresql"), "(a:* & b:*) | (c:*)"
+        )
+        self.assertIsNone(full_text_query(["%%"], "sqlite"))
+
+    def test_without_full_text(self):
+        """Without the full-text index the contents are searched with LIKE.
+        """
+
+        bco = self.create(101, bco_contents("Axolotl", usability=["x"]))
+        with mock.patch("search.selectors.FULL_TEXT", False):
+            self.assertEqual(self.search("usability_domain\": [\"x"), [
+                bco.object_id
+            ])
+        self.assertEqual(self.search("axolotl"), [bco.object_id])
+
+    def test_rebuild(self):
+        """Rebuilding indexes BCOs written without `save()`.
+        """
+
+        Bco.objects.bulk_create([Bco(
+            object_id="http://127.0.0.1:8000/TEST_000101/1.0",
+            contents=bco_contents("Bulk loaded tardigrade"),
+            prefix_id="TEST",
+            acl_public=True,
+            owner_id="tester",
+            state="PUBLISHED",
+            last_update=timezone.now()
+        )])
+        self.assertEqual(self.search("tardigrade"), [])
+        self.assertEqual(rebuild_search_index(batch_size=4), Bco.objects.count())
+        self.assertEqual(
+            self.search("tardigrade"), ["http://127.0.0.1:8000/TEST_000101/1.0"]
+        )
+
+    def test_malformed_contents(self):
+        """BCOs with missing or malformed domains are indexed with no text.
+        """
+
+        self.assertEqual(search_document([]), {
+            "name": "", "keywords": "", "steps": "", "usability": ""
+        })
+        self.assertEqual(search_document({
+            "provenance_domain": "name",
+            "description_domain": {"pipeline_steps": [1, {"name": "Sort"}]},
+            "usability_domain": {"text": ["Nested", 2]},
+        })["steps"], "Sort")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""Objects/Search Query
+Tests for 'Search successfull 200' with structured `q` queries on paths in
+the BCO contents, and 400 for malformed queries.
+"""
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from biocompute.models import Bco
+from search.query import compile_query, next_prefix, parse_query
+
+def bco_contents(version, created: str="2031-06-01T00:00:00",
+        inputs: list=(), software: list=(), keywords: list=()) -> dict:
+    return {
+        "provenance_domain": {
+            "name": "Quokka census", "version": version, "created": created
+        },
+        "description_domain": {"keywords": list(keywords)},
+        "execution_domain": {"software_prerequisites": [
+            {"name": name, "version": "1"} for name in software
+        ]},
+        "io_domain": {"input_subdomain": [
+            {"uri": {"uri": uri}} for uri in inputs
+        ]},
+    }
+
+class JsonQueryTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(username="tester"))
+
+    def create(self, number: int, contents: dict) -> str:
+        return Bco.objects.create(
+            object_id=f"http://127.0.0.1:8000/TEST_{number:06}/1.0",
+            contents=contents,
+            prefix_id="TEST",
+            acl_public=True,
+            owner_id="tester",
+            state="PUBLISHED",
+            last_update=timezone.now()
+        ).object_id
+
+    def search(self, *queries, **params) -> set:
+        response = self.client.get(
+            "/api/objects/search/", dict(params, q=list(queries), limit=1000)
+        )
+        self.assertEqual(response.status_code, 200)
+        return {bco["object_id"] for bco in response.json()}
+
+    def test_exact(self):
+        """200: Exact matches on strings, and on numbers or their text.
+        """
+
+        text = self.create(101, bco_contents("9.1"))
+        number = self.create(102, bco_contents(9.1))
+        other = self.create(103, bco_contents("9.10"))
+        self.assertEqual(
+            self.search('provenance_domain.version = "9.1"'), {text}
+        )
+        self.assertEqual(
+            self.search("contents.provenance_domain.version=9.1"),
+            {text, number}
+        )
+        self.assertEqual(
+            self.search("provenance_domain.version = 9.10"), {other, number}
+        )
+
+    def test_prefix_and_range(self):
+        """200: Prefix and range matches.
+        """
+
+        january = self.create(101, bco_contents("1", "2030-01-15T10:00:00"))
+        february = self.create(102, bco_contents("1", "2030-02-01T00:00:00"))
+        self.create(103, bco_contents("1", "2029-12-31T23:59:59"))
+        number = self.create(104, bco_contents(5000))
+        self.assertEqual(
+            self.search("provenance_domain.created ^= 2030-01"), {january}
+        )
+        self.assertEqual(self.search(
+            'provenance_domain.created >= "2030-01-15"'\
+                + ' provenance_domain.created <= "2030-02-01T00:00:00"'
+        ), {january, february})
+        self.assertEqual(
+            self.search("provenance_domain.version > 4999"), {number}
+        )
+        self.assertNotIn(
+            number, self.search('provenance_domain.version < "1"')
+        )
+
+    def test_arrays(self):
+        """200: Paths through arrays match any element, or one by index.
+        """
+
+        first = self.create(101, bco_contents("1", inputs=[
+            "https://quokka.example/a.fasta", "ftp://quokka.example/b.fasta"
+        ], keywords=["marsupial"]))
+        second = self.create(102, bco_contents("1", inputs=[
+            "ftp://quokka.example/c.fasta"
+        ], software=["QuokkaCount"]))
+        self.assertEqual(self.search(
+            'io_domain.input_subdomain.uri.uri ^= "ftp://quokka.example/"'
+        ), {first, second})
+        self.assertEqual(self.search(
+            'io_domain.input_subdomain.0.uri.uri ^= "ftp://quokka.example/"'
+        ), {second})
+        self.assertEqual(
+            self.search("description_domain.keywords = marsupial"), {first}
+        )
+        self.assertEqual(self.search(
+            "execution_domain.software_prerequisites.name = QuokkaCount"
+        ), {second})
+        self.assertEqual(self.search(
+            "execution_domain.software_prerequisites.name = HIVE-hexagon"
+        ), {"http://127.0.0.1:8000/BCO_000001/DRAFT"})
+        self.assertEqual(
+            self.search("description_domain.keywords.name = marsupial"), set()
+        )
+
+    def test_boolean(self):
+        """200: Comparisons combine with AND, OR, NOT and parentheses.
+        """
+
+        a = self.create(101, bco_contents("q1", software=["Alpha"]))
+        b = self.create(102, bco_contents("q2", software=["Beta"]))
+        c = self.create(103, bco_contents("q3", software=["Alpha", "Beta"]))
+        software = "execution_domain.software_prerequisites.name"
+        self.assertEqual(self.search(
+            f"provenance_domain.version ^= q AND ({software} = Alpha"\
+                + f" or {software} = Beta)"
+        ), {a, b, c})
+        self.assertEqual(self.search(
+            f"provenance_domain.version ^= q NOT {software} = Beta"
+        ), {a})
+        self.assertEqual(self.search(
+            f"provenance_domain.version ^= q AND NOT (NOT {software} = Alpha"\
+                + f" OR NOT {software} = Beta)"
+        ), {c})
+        self.assertEqual(self.search(
+            "provenance_domain.version = q1 OR provenance_domain.version = q2"\
+                + f" AND {software} = Alpha"
+        ), {a})
+        self.assertEqual(self.search(
+            "provenance_domain.version ^= q", f"{software} = Beta",
+            object_id="TEST_000102"
+        ), {b})
+        self.assertEqual(self.search(
+            "NOT provenance_domain.missing = x", object_id="TEST_0001"
+        ), {a, b, c})
+
+    def test_indexed(self):
+        """Hot paths compile to the expressions of their indexes.
+        """
+
+        sql, params = compile_query(
+            parse_query('provenance_domain.version ^= "1.2"'), connection.vendor
+        )
+        queryset = Bco.objects.extra(where=[sql], params=params)
+        if connection.vendor == "sqlite":
+            self.assertIn(
+                "search_bco_provenance_version", queryset.explain()
+            )
+        self.assertEqual(params, ["1.2", "1.3"])
+        self.assertEqual(next_prefix("a" + chr(0x10FFFF)), "b")
+        self.assertIsNone(next_prefix(""))
+
+    def test_invalid(self):
+        """400: Malformed queries are rejected.
+        """
+
+        for query in [
+            "",
+            "provenance_domain.version",
+            "provenance_domain.version =",
+            "= 1",
+            "provenance_domain.version == 1",
+            "provenance_domain.'version' = 1",
+            "provenance_domain..version = 1",
+            "provenance_domain.version = 1 OR",
+            "(provenance_domain.version = 1",
+            "provenance_domain.version = 1)",
+            'provenance_domain.version = "1',
+            'provenance_domain.version = "\\x"',
+            "a%s = 1",
+            " AND ".join(["a = 1"] * 40),
+            "(" * 20 + "a = 1" + ")" * 20,
+        ]:
+            with self.subTest(query=query):
+                response = self.client.get(
+                    "/api/objects/search/", {"q": query}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("message", response.json())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+"""Objects/Search
+Tests for 'Search successfull 200' and a differential test of the
+`controled_list` visibility filter against the previous implementation,
+which filtered on a list of prefixes built in Python and used `distinct()`.
+"""
+
+import random
+from django.contrib.auth.models import AnonymousUser, Permission, User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from biocompute.models import Bco
+from prefix.models import Prefix
+from prefix.selectors import get_user_prefixes
+from prefix.services import create_permissions_for_prefix
+from search.selectors import controled_list
+
+def reference_controled_list(user: User):
+    """The `controled_list` implementation the filter has to match."""
+
+    prefix_permissions = get_user_prefixes(user=user)
+    viewable_prefixes = [
+        perm.split("_")[1] for perm in prefix_permissions
+        if perm.startswith("view_")
+    ]
+
+    if user.username == "AnonymousUser" or user.username == "":
+        bcos_by_permission = Bco.objects.filter(
+            prefix__prefix__in=viewable_prefixes).exclude(state="DELETE"
+        ).exclude(state="DRAFT")
+        return bcos_by_permission.distinct()
+
+    bcos_by_permission = Bco.objects.filter(
+        prefix__prefix__in=viewable_prefixes
+    ).exclude(state="DELETE")
+    bcos_by_authorized = Bco.objects.filter(
+        authorized_users=user
+    ).exclude(state="DELETE")
+    return (bcos_by_permission | bcos_by_authorized).distinct()
+
+def object_ids(queryset) -> list:
+    return sorted(queryset.values_list("object_id", flat=True))
+
+class ObjectSearchTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_search_objects(self):
+        """200: Anonymous searches only see published BCOs, once each.
+        """
+
+        response = self.client.get('/api/objects/search/')
+        self.assertEqual(response.status_code, 200)
+        states = {bco["state"] for bco in response.data}
+        self.assertNotIn("DRAFT", states)
+        self.assertNotIn("DELETE", states)
+
+    def test_single_query_without_distinct(self):
+        """The visibility filter is one query and does not use DISTINCT.
+        """
+
+        user = User.objects.get(username='tester')
+        with CaptureQueriesContext(connection) as queries:
+            list(controled_list(user))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("DISTINCT", queries[0]["sql"])
+
+class VisibilityDifferentialTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def test_fixture_users(self):
+        """Fixture users see the same BCOs as with the previous filter.
+        """
+
+        for user in list(User.objects.all()) + [AnonymousUser()]:
+            with self.subTest(user=user.username):
+                self.assertEqual(
+                    object_ids(controled_list(user)),
+                    object_ids(reference_controled_list(user))
+                )
+
+    def test_random_data(self):
+        """Random prefixes, permissions and BCOs give the same results.
+        """
+
+        rng = random.Random(13)
+        users = [
+            User.objects.create(username=f"differential{index}")
+            for index in range(8)
+        ]
+        prefixes = []
+        for index in range(10):
+            prefix = Prefix.objects.create(
+                prefix=f"DF{index:02}", owner=rng.choice(users),
+                public=rng.random() < 0.4
+            )
+            if not prefix.public:
+                create_permissions_for_prefix(prefix)
+            prefixes.append(prefix)
+
+        permissions = list(Permission.objects.filter(
+            codename__regex=r"^(view|change)_DF"
+        ))
+        for user in users:
+            user.user_permissions.add(*rng.sample(permissions, 4))
+
+        states = ["DRAFT", "PUBLISHED", "REFERENCED", "DELETE"]
+        for index in range(120):
+            prefix = rng.choice(prefixes)
+            bco = Bco.objects.create(
+                object_id=f"http://testserver/DIFF_{index:06}/DRAFT",
+                contents={},
+                prefix=prefix,
+                acl_public=prefix.public,
+                owner=rng.choice(users),
+                state=rng.choice(states),
+                last_update=timezone.now()
+            )
+            bco.authorized_users.add(*rng.sample(users, rng.randint(0, 3)))
+
+        for user in users + [AnonymousUser()]:
+            with self.subTest(user=user.username):
+                self.assertEqual(
+                    object_ids(controled_list(user)),
+                    object_ids(reference_controled_list(user))
+                )
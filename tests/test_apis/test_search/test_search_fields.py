@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+"""Objects/Search Fields
+Tests for the `fields` projection and `summary` mode of 'Search successfull
+200', and 400 for unknown fields.
+"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from biocompute.models import Bco
+
+class SearchFieldsTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(username="tester"))
+
+    def search(self, path: str="/api/objects/search/", **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_projection(self):
+        """200: Only the requested fields and contents paths are returned.
+        """
+
+        rows = self.search(
+            object_id="BCO_000001",
+            fields=["object_id,contents.provenance_domain.name",
+                "contents.usability_domain.0,contents.missing"]
+        ).json()
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            contents = Bco.objects.get(object_id=row["object_id"]).contents
+            self.assertEqual(row, {
+                "object_id": row["object_id"],
+                "contents.provenance_domain.name":
+                    contents["provenance_domain"]["name"],
+                "contents.usability_domain.0": contents["usability_domain"][0],
+                "contents.missing": None,
+            })
+
+    def test_without_object_id(self):
+        """200: Pages of projections without `object_id` keep their order.
+        """
+
+        full = self.search(state="DRAFT", fields="owner,state").json()
+        first = self.search(state="DRAFT", fields="state", limit=2)
+        rest = self.search(
+            state="DRAFT", fields="state", cursor=first["X-Next-Cursor"]
+        )
+        self.assertEqual(first.json() + rest.json(), [
+            {"state": row["state"]} for row in full
+        ])
+
+    def test_summary(self):
+        """200: Summaries are compact.
+        """
+
+        full = self.search()
+        summary = self.search(summary="true")
+        self.assertEqual(len(full.json()), len(summary.json()))
+        self.assertEqual(set(summary.json()[0]), {
+            "object_id", "name", "state", "owner", "last_update"
+        })
+        self.assertLess(len(summary.content) * 20, len(full.content))
+
+        deprecated = self.client.post(
+            "/api/objects/?summary=true",
+            {"POST_api_objects_search": [{"type": "prefix", "search": "BCO"}]},
+            format="json"
+        )
+        self.assertEqual(deprecated.status_code, 200)
+        self.assertIn("name", deprecated.json()[0])
+
+    def test_invalid(self):
+        """400: Unknown fields and malformed paths are rejected.
+        """
+
+        for params in [
+            {"fields": "password"},
+            {"fields": "contents."},
+            {"fields": "contents.a..b"},
+            {"fields": "contents.a__b"},
+            {"fields": ","},
+            {"fields": ",".join(f"contents.f{index}" for index in range(40))},
+            {"fields": "object_id", "summary": "true"},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get("/api/objects/search/", params)
+                self.assertEqual(response.status_code, 400)
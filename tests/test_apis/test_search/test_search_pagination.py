@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+"""Objects/Search Pagination
+Tests for cursor pagination of 'Search successfull 200', and 400 for
+invalid limits and cursors.
+"""
+
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from biocompute.models import Bco
+from search.selectors import encode_cursor
+
+class SearchPaginationTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(username="tester"))
+        now = timezone.now()
+        for index in range(25):
+            Bco.objects.create(
+                object_id=f"http://127.0.0.1:8000/TEST_{index + 100:06}/1.0",
+                contents={"provenance_domain": {
+                    "name": "Paged pangolin " + "pangolin " * (index % 4)
+                }},
+                prefix_id="TEST",
+                acl_public=True,
+                owner_id="tester",
+                state="PUBLISHED",
+                # Pairs of BCOs share a timestamp to test the tie-breaker.
+                last_update=now - timedelta(minutes=index // 2)
+            )
+
+    def pages(self, path: str="/api/objects/search/", method: str="get",
+            **params) -> list:
+        """The object IDs of each page, following the next cursors."""
+
+        pages = []
+        cursor = None
+        while True:
+            query = dict(params, cursor=cursor) if cursor else params
+            if method == "get":
+                response = self.client.get(path, query)
+            else:
+                response = self.client.post(
+                    path + "?" + "&".join(f"{k}={v}" for k, v in query.items()),
+                    {"POST_api_objects_search": [
+                        {"type": "prefix", "search": "TEST"}
+                    ]},
+                    format="json"
+                )
+            self.assertEqual(response.status_code, 200)
+            pages.append([bco["object_id"] for bco in response.json()])
+            cursor = response.get("X-Next-Cursor")
+            if cursor is None:
+                self.assertFalse(response.has_header("Link"))
+                return pages
+            self.assertIn(f"cursor={cursor}", response["Link"])
+
+    def test_pages(self):
+        """200: Pages follow each other newest first without gaps.
+        """
+
+        expected = list(Bco.objects.filter(
+            prefix_id="TEST", state="PUBLISHED"
+        ).order_by("-last_update", "-object_id").values_list(
+            "object_id", flat=True
+        ))
+        pages = self.pages(object_id="TEST_", state="PUBLISHED", limit=10)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_ranked_pages(self):
+        """200: Ranked full-text results page in rank order.
+        """
+
+        everything = self.pages(contents="pangolin", limit=1000)[0]
+        self.assertEqual(len(everything), 25)
+        pages = self.pages(contents="pangolin", limit=4)
+        self.assertEqual(len(pages), 7)
+        self.assertEqual(sum(pages, []), everything)
+
+    def test_deprecated_search(self):
+        """200: The deprecated POST search is paginated too.
+        """
+
+        pages = self.pages("/api/objects/", method="post", limit=20)
+        self.assertEqual([len(page) for page in pages], [20, 10])
+        self.assertEqual(len(set(sum(pages, []))), 30)
+
+    def test_rows_of_a_bco_stay_together(self):
+        """200: BCOs with several authorized users are not split.
+        """
+
+        bco = Bco.objects.get(object_id="http://127.0.0.1:8000/TEST_000101/1.0")
+        bco.authorized_users.add(*User.objects.all()[:3])
+        pages = self.pages(object_id="TEST_", state="PUBLISHED", limit=1)
+        self.assertEqual(pages[0], [bco.object_id] * 3)
+        self.assertEqual(len(pages), 25)
+
+    def test_authorized_users_filter(self):
+        """200: BCOs with several matching authorized users are found once.
+        """
+
+        bco = Bco.objects.get(object_id="http://127.0.0.1:8000/TEST_000101/1.0")
+        users = User.objects.filter(username__in=["tester", "hivelab"])
+        bco.authorized_users.add(*users)
+        params = {
+            "object_id": "TEST_",
+            "authorized_users": ["tester", "hivelab"],
+            "fields": "object_id",
+            "count": "true",
+        }
+        self.assertEqual(
+            self.pages(limit=1, **params), [[bco.object_id]]
+        )
+        response = self.client.get("/api/objects/search/", params)
+        self.assertEqual(response["X-Total-Count"], "1")
+
+    def test_count(self):
+        """200: The total count is returned on request.
+        """
+
+        params = {"object_id": "TEST_", "state": "PUBLISHED", "limit": 5}
+        response = self.client.get("/api/objects/search/", params)
+        self.assertFalse(response.has_header("X-Total-Count"))
+        response = self.client.get(
+            "/api/objects/search/", dict(params, count="true")
+        )
+        self.assertEqual(response["X-Total-Count"], "25")
+
+    def test_invalid(self):
+        """400: Limits out of range and malformed cursors are rejected.
+        """
+
+        for params in [
+            {"limit": 0},
+            {"limit": 1001},
+            {"limit": "ten"},
+            {"cursor": "not a cursor"},
+            {"cursor": encode_cursor(["rank", 1.0, "x"])},
+            {"cursor": encode_cursor(["time", "yesterday", "x"])},
+            {"contents": "pangolin", "cursor": encode_cursor(
+                ["time", timezone.now().isoformat(), "x"]
+            )},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get("/api/objects/search/", params)
+                self.assertEqual(response.status_code, 400)
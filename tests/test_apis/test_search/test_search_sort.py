@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""Objects/Search Sort
+Tests for 'Search successfull 200' with the `name`, `version`, `license`,
+`keyword` and `created` filters and the `sort` orders of the search fields
+extracted from the BCO contents, and 400 for invalid ones.
+"""
+
+from datetime import datetime, timedelta, timezone
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from biocompute.models import Bco
+from biocompute.services import set_bco_keywords, set_search_fields
+from search.selectors import controled_list, encode_cursor
+
+class SearchSortTestCase(TestCase):
+    fixtures = ['tests/fixtures/test_data']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(username="tester"))
+        start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        for index in range(12):
+            bco = Bco(
+                object_id=f"http://127.0.0.1:8000/TEST_{index + 100:06}/1.0",
+                contents={
+                    "provenance_domain": {
+                        "name": f"Numbat {'abc'[index % 3]}",
+                        "version": f"1.{index % 4}",
+                        "license": "CC0" if index % 2 else "MIT",
+                        "created": None if index % 5 == 4 else\
+                            (start + timedelta(days=index // 2)).isoformat(),
+                    },
+                    "description_domain": {"keywords": [
+                        "numbat", "termite" if index < 3 else "marsupial"
+                    ]},
+                },
+                prefix_id="TEST",
+                acl_public=True,
+                owner_id="tester",
+                state="PUBLISHED",
+                last_update=start
+            )
+            keywords = set_search_fields(bco)
+            bco.save()
+            set_bco_keywords(bco, keywords)
+
+    def pages(self, **params) -> list:
+        """The object IDs of each page, following the next cursors."""
+
+        pages = []
+        cursor = None
+        params = dict(params, object_id="TEST_0001")
+        while True:
+            query = dict(params, cursor=cursor) if cursor else params
+            response = self.client.get("/api/objects/search/", query)
+            self.assertEqual(response.status_code, 200)
+            pages.append([bco["object_id"] for bco in response.json()])
+            cursor = response.get("X-Next-Cursor")
+            if cursor is None:
+                return pages
+
+    def search(self, **params) -> list:
+        return sum(self.pages(limit=1000, **params), [])
+
+    def test_filters(self):
+        """200: Filters on the search fields.
+        """
+
+        bcos = Bco.objects.filter(object_id__contains="TEST_0001")
+        self.assertEqual(set(self.search(name="Numbat a")), set(
+            bcos.filter(contents__provenance_domain__name="Numbat a")\
+                .values_list("object_id", flat=True)
+        ))
+        self.assertEqual(
+            len(self.search(version=["1.0", "1.3"], license="MIT")), 3
+        )
+        self.assertEqual(len(self.search(keyword="termite")), 3)
+        self.assertEqual(len(self.search(keyword=["termite", "marsupial"])), 12)
+        self.assertEqual(len(self.search(keyword="numbat", name="Numbat b")), 4)
+        # Days 1 and 2 are BCOs 2 to 5, and 4 has no created date.
+        self.assertEqual(sorted(self.search(
+            created_since="2030-01-02", created_before="2030-01-03T12:00:00Z"
+        )), [
+            f"http://127.0.0.1:8000/TEST_{index:06}/1.0"
+            for index in [102, 103, 105]
+        ])
+
+    def test_sort(self):
+        """200: Pages sorted by a search field, ascending or descending.
+        """
+
+        bcos = list(Bco.objects.filter(
+            object_id__contains="TEST_0001"
+        ).values("object_id", "name", "version", "created"))
+        for sort, key in [
+            ("name", lambda bco: (bco["name"], bco["object_id"])),
+            ("-version", lambda bco: (bco["version"], bco["object_id"])),
+        ]:
+            with self.subTest(sort=sort):
+                pages = self.pages(sort=sort, limit=5)
+                self.assertEqual([len(page) for page in pages], [5, 5, 2])
+                self.assertEqual(sum(pages, []), [
+                    bco["object_id"] for bco in sorted(
+                        bcos, key=key, reverse=sort.startswith("-")
+                    )
+                ])
+
+    def test_sort_missing_values_last(self):
+        """200: BCOs without a created date follow the others.
+        """
+
+        dated = sorted(
+            (bco for bco in Bco.objects.filter(
+                object_id__contains="TEST_0001", created__isnull=False
+            ).values_list("created", "object_id")),
+        )
+        undated = [
+            "http://127.0.0.1:8000/TEST_000104/1.0",
+            "http://127.0.0.1:8000/TEST_000109/1.0",
+        ]
+        for limit in [1, 3, 10]:
+            with self.subTest(limit=limit):
+                self.assertEqual(
+                    sum(self.pages(sort="created", limit=limit), []),
+                    [object_id for _, object_id in dated] + undated
+                )
+                self.assertEqual(
+                    sum(self.pages(sort="-created", limit=limit), []),
+                    [object_id for _, object_id in reversed(dated)]\
+                        + undated[::-1]
+                )
+
+    def test_indexed(self):
+        """Filters and sorts on the search fields are index lookups.
+        """
+
+        bcos = controled_list(User.objects.get(username="tester"))
+        plan = bcos.filter(version="1.2").explain()
+        self.assertIn("bco_version_idx", plan)
+        plan = bcos.order_by("name", "object_id")[:10].explain()
+        self.assertIn("bco_name_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_invalid(self):
+        """400: Unknown sorts, malformed dates and cursors of other sorts.
+        """
+
+        for params in [
+            {"sort": "contents"},
+            {"sort": "--name"},
+            {"created_since": "yesterday"},
+            {"created_before": "2030-02-30"},
+            {"sort": "name", "cursor": encode_cursor(["time", "x", "x"])},
+            {"sort": "name", "cursor": encode_cursor(["name", None, "x"])},
+            {"sort": "created", "cursor": encode_cursor(["created", "x", "x"])},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get("/api/objects/search/", params)
+                self.assertEqual(response.status_code, 400)